@@ -0,0 +1,351 @@
+"""
+Muing Benchmark - 오프라인 음원 분리 벤치마크
+인터넷 없이 합성 오디오(또는 번들 파일)로 설정별 처리 시간 / 실시간 배율 / 최대 메모리 / 단계별 시간 측정
+
+사용법:
+    python bench/run.py run -o bench_results.json                # 기본 설정
+    python bench/run.py run --stems 2 4 --threads 1 4 --segments 4 7.8 --engines inprocess subprocess
+    python bench/run.py run --engines live --live-blocks 1 2 4      # 실시간 모드 블록별 RTF / 데드라인 초과
+    python bench/run.py compare old.json new.json --threshold 0.10   # 회귀 검사 (회귀 있으면 exit 1)
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+SAMPLERATE = 44100
+
+# 비교 시 값이 커지면 나쁜 지표
+REGRESSION_METRICS = ["rtf", "peak_rss_mb", "cpu_seconds"]
+
+
+def make_synthetic(path, seconds=30.0, seed=0):
+    """보컬/베이스/드럼 비슷한 성분을 섞은 재현 가능한 스테레오 테스트 음원"""
+    import numpy as np
+    import soundfile as sf
+
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(seconds * SAMPLERATE)) / SAMPLERATE
+    # 보컬: 비브라토 있는 배음 + 음절처럼 켜졌다 꺼지는 엔벨로프
+    f0 = 220 * 2 ** (np.floor(t * 2) % 5 / 12) * (1 + 0.01 * np.sin(2 * np.pi * 5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLERATE
+    vocal = sum(np.sin(k * phase) / k for k in range(1, 6)) * (np.sin(np.pi * t * 2) > -0.3)
+    # 베이스: 낮은 사인
+    bass = 0.6 * np.sin(2 * np.pi * 55 * 2 ** (np.floor(t / 2) % 3 / 12) * t)
+    # 드럼: 박자마다 감쇠하는 노이즈
+    beat = (t * 2) % 1
+    drums = rng.randn(len(t)) * np.exp(-beat * 30)
+    mix = 0.25 * vocal + 0.3 * bass + 0.2 * drums
+    stereo = np.stack([mix, 0.9 * mix + 0.05 * drums], axis=1)
+    stereo /= max(1.0, np.abs(stereo).max() / 0.9)
+    sf.write(str(path), stereo.astype(np.float32), SAMPLERATE)
+    return path
+
+
+def peak_rss_mb():
+    """이 프로세스와 끝난 하위 프로세스(demucs CLI) 중 큰 최대 메모리 - 리눅스 ru_maxrss 단위는 KB"""
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_one(config):
+    """설정 하나 실행 (별도 프로세스에서 호출돼서 최대 메모리가 설정별로 분리됨)"""
+    import torch
+
+    torch.set_num_threads(config["threads"])
+    from core.cache import ResultCache
+    from core.engine import DemucsEngine
+    from core.pcm_cache import PCMCache
+    from core.separator import SILENCE_DB
+
+    audio = Path(config["input"])
+    stages = {}
+    live = {}
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if config["engine"] == "subprocess":
+            from core.scheduling import SchedulingPolicy
+            from core.separator import MuingSeparator
+            # 기본 정책이면 slot.env()가 OMP/MKL 스레드 수를 min(코어, 8)로 덮어씀 → 설정값으로 고정
+            separator = MuingSeparator(model=config["model"], engine="subprocess",
+                                       cache=ResultCache(tmp / "cache"),
+                                       pcm_cache=PCMCache(tmp / "pcm"),
+                                       scheduling=SchedulingPolicy(threads_per_job=config["threads"],
+                                                                   max_jobs=1))
+            start = time.perf_counter()
+            result = separator.separate(audio, stems=config["stems"])
+            stages["total"] = time.perf_counter() - start
+            if result is None:
+                raise RuntimeError("demucs CLI 실행 실패")
+            audio_seconds = separator_audio_seconds(audio)
+        else:
+            start = time.perf_counter()
+            # 운영 경로(MuingSeparator)와 같은 무음 건너뛰기 기준으로 측정
+            engine = DemucsEngine(model=config["model"], device=config["device"],
+                                  segment=config["segment"], pcm_cache=PCMCache(tmp / "pcm"),
+                                  precision=config.get("precision", "fp32"),
+                                  silence_db=SILENCE_DB)
+            engine.load()
+            stages["model_load"] = time.perf_counter() - start
+
+            if config["engine"] == "live":
+                start = time.perf_counter()
+                wav = engine.load_audio(audio)
+                stages["decode"] = time.perf_counter() - start
+                audio_seconds = wav.shape[-1] / engine.samplerate
+
+                # 입력을 기다리지 않고 블록을 바로 넣음 → 블록당 순수 처리 시간 (실시간이면 블록 길이보다 짧아야 함)
+                hop = int(config["block"] * engine.samplerate)
+                blocks = (wav[..., i:i + hop] for i in range(0, wav.shape[-1], hop))
+                start = time.perf_counter()
+                for _ in engine.iter_live(blocks, block_seconds=config["block"], info=live):
+                    pass
+                stages["live"] = time.perf_counter() - start
+            elif config["engine"] == "stream":
+                start = time.perf_counter()
+                engine.stream_to_dir(audio, tmp / "out", stems=config["stems"],
+                                     output_format=config["format"])
+                stages["stream"] = time.perf_counter() - start
+                audio_seconds = engine.pcm_cache.load(audio).shape[0] / engine.samplerate
+            else:
+                start = time.perf_counter()
+                wav = engine.load_audio(audio)
+                stages["decode"] = time.perf_counter() - start
+                audio_seconds = wav.shape[-1] / engine.samplerate
+
+                start = time.perf_counter()
+                sources = engine.separate_tensor(wav, max_batch_segments=config["batch"])
+                stages["inference"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                engine.save_stems(sources, tmp / "out", stems=config["stems"],
+                                  output_format=config["format"])
+                stages["write"] = time.perf_counter() - start
+
+    wall = time.perf_counter() - wall_start
+    # 모델 로드는 프로세스당 1회 비용이라 RTF에서는 제외 (따로 기록)
+    work = wall - stages.get("model_load", 0.0)
+    result = {
+        "config": config,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "rtf": work / audio_seconds,
+        "cpu_seconds": cpu_seconds() - cpu_start,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+    if live:
+        # 실시간 모드는 블록 처리 시간 / 블록 길이 (디코딩 제외), 1 이상이면 실시간을 못 따라감
+        result["rtf"] = live["rtf"]
+        result["live"] = live
+    return result
+
+
+def separator_audio_seconds(path):
+    import soundfile as sf
+    try:
+        return sf.info(str(path)).duration
+    except RuntimeError:
+        from core.pcm_cache import PCMCache
+        with tempfile.TemporaryDirectory() as tmp:
+            return PCMCache(tmp).load(path).shape[0] / SAMPLERATE
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    info = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import torch
+        info["torch"] = torch.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_matrix(args):
+    inputs = []
+    if args.input:
+        inputs = [Path(p).resolve() for p in args.input]
+    else:
+        bundled = PROJECT_ROOT / "data" / "short.mp3"
+        if bundled.exists() and bundled.stat().st_size > 0:
+            inputs.append(bundled)
+    tmp = tempfile.TemporaryDirectory()
+    if not inputs:
+        inputs.append(make_synthetic(Path(tmp.name) / f"synthetic_{args.duration:g}s.wav",
+                                     args.duration))
+
+    configs = []
+    for audio, model, stems, segment, threads, engine, precision in itertools.product(
+            inputs, args.models, args.stems, args.segments, args.threads, args.engines,
+            args.precisions):
+        batch = args.batch
+        if engine == "subprocess":
+            # demucs CLI는 항상 fp32 / 모델 기본 세그먼트 / 배치 없음 → 그 축은 하나로
+            # (같은 설정을 여러 번 돌리지 않음, 스레드 수는 SchedulingPolicy로 적용됨)
+            precision, segment, batch = "fp32", None, 1
+        elif engine == "live":
+            # 실시간 모드는 블록마다 윈도우 하나씩 forward → 배치 없음
+            batch = 1
+        config = {
+            "input": str(audio),
+            "model": model,
+            "stems": stems,
+            "segment": segment,
+            "threads": threads,
+            "engine": engine,
+            "precision": precision,
+            "device": args.device,
+            "batch": batch,
+            "format": args.format,
+        }
+        # 블록 길이 축은 실시간 모드에만 (다른 엔진 설정 키는 예전 결과 파일과 그대로 비교되게)
+        for block in (args.live_blocks if engine == "live" else [None]):
+            if block is not None:
+                config = dict(config, block=block)
+            if config not in configs:
+                configs.append(config)
+
+    results = []
+    for i, config in enumerate(configs, 1):
+        label = " ".join(f"{k}={v}" for k, v in config.items() if k != "input")
+        print(f"[{i}/{len(configs)}] {label}")
+        for repeat in range(args.repeats):
+            env = dict(os.environ, OMP_NUM_THREADS=str(config["threads"]),
+                       MKL_NUM_THREADS=str(config["threads"]))
+            proc = subprocess.run([sys.executable, __file__, "_one", json.dumps(config)],
+                                  capture_output=True, text=True, env=env)
+            if proc.returncode != 0:
+                print(f"  ❌ 실패: {proc.stderr.strip().splitlines()[-1:]}")
+                results.append({"config": config, "error": proc.stderr[-2000:]})
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            result["repeat"] = repeat
+            results.append(result)
+            print(f"  ⏱️ {result['wall_seconds']:.2f}초 · RTF {result['rtf']:.3f} · "
+                  f"RSS {result['peak_rss_mb']:.0f} MB")
+            if "live" in result:
+                live = result["live"]
+                print(f"  🎙️ 블록 {live['blocks']}개 · 최대 {live['max_block_seconds']:.2f}초 · "
+                      f"데드라인 초과 {live['deadline_misses']}회")
+
+    report = {"environment": environment(), "results": results}
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"📁 결과 저장: {args.output}")
+    tmp.cleanup()
+    return report
+
+
+def config_key(config):
+    return json.dumps({k: v for k, v in config.items() if k != "input"}, sort_keys=True)
+
+
+def summarize(results):
+    """설정별로 반복 실행 결과의 최소값 (노이즈가 가장 적은 값)"""
+    summary = {}
+    for result in results:
+        if "error" in result:
+            continue
+        key = config_key(result["config"])
+        best = summary.setdefault(key, {})
+        for metric in REGRESSION_METRICS:
+            value = result[metric]
+            best[metric] = min(best.get(metric, value), value)
+    return summary
+
+
+def compare(args):
+    old = summarize(json.loads(Path(args.old).read_text())["results"])
+    new = summarize(json.loads(Path(args.new).read_text())["results"])
+    regressions = 0
+    for key in sorted(set(old) & set(new)):
+        label = " ".join(f"{k}={v}" for k, v in json.loads(key).items())
+        print(label)
+        for metric in REGRESSION_METRICS:
+            before, after = old[key][metric], new[key][metric]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  ❌ 회귀"
+                regressions += 1
+            elif change < -args.threshold:
+                flag = "  ✅ 개선"
+            print(f"  {metric:12s} {before:10.3f} → {after:10.3f} ({change:+.1%}){flag}")
+    for key in sorted(set(old) ^ set(new)):
+        print(f"⚠️ 한쪽에만 있는 설정: {key}")
+    print(f"\n{'❌' if regressions else '✅'} 회귀 {regressions}건 (기준 {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muing 오프라인 분리 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="설정 조합별 벤치마크 실행")
+    run.add_argument("--input", nargs="*", help="입력 파일 (없으면 data/short.mp3 또는 합성 음원)")
+    run.add_argument("--duration", type=float, default=30.0, help="합성 음원 길이(초)")
+    run.add_argument("--models", nargs="+", default=["htdemucs"])
+    run.add_argument("--stems", nargs="+", type=int, default=[2])
+    run.add_argument("--segments", nargs="+", type=float, default=[None],
+                     help="세그먼트 길이(초), 기본은 모델 값")
+    run.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1])
+    run.add_argument("--engines", nargs="+", default=["inprocess"],
+                     choices=["inprocess", "stream", "subprocess", "live"])
+    run.add_argument("--precisions", nargs="+", default=["fp32"], choices=["fp32", "bf16", "int8"],
+                     help="인프로세스 추론 정밀도 (subprocess는 항상 fp32)")
+    run.add_argument("--device", default="cpu")
+    run.add_argument("--batch", type=int, default=1, help="forward당 세그먼트 수")
+    run.add_argument("--live-blocks", nargs="+", type=float, default=[1.0],
+                     help="실시간 모드(--engines live) 블록 길이(초)")
+    run.add_argument("--format", default="wav")
+    run.add_argument("--repeats", type=int, default=1)
+    run.add_argument("-o", "--output", default="bench_results.json")
+
+    cmp = sub.add_parser("compare", help="두 결과 비교, 회귀가 있으면 exit 1")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="허용 증가율 (0.10 = 10%%)")
+
+    one = sub.add_parser("_one")
+    one.add_argument("config")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_matrix(args)
+    elif args.command == "compare":
+        sys.exit(compare(args))
+    else:
+        print(json.dumps(run_one(json.loads(args.config))))
+
+
+if __name__ == "__main__":
+    main()
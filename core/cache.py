@@ -0,0 +1,196 @@
+"""
+Muing Core - 분리 결과 캐시
+오디오 내용 해시 + 모델/스템/엔진 설정으로 키를 만들고, 디스크 용량을 넘으면 LRU로 정리
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from core.catalog import CATALOG_FILE, ResultCatalog
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_CACHE_DIR = PROJECT_ROOT / "separated" / "cache"
+DEFAULT_MAX_GB = float(os.environ.get("MUING_CACHE_MAX_GB", "5"))
+CACHE_VERSION = 1
+META_FILE = "meta.json"
+
+
+# (경로, 크기, 수정시각) → 해시. 같은 파일을 여러 캐시가 반복 해싱하지 않도록
+_hash_memo = {}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """파일 내용 SHA-256 (파일명과 무관)"""
+    stat = os.stat(path)
+    memo_key = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    if len(_hash_memo) > 4096:
+        _hash_memo.clear()
+    _hash_memo[memo_key] = h.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def make_key(content_hash, model, stems, **settings):
+    """내용 해시와 분리 설정을 합쳐 캐시 키 생성"""
+    payload = {
+        "v": CACHE_VERSION,
+        "audio": content_hash,
+        "model": model,
+        "stems": stems,
+        "settings": settings,
+    }
+    raw = json.dumps(payload, sort_keys=True).encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+class ResultCache:
+    """분리 결과 디렉토리 캐시 (크기 제한 LRU)
+
+    구조: <root>/<key>/{vocals.wav, no_vocals.wav, ..., meta.json}, <root>/catalog.db
+    목록/최근 사용 시각/크기는 catalog.db(core.catalog)에서 조회 - 디렉토리를 훑지 않음
+    meta.json의 mtime도 같이 touch해서 색인을 다시 만들 때 사용 순서를 복원
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root) if root else DEFAULT_CACHE_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes if max_bytes is not None else DEFAULT_MAX_GB * 1024 ** 3)
+        self._lock = threading.Lock()
+        catalog_path = self.root / CATALOG_FILE
+        new_catalog = not catalog_path.exists()
+        self.catalog = ResultCatalog(catalog_path)
+        if new_catalog:
+            self.reindex()
+
+    def key_for(self, audio_path, model, stems, **settings):
+        return make_key(file_hash(audio_path), model, stems, **settings)
+
+    def path_for(self, key):
+        return self.root / key
+
+    def get(self, key):
+        """hit이면 결과 디렉토리, miss면 None"""
+        entry = self.path_for(key)
+        meta = entry / META_FILE
+        if not meta.exists():
+            return None
+        os.utime(meta)  # LRU 갱신
+        self.catalog.touch(key)
+        logger.info(f"⚡ 캐시 hit: {key}")
+        return entry
+
+    def read_meta(self, entry):
+        """결과 디렉토리의 meta.json (없거나 깨졌으면 빈 dict)"""
+        try:
+            return json.loads((Path(entry) / META_FILE).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def staging_dir(self):
+        """결과를 먼저 써둘 임시 디렉토리 (put으로 확정)"""
+        path = self.root / f".tmp-{uuid.uuid4().hex}"
+        path.mkdir(parents=True)
+        return path
+
+    def put(self, key, src_dir, **meta):
+        """src_dir 내용을 캐시에 등록하고 결과 디렉토리 반환"""
+        src_dir = Path(src_dir)
+        entry = self.path_for(key)
+        meta = dict(meta, key=key, created=time.time(), size=dir_size(src_dir))
+        (src_dir / META_FILE).write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+
+        with self._lock:
+            if entry.exists():
+                # 동시에 같은 결과가 만들어진 경우 먼저 들어온 쪽 사용
+                shutil.rmtree(src_dir, ignore_errors=True)
+            else:
+                shutil.move(str(src_dir), str(entry))
+                self.catalog.add(meta)
+        logger.info(f"💾 캐시 저장: {key} ({meta['size'] / 1024 / 1024:.1f} MB)")
+        self.evict()
+        return entry
+
+    def _with_path(self, metas):
+        """색인 항목에 결과 경로를 붙임 - 밖에서 지워진 디렉토리는 색인에서도 삭제"""
+        items = []
+        for meta in metas:
+            entry = self.path_for(meta["key"])
+            if not (entry / META_FILE).exists():
+                self.catalog.remove(meta["key"])
+                continue
+            meta["path"] = entry
+            items.append(meta)
+        return items
+
+    def page(self, offset=0, limit=10, previews=False):
+        """최근 사용 순 결과 한 페이지 (previews=False면 미리듣기 결과 제외)"""
+        return self._with_path(self.catalog.page(offset, limit, previews))
+
+    def count(self, previews=False):
+        return self.catalog.count(previews)
+
+    def entries(self):
+        """캐시 항목 전체 목록 (최근 사용 순)"""
+        return self._with_path(self.catalog.page(0, -1, previews=True))
+
+    def total_size(self):
+        return self.catalog.total_size()
+
+    def reindex(self):
+        """결과 디렉토리를 한 번 훑어서 색인을 다시 만듦 (색인이 없던 기존 캐시 / 수동 복구용)"""
+        known = self.catalog.keys()
+        found = set()
+        for entry in self.root.iterdir():
+            meta_path = entry / META_FILE
+            if entry.name.startswith(".") or not meta_path.exists():
+                continue
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            meta.setdefault("key", entry.name)
+            found.add(meta["key"])
+            self.catalog.add(meta, last_access=meta_path.stat().st_mtime)
+        for key in known - found:
+            self.catalog.remove(key)
+        if found:
+            logger.info(f"🗂️ 결과 색인 재구성: {len(found)}개")
+        return len(found)
+
+    def evict(self):
+        """용량 초과분을 오래 안 쓴 항목부터 삭제"""
+        with self._lock:
+            total = self.catalog.total_size()
+            count = self.catalog.count(previews=True)
+            removed = 0
+            # 방금 넣은 항목 하나는 항상 남김
+            while count > 1 and total > self.max_bytes:
+                batch = self.catalog.oldest(min(count - 1, 16))
+                for key, size in batch:
+                    if total <= self.max_bytes:
+                        break
+                    shutil.rmtree(self.path_for(key), ignore_errors=True)
+                    self.catalog.remove(key)
+                    total -= size
+                    count -= 1
+                    removed += 1
+            if removed:
+                logger.info(f"🧹 캐시 정리: {removed}개 삭제 (현재 {total / 1024 / 1024:.1f} MB)")
+        return removed
@@ -0,0 +1,111 @@
+"""
+Muing Core - 실행 환경 확인 (FFmpeg / Demucs / 장치)
+프로세스당 한 번만 확인하고, 결과는 디스크에도 저장해서 다음 시작 때 재사용
+유효성은 실행 파일 경로/수정 시각과 패키지 버전만 비교 (셸/하위 프로세스 실행 없음)
+"""
+import functools
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_PROBE_PATH = PROJECT_ROOT / "separated" / "capabilities.json"
+
+PACKAGES = ("torch", "demucs", "soundfile", "librosa", "streamlit")
+
+
+def _package_version(name):
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _binary(name):
+    """실행 파일 경로 + 수정 시각 (PATH 검색만, 실행하지 않음)"""
+    path = shutil.which(name)
+    if path is None:
+        return None
+    try:
+        return {"path": path, "mtime": os.stat(path).st_mtime_ns}
+    except OSError:
+        return None
+
+
+def _fingerprint():
+    """저장된 확인 결과가 아직 유효한지 판단하는 값 (싸게 계산 가능한 것만)"""
+    return {
+        "python": sys.executable,
+        "ffmpeg": _binary("ffmpeg"),
+        "demucs_cli": _binary("demucs"),
+        "packages": {name: _package_version(name) for name in PACKAGES},
+    }
+
+
+def _ffmpeg_version(path):
+    try:
+        result = subprocess.run([path, "-version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.split("\n", 1)[0]
+
+
+def _probe(fingerprint):
+    ffmpeg = fingerprint["ffmpeg"]
+    return {
+        "fingerprint": fingerprint,
+        "ffmpeg": ffmpeg is not None,
+        "ffmpeg_version": _ffmpeg_version(ffmpeg["path"]) if ffmpeg else None,
+        "demucs": importlib.util.find_spec("demucs") is not None,
+        "demucs_cli": fingerprint["demucs_cli"]["path"] if fingerprint["demucs_cli"] else None,
+        "torch": importlib.util.find_spec("torch") is not None,
+        "versions": fingerprint["packages"],
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def capabilities(path=DEFAULT_PROBE_PATH):
+    """FFmpeg/Demucs 설치 상태 (프로세스당 1회, 저장된 결과가 유효하면 재사용)"""
+    path = Path(path)
+    fingerprint = json.loads(json.dumps(_fingerprint()))
+    try:
+        cached = json.loads(path.read_text())
+        if cached.get("fingerprint") == fingerprint:
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    result = _probe(fingerprint)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"⚠️ 환경 확인 결과 저장 실패: {e}")
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def device_available(device):
+    """장치 사용 가능 여부 - cpu는 바로 True, 그 외에만 torch를 import해서 확인"""
+    if device == "cpu":
+        return True
+    if not capabilities()["torch"]:
+        return False
+    import torch
+    if device.startswith("cuda"):
+        return torch.cuda.is_available()
+    if device == "mps":
+        return torch.backends.mps.is_available()
+    return False
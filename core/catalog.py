@@ -0,0 +1,131 @@
+"""
+Muing Core - 분리 결과 색인 (SQLite)
+결과 디렉토리를 매번 훑지 않고 입력 해시/모델/스템/길이/크기/시각을 색인해서
+갤러리 페이지 조회와 캐시 정리(LRU)를 디렉토리 수와 무관하게 처리
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    input_hash TEXT,
+    model TEXT,
+    stems INTEGER,
+    format TEXT,
+    precision TEXT,
+    preview INTEGER NOT NULL DEFAULT 0,
+    audio_seconds REAL,
+    size INTEGER NOT NULL DEFAULT 0,
+    created REAL,
+    last_access REAL,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (preview, last_access);
+CREATE INDEX IF NOT EXISTS results_input_hash ON results (input_hash);
+"""
+
+COLUMNS = ("key", "name", "input_hash", "model", "stems", "format", "precision", "preview",
+           "audio_seconds", "size", "created", "last_access", "meta")
+
+
+class ResultCatalog:
+    """결과 디렉토리 색인 - ResultCache가 put/get/evict 때 함께 갱신
+
+    여러 프로세스(웹 앱 두 개 등)가 같은 파일을 공유해도 되도록 WAL 모드 사용
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def _row(self, row):
+        meta = json.loads(row["meta"] or "{}")
+        # preview는 meta.json의 (시작, 끝) 값을 그대로 둠 (열은 필터용 0/1)
+        meta.update({name: row[name] for name in COLUMNS if name not in ("meta", "preview")})
+        return meta
+
+    def add(self, meta, last_access=None):
+        """결과 하나 등록 (같은 key면 덮어씀)"""
+        now = time.time()
+        row = (
+            meta["key"], meta.get("name"), meta.get("input_hash"), meta.get("model"),
+            meta.get("stems"), meta.get("format"), meta.get("precision"),
+            int(bool(meta.get("preview"))), meta.get("audio_seconds"), meta.get("size", 0),
+            meta.get("created", now), last_access or meta.get("created", now),
+            json.dumps(meta, ensure_ascii=False),
+        )
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})", row)
+
+    def touch(self, key):
+        with self._lock, self._db:
+            self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+
+    def remove(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM results WHERE key = ?", (key,)).fetchone()
+        return self._row(row) if row else None
+
+    def page(self, offset=0, limit=10, previews=False):
+        """최근 사용 순 한 페이지 (previews=False면 미리듣기 결과 제외)"""
+        where = "" if previews else "WHERE preview = 0"
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM results {where} ORDER BY last_access DESC LIMIT ? OFFSET ?",
+                (limit, offset)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def count(self, previews=False):
+        where = "" if previews else "WHERE preview = 0"
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM results {where}").fetchone()[0]
+
+    def total_size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def oldest(self, limit=16):
+        """가장 오래 안 쓴 항목부터 (key, size)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, size FROM results ORDER BY last_access ASC LIMIT ?",
+                (limit,)).fetchall()
+        return [(row["key"], row["size"]) for row in rows]
+
+    def by_input(self, input_hash):
+        """같은 입력 파일의 결과들 (모델/스템/포맷이 다른 것 포함)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM results WHERE input_hash = ? ORDER BY last_access DESC",
+                (input_hash,)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def keys(self):
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT key FROM results")}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
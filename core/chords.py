@@ -0,0 +1,275 @@
+"""
+Muing Core - 코드 진행 분석
+분리된 반주(no_vocals) 스템 → 크로마 → 코드 템플릿 점수 → HMM(Viterbi)로 다듬은 코드 구간 목록
+
+- 크로마: 특징 저장소(core.features)의 STFT를 (주파수 구간 → 음이름) 행렬 곱 한 번으로 접음
+- 점수: 모든 프레임 x 모든 코드 템플릿을 행렬 곱 한 번으로 계산
+- Viterbi: 전이 확률이 "유지 / 나머지는 균등"이라 상태당 O(1)로 갱신 → 시간 축만 돌고
+  상태 축과 곡(배치) 축은 벡터화 (카탈로그 일괄 처리 시 여러 곡을 한 번에 디코딩)
+- 결과: [(시작초, 끝초, 코드명, 신뢰도)] - 스템 내용 해시로 JSON 캐시
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from core.cache import file_hash
+from core.features import default_store
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_CHORDS_DIR = PROJECT_ROOT / "separated" / "chords"
+CHORDS_VERSION = 2
+
+SAMPLERATE = 22050
+N_FFT = 4096
+HOP = 2048  # 약 93ms
+
+# 화성 판단에 쓰는 주파수 범위 (베이스 ~ 중고음)
+FMIN = 55.0
+FMAX = 2000.0
+# 이보다 조용한 프레임은 코드 없음(N) - Hann 창을 씌운 프레임 기준
+SILENCE_DB = -45.0
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+QUALITIES = {
+    "": (0, 4, 7),
+    "m": (0, 3, 7),
+    "7": (0, 4, 7, 10),
+    "m7": (0, 3, 7, 10),
+}
+NO_CHORD = "N"
+
+# 가장 비슷한 코드 템플릿과의 코사인 유사도가 이보다 낮으면 코드 없음(N)
+# (평탄한 크로마와 3화음의 유사도가 0.5)
+NO_CHORD_SCORE = 0.6
+
+# 프레임마다 같은 코드를 유지할 확률 (코드 하나가 보통 1~2초 = 10~20 프레임)
+SELF_PROB = 0.9
+# 템플릿 유사도 → 관측 확률 (클수록 프레임 점수를 더 믿음)
+EMISSION_SHARPNESS = 20.0
+
+
+def chord_templates():
+    """(코드명 목록, [코드 수, 12] L2 정규화 템플릿) - 코드명 마지막은 코드 없음(N, 템플릿 없음)"""
+    labels, rows = [], []
+    for quality, intervals in QUALITIES.items():
+        for root in range(12):
+            row = np.zeros(12, dtype=np.float32)
+            row[[(root + i) % 12 for i in intervals]] = 1.0
+            labels.append(f"{NOTE_NAMES[root]}{quality}")
+            rows.append(row)
+    labels.append(NO_CHORD)
+    templates = np.stack(rows)
+    return labels, templates / np.linalg.norm(templates, axis=1, keepdims=True)
+
+
+@functools.lru_cache(maxsize=None)
+def chroma_filter(samplerate=SAMPLERATE, n_fft=N_FFT, fmin=FMIN, fmax=FMAX):
+    """[12, FFT 구간] - 구간 중심 주파수의 음이름에 1 (범위 밖은 0)
+
+    설정별로 한 번만 만들어 공유하므로 읽기 전용 배열
+    """
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / samplerate)
+    matrix = np.zeros((12, len(freqs)), dtype=np.float32)
+    valid = (freqs >= fmin) & (freqs <= fmax)
+    pitch_class = np.round(69 + 12 * np.log2(freqs[valid] / 440.0)).astype(int) % 12
+    matrix[pitch_class, np.flatnonzero(valid)] = 1.0
+    matrix.setflags(write=False)
+    return matrix
+
+
+def chroma(spectrum, samplerate=SAMPLERATE):
+    """STFT 크기 [프레임, n_fft // 2 + 1] → ([프레임, 12] L2 정규화 크로마, 프레임 RMS dB)"""
+    spectrum = np.asarray(spectrum)
+    n_fft = 2 * (spectrum.shape[1] - 1)
+    filter_matrix = chroma_filter(samplerate, n_fft)
+    # Parseval: 양쪽 스펙트럼 에너지 합 / N^2 = 프레임 평균 제곱 (DC/나이퀴스트 외는 2배)
+    power = np.square(spectrum)
+    energy = 2 * power.sum(axis=1) - power[:, 0] - power[:, -1]
+    rms_db = 10 * np.log10(np.maximum(energy / n_fft ** 2, 1e-20))
+    # 큰 부분음 몇 개가 다 가져가지 않도록 약하게 로그 압축 후 음이름별로 합침
+    values = np.log1p(spectrum) @ filter_matrix.T
+    values /= np.maximum(np.linalg.norm(values, axis=1, keepdims=True), 1e-9)
+    return values.astype(np.float32), rms_db
+
+
+def emission_logprob(chroma_frames, rms_db, templates, silence_db=SILENCE_DB):
+    """[..., 프레임, 코드+N] 로그 관측 확률 - 프레임 x 템플릿 행렬 곱 한 번 + log-softmax"""
+    similarity = chroma_frames @ templates.T
+    no_chord = np.full(similarity.shape[:-1] + (1,), NO_CHORD_SCORE, dtype=similarity.dtype)
+    scores = EMISSION_SHARPNESS * np.concatenate([similarity, no_chord], axis=-1)
+    # 조용한 프레임은 코드 없음만 남김
+    quiet = rms_db < silence_db
+    scores[..., :-1] = np.where(quiet[..., None], -np.inf, scores[..., :-1])
+    scores -= scores.max(axis=-1, keepdims=True)
+    return scores - np.log(np.exp(scores).sum(axis=-1, keepdims=True))
+
+
+def viterbi(log_emission, self_prob=SELF_PROB):
+    """[곡, 프레임, 상태] → [곡, 프레임] 최적 상태열
+
+    전이: 유지 self_prob, 다른 상태로는 (1 - self_prob) / (상태 수 - 1) 균등
+    → 이전 최댓값 하나와 자기 자신만 비교하면 되므로 시간 단계마다 O(곡 x 상태) 벡터 연산
+    """
+    batch, frames, states = log_emission.shape
+    log_stay = np.log(self_prob)
+    log_move = np.log((1 - self_prob) / (states - 1))
+    score = log_emission[:, 0].copy()
+    # 각 단계에서 다른 상태에서 넘어왔으면 그 상태 번호, 유지했으면 -1
+    came_from = np.full((batch, frames, states), -1, dtype=np.int16)
+    rows = np.arange(batch)
+    for t in range(1, frames):
+        best = score.argmax(axis=1)
+        move = score[rows, best][:, None] + log_move
+        stay = score + log_stay
+        switched = move > stay
+        came_from[:, t] = np.where(switched, best[:, None], -1)
+        score = np.where(switched, move, stay) + log_emission[:, t]
+
+    path = np.empty((batch, frames), dtype=np.int64)
+    path[:, -1] = score.argmax(axis=1)
+    for t in range(frames - 1, 0, -1):
+        previous = came_from[rows, t, path[:, t]]
+        path[:, t - 1] = np.where(previous >= 0, previous, path[:, t])
+    return path
+
+
+def to_segments(path, log_emission, labels, hop_seconds):
+    """상태열 → [(시작초, 끝초, 코드명, 신뢰도)] - 신뢰도는 구간 내 해당 코드의 평균 관측 확률"""
+    if len(path) == 0:
+        return []
+    starts = np.flatnonzero(np.diff(path, prepend=-1))
+    ends = np.append(starts[1:], len(path))
+    prob = np.exp(log_emission[np.arange(len(path)), path])
+    confidence = np.add.reduceat(prob, starts) / (ends - starts)
+    return [(round(float(s * hop_seconds), 3), round(float(e * hop_seconds), 3),
+             labels[path[s]], round(float(c), 3))
+            for s, e, c in zip(starts, ends, confidence)]
+
+
+class ChordAnalyzer:
+    """반주 스템 → 코드 구간 목록 (스템 내용 해시 캐시)
+
+    features: core.features.FeatureStore - 디코딩 결과와 STFT를 다른 분석과 공유
+    """
+
+    def __init__(self, self_prob=SELF_PROB, silence_db=SILENCE_DB, features=None, cache_dir=None):
+        self.features = features or default_store()
+        self.self_prob = self_prob
+        self.silence_db = silence_db
+        self.labels, self.templates = chord_templates()
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CHORDS_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, stem_path):
+        payload = {
+            "v": CHORDS_VERSION,
+            "audio": file_hash(stem_path),
+            "labels": len(self.labels),
+            "self_prob": self.self_prob,
+            "silence_db": self.silence_db,
+        }
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+        return self.cache_dir / f"{key}.json"
+
+    def cached(self, stem_path):
+        """이미 분석한 결과가 있으면 반환 (없으면 None - 새로 계산하지 않음)"""
+        try:
+            return [tuple(s) for s in json.loads(self._cache_path(stem_path).read_text())]
+        except (OSError, ValueError):
+            return None
+
+    def analyze(self, stem_path):
+        """코드 구간 목록 [(시작초, 끝초, 코드명, 신뢰도)]"""
+        return self.analyze_many([stem_path])[0]
+
+    def analyze_many(self, stem_paths, max_batch=16):
+        """여러 스템을 한 번에 분석 (캐시에 없는 것만 모아 Viterbi를 배치로 실행)"""
+        results = [self.cached(path) for path in stem_paths]
+        pending = [i for i, result in enumerate(results) if result is None]
+        for start in range(0, len(pending), max_batch):
+            batch = pending[start:start + max_batch]
+            chromas = []
+            for i in batch:
+                spectrum = self.features.stft(stem_paths[i], SAMPLERATE, N_FFT, HOP)
+                chromas.append(chroma(spectrum))
+            # 길이가 다른 곡은 뒤를 조용한 프레임으로 채워 한 배열로
+            frames = max(len(c) for c, _ in chromas)
+            chroma_batch = np.zeros((len(batch), frames, 12), dtype=np.float32)
+            rms_batch = np.full((len(batch), frames), -np.inf, dtype=np.float32)
+            for j, (c, rms_db) in enumerate(chromas):
+                chroma_batch[j, :len(c)] = c
+                rms_batch[j, :len(c)] = rms_db
+            log_emission = emission_logprob(chroma_batch, rms_batch, self.templates,
+                                            self.silence_db)
+            paths = viterbi(log_emission, self.self_prob)
+            for j, i in enumerate(batch):
+                length = len(chromas[j][0])
+                segments = to_segments(paths[j, :length], log_emission[j, :length], self.labels,
+                                       HOP / SAMPLERATE)
+                self._store(stem_paths[i], segments)
+                results[i] = segments
+            logger.info(f"🎹 코드 분석 완료: {len(batch)}곡")
+        return results
+
+    def _store(self, stem_path, segments):
+        path = self._cache_path(stem_path)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(segments, ensure_ascii=False))
+        os.replace(tmp, path)
+
+
+def backfill(cache=None, batch_size=16):
+    """결과 캐시의 모든 곡(미리듣기 제외)에 코드 분석 채우기 → (새로 분석한 곡 수, 건너뛴 곡 수)
+
+    분석 결과는 반주(no_vocals) 스템 기준이라 반주 스템이 없는 항목(4-stem 등)은 건너뛰고 셈
+    """
+    from core.cache import ResultCache
+    from core.encoding import stem_path
+
+    cache = cache or ResultCache()
+    analyzer = ChordAnalyzer()
+    done = 0
+    skipped = 0
+    for offset in range(0, cache.count(), batch_size):
+        stems = []
+        for entry in cache.page(offset, batch_size):
+            path = stem_path(entry["path"], "no_vocals")
+            if not path.exists():
+                skipped += 1
+                logger.info(f"⏭️ 반주 스템 없음 ({entry.get('stems')} stems): {entry['path'].name}")
+            elif analyzer.cached(path) is None:
+                stems.append(path)
+        if stems:
+            analyzer.analyze_many(stems, max_batch=batch_size)
+            done += len(stems)
+    if skipped:
+        logger.warning(f"⚠️ 반주 스템이 없어 코드 분석을 건너뛴 항목: {skipped}개")
+    return done, skipped
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="반주 스템에서 코드 진행 분석")
+    parser.add_argument("stems", nargs="*", help="반주 스템 파일 (separate_file 결과의 accompaniment)")
+    parser.add_argument("--backfill", action="store_true", help="결과 캐시 전체를 분석")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.backfill:
+        done, skipped = backfill()
+        print(f"새로 분석: {done}곡, 건너뜀: {skipped}곡 ({time.perf_counter() - start:.1f}초)")
+    for stem, segments in zip(args.stems, ChordAnalyzer().analyze_many(args.stems)):
+        print(f"🎹 {stem}")
+        for begin, end, label, confidence in segments:
+            print(f"  {begin:7.2f} - {end:7.2f}  {label:4s} ({confidence:.2f})")
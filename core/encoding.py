@@ -0,0 +1,234 @@
+"""
+Muing Core - 스템 출력 포맷
+WAV / FLAC / Opus / raw PCM(float16, int16)을 백그라운드 스레드에서 조각 단위로 인코딩
+"""
+import json
+import logging
+import queue
+import subprocess
+import threading
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from core.pcm_cache import iter_ffmpeg_blocks
+from core.peaks import PeakBuilder, build_peaks, write_peaks_info
+
+logger = logging.getLogger(__name__)
+
+# 포맷 → (확장자, MIME)
+FORMATS = {
+    "wav": (".wav", "audio/wav"),
+    "flac": (".flac", "audio/flac"),
+    "opus": (".opus", "audio/ogg"),
+    "f16": (".f16", "application/octet-stream"),
+    "s16": (".s16", "application/octet-stream"),
+}
+RAW_DTYPES = {"f16": np.float16, "s16": np.int16}
+# 정수 / 손실 압축 포맷만 ±0.99로 clamp (f16은 1을 넘는 피크도 그대로 보존)
+# demucs CLI fallback도 --clip-mode clamp로 실행해서 두 경로 결과가 같은 방식으로 잘림
+CLIPPED_FORMATS = ("wav", "flac", "s16", "opus")
+PCM_INFO_FILE = "pcm.json"
+DEFAULT_OPUS_BITRATE = 128
+
+
+def check_format(output_format):
+    if output_format not in FORMATS:
+        raise ValueError(f"지원하지 않는 출력 포맷: {output_format} (가능: {', '.join(FORMATS)})")
+    return output_format
+
+
+def stem_path(result_dir, name):
+    """결과 디렉토리에서 스템 파일 찾기 (포맷 무관)"""
+    for ext, _ in FORMATS.values():
+        path = Path(result_dir) / f"{name}{ext}"
+        if path.exists():
+            return path
+    return Path(result_dir) / f"{name}.wav"
+
+
+def stem_files(result_dir):
+    """결과 디렉토리의 스템 파일 목록"""
+    exts = {ext for ext, _ in FORMATS.values()}
+    return sorted(p for p in Path(result_dir).iterdir() if p.suffix in exts)
+
+
+def mime_type(path):
+    for ext, mime in FORMATS.values():
+        if Path(path).suffix == ext:
+            return mime
+    return "application/octet-stream"
+
+
+def read_raw_pcm(path, mmap=True):
+    """raw PCM 스템을 [샘플, 채널] 배열로 읽기 (기본은 memory-map)"""
+    path = Path(path)
+    info = json.loads((path.parent / PCM_INFO_FILE).read_text())
+    dtype = np.dtype(info["dtype"])
+    if mmap:
+        data = np.memmap(path, dtype=dtype, mode="r")
+    else:
+        data = np.fromfile(path, dtype=dtype)
+    return data.reshape(-1, info["channels"]), info["samplerate"]
+
+
+def read_mono(path, samplerate, block_frames=1 << 18):
+    """스템 파일을 모노 float32로 읽기 (분석 모듈용 - FFmpeg가 바로 samplerate로 리샘플링)"""
+    path = Path(path)
+    if path.suffix[1:] in RAW_DTYPES:
+        from scipy.signal import resample_poly
+
+        data, source_rate = read_raw_pcm(path)
+        mono = data.astype(np.float32).mean(axis=1)
+        if path.suffix == ".s16":
+            mono /= 32767
+        g = np.gcd(samplerate, source_rate)
+        return resample_poly(mono, samplerate // g, source_rate // g).astype(np.float32)
+    blocks = list(iter_ffmpeg_blocks(path, samplerate, 1, block_frames))
+    if not blocks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(blocks)[:, 0]
+
+
+class _Encoder:
+    """스템 하나에 대한 조각 단위 인코더"""
+
+    def __init__(self, path, output_format, samplerate, channels, bitrate):
+        self.output_format = output_format
+        self.proc = None
+        self.file = None
+        if output_format in ("wav", "flac"):
+            self.file = sf.SoundFile(str(path), "w", samplerate=samplerate, channels=channels,
+                                     format=output_format.upper(), subtype="PCM_16")
+        elif output_format == "opus":
+            # Opus는 48kHz만 지원 → ffmpeg가 리샘플링
+            cmd = [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-f", "f32le", "-ar", str(samplerate), "-ac", str(channels), "-i", "-",
+                "-c:a", "libopus", "-b:a", f"{bitrate}k", str(path),
+            ]
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        else:
+            self.file = open(path, "wb")
+
+    def write(self, data):
+        """data: [샘플, 채널] float32 배열"""
+        if self.proc is not None:
+            self.proc.stdin.write(np.ascontiguousarray(data, dtype=np.float32).tobytes())
+        elif self.output_format in ("wav", "flac"):
+            self.file.write(data)
+        elif self.output_format == "s16":
+            self.file.write((data * 32767).astype(np.int16).tobytes())
+        else:
+            self.file.write(data.astype(np.float16).tobytes())
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise RuntimeError("FFmpeg Opus 인코딩 실패")
+        else:
+            self.file.close()
+
+
+class StemWriter:
+    """분리 결과를 조각 단위로 받아 스템 파일에 기록하는 파이프라인 단계
+
+    write()는 큐에 넣기만 하고 바로 반환 → 인코딩은 별도 스레드에서 추론과 겹쳐서 진행
+    peaks=True면 인코딩하면서 파형 피크 피라미드도 같이 만들어 스템 옆에 저장 (core.peaks)
+    """
+
+    def __init__(self, out_dir, samplerate, output_format="wav", bitrate=None, max_pending=16,
+                 peaks=True):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.samplerate = samplerate
+        self.output_format = check_format(output_format)
+        self.bitrate = bitrate or DEFAULT_OPUS_BITRATE
+        self.ext = FORMATS[output_format][0]
+        self._encoders = {}
+        self._peaks = {} if peaks else None
+        self._channels = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._loop, name="muing-encode", daemon=True)
+        self._thread.start()
+
+    def write(self, tracks):
+        """tracks: {스템명: [채널, 샘플] 텐서 또는 배열} - 시간 순서대로 호출"""
+        if self._error is not None:
+            raise self._error
+        chunk = {}
+        for name, wav in tracks.items():
+            if hasattr(wav, "detach"):
+                wav = wav.detach().cpu().numpy()
+            if self.output_format in CLIPPED_FORMATS:
+                # 전체 최대값을 미리 알 수 없으므로 rescale 대신 clamp
+                chunk[name] = np.clip(wav, -0.99, 0.99).T
+            else:
+                # 큐에서 기다리는 동안 원본 텐서가 바뀌어도 영향 없도록 복사
+                chunk[name] = wav.astype(np.float32).T
+        self._queue.put(chunk)
+
+    def _loop(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                for name, data in chunk.items():
+                    if name not in self._encoders:
+                        self._channels = data.shape[1]
+                        self._encoders[name] = _Encoder(
+                            self.out_dir / f"{name}{self.ext}", self.output_format,
+                            self.samplerate, data.shape[1], self.bitrate
+                        )
+                    self._encoders[name].write(data)
+                    if self._peaks is not None:
+                        self._peaks.setdefault(name, PeakBuilder()).add(data)
+            except Exception as e:
+                self._error = e
+
+    def close(self):
+        """남은 조각을 모두 인코딩하고 파일 닫기"""
+        self._queue.put(None)
+        self._thread.join()
+        for encoder in self._encoders.values():
+            encoder.close()
+        if self.output_format in RAW_DTYPES and self._encoders:
+            info = {
+                "samplerate": self.samplerate,
+                "channels": self._channels,
+                "dtype": np.dtype(RAW_DTYPES[self.output_format]).name,
+            }
+            (self.out_dir / PCM_INFO_FILE).write_text(json.dumps(info))
+        if self._error is not None:
+            raise self._error
+        if self._peaks:
+            write_peaks_info(self.out_dir, {
+                name: builder.save(self.out_dir / f"{name}{self.ext}", self.samplerate)
+                for name, builder in self._peaks.items()
+            })
+        return self.out_dir
+
+
+def transcode_dir(result_dir, output_format, bitrate=None, block_frames=1 << 18):
+    """디렉토리의 WAV 스템들을 다른 포맷으로 변환 (demucs CLI fallback 결과용)"""
+    check_format(output_format)
+    if output_format == "wav":
+        build_peaks(result_dir)
+        return result_dir
+    for wav_path in sorted(Path(result_dir).glob("*.wav")):
+        info = sf.info(str(wav_path))
+        writer = StemWriter(result_dir, info.samplerate, output_format, bitrate)
+        try:
+            for block in sf.blocks(str(wav_path), blocksize=block_frames, dtype="float32",
+                                   always_2d=True):
+                writer.write({wav_path.stem: block.T})
+        finally:
+            writer.close()
+        wav_path.unlink()
+    return result_dir
@@ -0,0 +1,730 @@
+"""
+Muing Core - 인프로세스 Demucs 엔진
+모델을 한 번만 로드해서 메모리에 올려두고 재사용
+torch/demucs는 모델을 처음 로드할 때 import (모듈 import만으로는 무거운 라이브러리를 안 올림)
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from core.capabilities import capabilities
+from core.encoding import StemWriter
+from core.pcm_cache import iter_ffmpeg_blocks
+
+logger = logging.getLogger(__name__)
+
+# 활동 감지 프레임 길이 (샘플) - 이 단위로 RMS를 계산해서 무음 세그먼트를 판단
+ACTIVITY_FRAME = 1024
+
+# fp32: 기본 / bf16: bfloat16 autocast / int8: Linear·LSTM 동적 int8 양자화 (CPU 전용)
+PRECISIONS = ("fp32", "bf16", "int8")
+
+torch = None
+_backend_lock = threading.Lock()
+# torch 연산 스레드 수는 프로세스 전역 → 바뀔 때만 설정 (동시 작업들이 번갈아 바꾸지 않도록)
+_num_threads = None
+
+
+def _load_backend():
+    """torch/demucs import (최초 1회, 몇 초 걸림)"""
+    global torch, BagOfModels, TensorChunk, AudioFile, HTDemucs, get_model, center_trim
+    if torch is not None:
+        return
+    with _backend_lock:
+        if torch is not None:
+            return
+        start = time.time()
+        from demucs.apply import BagOfModels, TensorChunk
+        from demucs.audio import AudioFile
+        from demucs.htdemucs import HTDemucs
+        from demucs.pretrained import get_model
+        from demucs.utils import center_trim
+        import torch as _torch
+        torch = _torch
+        logger.info(f"📦 torch/demucs 로드: {time.time() - start:.1f}초")
+
+
+class DemucsEngine:
+    """프로세스 안에서 모델을 유지하는 Demucs 엔진"""
+
+    def __init__(self, model="htdemucs", device="cpu", shifts=1, overlap=0.25, pcm_cache=None,
+                 segment=None, precision="fp32", silence_db=None):
+        if not (capabilities()["torch"] and capabilities()["demucs"]):
+            raise RuntimeError("torch/demucs가 설치되지 않았습니다: pip install demucs")
+        if precision not in PRECISIONS:
+            raise ValueError(f"지원하지 않는 precision: {precision} (가능: {', '.join(PRECISIONS)})")
+        if precision == "int8" and device != "cpu":
+            raise ValueError("int8 동적 양자화는 cpu에서만 지원됩니다")
+        self.model_name = model
+        self.device = device
+        self.shifts = shifts
+        self.overlap = overlap
+        self.segment = segment  # 세그먼트 길이(초), None이면 모델 기본값
+        self.precision = precision
+        # 세그먼트 전체가 이 레벨(dBFS RMS) 아래면 모델을 건너뛰고 무음으로 기록 (None이면 끔)
+        self.silence_db = silence_db
+        self.pcm_cache = pcm_cache  # 있으면 디코딩 결과를 재사용
+        self._model = None
+        self.load_seconds = None  # 모델 로드에 걸린 시간 (계측용)
+        self._lock = threading.Lock()
+
+    def _autocast(self):
+        if self.precision != "bf16":
+            return nullcontext()
+        device_type = "cuda" if str(self.device).startswith("cuda") else "cpu"
+        return torch.autocast(device_type=device_type, dtype=torch.bfloat16)
+
+    def set_num_threads(self, threads):
+        """연산 스레드 수 설정 - 프로세스 전역 값이라 이미 같은 값이면 아무것도 안 함"""
+        global _num_threads
+        _load_backend()
+        with _backend_lock:
+            if _num_threads != threads:
+                torch.set_num_threads(threads)
+                _num_threads = threads
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        """모델 로드 (최초 1회만 실제로 로드)"""
+        if self._model is not None:
+            return self._model
+        _load_backend()
+        with self._lock:
+            if self._model is None:
+                start = time.time()
+                model = get_model(self.model_name)
+                model.to(self.device)
+                model.eval()
+                if self.precision == "int8":
+                    # 동적 양자화는 Linear/LSTM만 지원 (Conv는 fp32 유지)
+                    model = torch.ao.quantization.quantize_dynamic(
+                        model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+                self._model = model
+                self.load_seconds = time.time() - start
+                logger.info(f"🧠 모델 로드 완료: {self.model_name} ({self.device}, {self.load_seconds:.1f}초)")
+        return self._model
+
+    @property
+    def samplerate(self):
+        return self.load().samplerate
+
+    @property
+    def audio_channels(self):
+        return self.load().audio_channels
+
+    @property
+    def sources(self):
+        return list(self.load().sources)
+
+    def load_audio(self, audio_path, cache=True):
+        """FFmpeg로 디코딩해서 모델 샘플레이트/채널로 변환 (PCM 캐시가 있으면 memmap으로 바로)
+
+        cache=False면 이미 캐시에 있을 때만 memmap을 쓰고, 없으면 FFmpeg 파이프에서 바로 읽음
+        (한 번만 읽는 일괄 분리가 대화형 작업의 캐시 항목을 밀어내지 않도록)
+        """
+        model = self.load()
+        if self.pcm_cache is not None:
+            if cache:
+                pcm = self.pcm_cache.load(audio_path, model.samplerate, model.audio_channels)
+            else:
+                pcm = self.pcm_cache.cached(audio_path, model.samplerate, model.audio_channels)
+            if pcm is not None:
+                return torch.from_numpy(pcm).t()
+        return AudioFile(Path(audio_path)).read(
+            streams=0, samplerate=model.samplerate, channels=model.audio_channels
+        )
+
+    def load_range(self, audio_path, start, end, context=1.0):
+        """[start - context, end + context)초만 디코딩 → ([채널, 샘플] 텐서, 첫 샘플의 파일 내 위치)
+
+        PCM 캐시에 이미 있으면 memmap에서 잘라서, 없으면 FFmpeg -ss / -t로 그 구간만
+        (일부만 디코딩한 결과는 캐시에 넣지 않음). 파일 끝을 넘는 부분은 잘림
+        """
+        samplerate = self.samplerate
+        channels = self.audio_channels
+        lo = max(0, int((start - context) * samplerate))
+        hi = max(lo, int((end + context) * samplerate))
+        if self.pcm_cache is not None:
+            pcm = self.pcm_cache.cached(audio_path, samplerate, channels)
+            if pcm is not None:
+                return torch.from_numpy(pcm[lo:hi]).t(), lo
+        blocks = [torch.from_numpy(block.copy()).t()
+                  for block in iter_ffmpeg_blocks(audio_path, samplerate, channels, hi - lo,
+                                                  seek=lo / samplerate,
+                                                  duration=(hi - lo) / samplerate)]
+        if not blocks:
+            return torch.zeros(channels, 0), lo
+        return torch.cat(blocks, dim=-1)[..., :hi - lo], lo
+
+    def iter_audio_blocks(self, audio_path, block_frames):
+        """[채널, block_frames] 텐서를 순서대로 yield (PCM 캐시 또는 FFmpeg 파이프)
+
+        PCM 캐시가 없는 파일도 전체 디코딩을 기다리지 않음 - FFmpeg 블록을 바로 넘기면서 캐시에 기록
+        """
+        if self.pcm_cache is not None:
+            blocks = self.pcm_cache.iter_blocks(audio_path, block_frames, self.samplerate,
+                                                self.audio_channels)
+        else:
+            blocks = iter_ffmpeg_blocks(audio_path, self.samplerate, self.audio_channels,
+                                        block_frames)
+        for block in blocks:
+            yield torch.from_numpy(block.copy()).t()
+
+    def separate_tensor(self, wav, max_batch_segments=1, progress=None, sink=None, info=None,
+                        shifts=None):
+        """[채널, 샘플] 텐서를 분리해서 {소스명: 텐서} 반환
+
+        info: dict를 넘기면 skipped_seconds(무음이라 모델을 건너뛴 길이)를 채워줌
+        shifts: 이번 호출에만 쓸 랜덤 shift 횟수 (None이면 self.shifts)
+        """
+        if sink is not None:
+            track_sink = sink
+            sink = lambda index, sources: track_sink(sources)
+        track_info = {}
+        result = self.separate_tensors([wav], max_batch_segments=max_batch_segments,
+                                       progress=progress, sink=sink, info=track_info,
+                                       shifts=shifts)[0]
+        if info is not None:
+            info["skipped_seconds"] = track_info["skipped_seconds"][0]
+        return result
+
+    def separate_tensors(self, wavs, max_batch_segments=1, progress=None, sink=None, info=None,
+                         shifts=None):
+        """여러 트랙을 세그먼트 단위로 잘라 한 번의 forward에 묶어서 분리
+
+        demucs apply_model과 같은 방식(shift 1회 + 삼각 가중치 overlap-add)이지만
+        세그먼트를 파일 경계와 상관없이 [배치, 채널, 길이] 텐서로 쌓아서 실행
+        progress: 콜백(처리한 세그먼트 수, 전체 세그먼트 수)
+        sink: 콜백(트랙 번호, {소스명: 조각}) - 확정된 구간을 시간 순서대로 받음 (인코딩 파이프라인용)
+        info: dict를 넘기면 skipped_seconds(트랙별 리스트)를 채워줌
+        """
+        model = self.load()
+        if isinstance(model, BagOfModels):
+            members = list(zip(model.models, model.weights))
+        else:
+            members = [(model, [1.0] * len(model.sources))]
+
+        # demucs CLI와 동일한 정규화
+        stats = []
+        for wav in wavs:
+            ref = wav.mean(0)
+            stats.append((ref.mean(), ref.std() + 1e-8))
+        mixes = [(wav - mean) / std for wav, (mean, std) in zip(wavs, stats)]
+
+        estimates = [0.0] * len(wavs)
+        totals = [0.0] * len(model.sources)
+        # 단일 모델이면 세그먼트가 끝나는 대로 확정 구간을 sink로 전달
+        on_final = None
+        if sink is not None and len(members) == 1:
+            def sink_final(index, chunk):
+                mean, std = stats[index]
+                sink(index, dict(zip(model.sources, chunk * std + mean)))
+            on_final = sink_final
+
+        skipped = None
+        for m, (sub_model, weights) in enumerate(members):
+            member_progress = None
+            if progress is not None:
+                member_progress = (lambda d, t, m=m: progress(m * t + d, len(members) * t))
+            outs, member_skipped = self._run_segments(sub_model, mixes, max_batch_segments,
+                                                      member_progress, on_final, stats, shifts)
+            if skipped is None:
+                skipped = member_skipped
+            scale = torch.tensor(weights, dtype=torch.float32)[:, None, None]
+            for i, out in enumerate(outs):
+                estimates[i] = estimates[i] + out * scale
+            totals = [t + w for t, w in zip(totals, weights)]
+        totals = torch.tensor(totals, dtype=torch.float32)[:, None, None]
+
+        results = []
+        for index, (est, (mean, std)) in enumerate(zip(estimates, stats)):
+            est = est / totals * std + mean
+            results.append(dict(zip(model.sources, est)))
+            if sink is not None and on_final is None:
+                sink(index, results[-1])
+        if info is not None:
+            info["skipped_seconds"] = [n / model.samplerate for n in skipped]
+        return results
+
+    def _run_segments(self, model, mixes, max_batch_segments, progress=None, on_final=None,
+                      stats=None, shifts=None):
+        """세그먼트 목록을 배치로 묶어 실행하고 트랙별 [소스, 채널, 샘플] 텐서로 복원
+
+        on_final: 콜백(트랙 번호, [소스, 채널, 샘플]) - 더 이상 바뀌지 않는 구간을 순서대로 전달
+        stats: 트랙별 정규화 (mean, std) - 무음 판단을 원래 레벨로 하기 위해 사용
+        반환: (트랙별 결과, 트랙별 모델을 건너뛴 샘플 수)
+        """
+        segment = model.segment
+        if self.segment is not None:
+            segment = float(self.segment)
+            if isinstance(model, HTDemucs):
+                # Transformer 모델은 학습 길이보다 긴 세그먼트 불가
+                segment = min(segment, float(model.segment))
+        segment_length = int(model.samplerate * segment)
+        stride = int((1 - self.overlap) * segment_length)
+        if hasattr(model, "valid_length"):
+            valid_length = model.valid_length(segment_length)
+        else:
+            valid_length = segment_length
+        weight = torch.cat([torch.arange(1, segment_length // 2 + 1),
+                            torch.arange(segment_length - segment_length // 2, 0, -1)]).float()
+        weight = weight / weight.max()
+
+        tracks = []
+        chunks = []
+        silent = []
+        skipped = [0] * len(mixes)
+        if shifts is None:
+            shifts = self.shifts
+        max_shift = int(0.5 * model.samplerate) if shifts else 0
+        for index, mix in enumerate(mixes):
+            length = mix.shape[-1]
+            # 랜덤 shift (apply_model의 shifts=1과 동일)
+            padded = TensorChunk(mix).padded(length + 2 * max_shift)
+            offset = random.randint(0, max_shift)
+            shifted = TensorChunk(padded, offset, length + max_shift - offset)
+            out = torch.zeros(len(model.sources), mix.shape[0], shifted.length)
+            sum_weight = torch.zeros(shifted.length)
+            tracks.append((out, sum_weight, max_shift - offset, length))
+            frame_rms = None
+            if self.silence_db is not None and stats is not None:
+                frame_rms = self._frame_rms(padded, *stats[index])
+                floor = 10 ** (self.silence_db / 20)
+            for start in range(0, shifted.length, stride):
+                chunk = TensorChunk(shifted, start, segment_length)
+                chunks.append((index, start, chunk))
+                is_silent = False
+                if frame_rms is not None:
+                    lo = (offset + start) // ACTIVITY_FRAME
+                    hi = -(-(offset + start + chunk.length) // ACTIVITY_FRAME)
+                    is_silent = bool(frame_rms[lo:hi].max() < floor)
+                silent.append(is_silent)
+                if is_silent:
+                    # 겹치는 구간은 빼고 새로 덮는 길이만 셈 (원래 트랙 범위 안에서)
+                    begin = max(start, max_shift - offset)
+                    end = min(start + min(stride, chunk.length), max_shift - offset + length)
+                    skipped[index] += max(0, end - begin)
+
+        # 각 세그먼트 다음에 오는 같은 트랙 세그먼트의 시작점 = 그 전까지는 확정
+        final_upto = []
+        for i, (index, _, _) in enumerate(chunks):
+            if i + 1 < len(chunks) and chunks[i + 1][0] == index:
+                final_upto.append(chunks[i + 1][1])
+            else:
+                final_upto.append(tracks[index][0].shape[-1])
+        emitted = [trim for _, _, trim, _ in tracks]
+
+        if progress is not None:
+            progress(0, len(chunks))
+        batch_size = max(1, max_batch_segments)
+        b = 0
+        while b < len(chunks):
+            # 무음 세그먼트는 가중치만 더하고(출력 0) 모델에 넣을 세그먼트로 배치를 채움
+            batch = []
+            end = b
+            while end < len(chunks) and len(batch) < batch_size:
+                index, start, chunk = chunks[end]
+                if silent[end]:
+                    tracks[index][1][start:start + chunk.length] += weight[:chunk.length]
+                else:
+                    batch.append(chunks[end])
+                end += 1
+            if batch:
+                x = torch.stack([chunk.padded(valid_length) for _, _, chunk in batch])
+                with torch.no_grad(), self._autocast():
+                    y = model(x.to(self.device)).float().cpu()
+                for (index, start, chunk), y_i in zip(batch, y):
+                    out, sum_weight, _, _ = tracks[index]
+                    y_i = center_trim(y_i, chunk.length)
+                    out[..., start:start + chunk.length] += weight[:chunk.length] * y_i
+                    sum_weight[start:start + chunk.length] += weight[:chunk.length]
+            if on_final is not None:
+                last_in_batch = {}
+                for i in range(b, end):
+                    last_in_batch[chunks[i][0]] = final_upto[i]
+                for index, upto in last_in_batch.items():
+                    out, sum_weight, trim, length = tracks[index]
+                    hi = min(upto, trim + length)
+                    lo = emitted[index]
+                    if hi > lo:
+                        on_final(index, out[..., lo:hi] / sum_weight[lo:hi])
+                        emitted[index] = hi
+            if progress is not None:
+                progress(end, len(chunks))
+            b = end
+
+        results = []
+        for out, sum_weight, trim, length in tracks:
+            out /= sum_weight
+            results.append(out[..., trim:trim + length])
+        return results, skipped
+
+    @staticmethod
+    def _frame_rms(mix, mean, std):
+        """정규화된 믹스 → 원래 레벨의 프레임별 RMS (채널 평균, 한 번의 텐서 연산)"""
+        power = (mix * std + mean).pow(2).mean(0)
+        pad = -power.shape[-1] % ACTIVITY_FRAME
+        power = torch.nn.functional.pad(power, (0, pad))
+        return power.view(-1, ACTIVITY_FRAME).mean(1).sqrt()
+
+    def save_stems(self, sources, out_dir, stems=2, output_format="wav", bitrate=None):
+        """분리 결과를 demucs CLI와 같은 파일 구성으로 저장"""
+        writer = StemWriter(out_dir, self.samplerate, output_format, bitrate)
+        writer.write(combine_stems(sources, stems))
+        return writer.close()
+
+    def separate_span(self, wav, start, end, context=1.0, progress=None, info=None):
+        """[start, end) 샘플 구간만 분리 (앞뒤 context초를 같이 넣고 잘라냄)"""
+        pad = int(context * self.samplerate)
+        lo = max(0, start - pad)
+        hi = min(wav.shape[-1], end + pad)
+        out = self.separate_tensor(wav[..., lo:hi], progress=progress, info=info)
+        return {name: source[..., start - lo:end - lo] for name, source in out.items()}
+
+    def separate_with_reuse(self, wav, reuse_start, reuse_sources, fade=1.0, context=1.0,
+                            progress=None, info=None):
+        """이미 분리된 구간(reuse_start부터 reuse_sources)은 재사용하고 나머지만 분리해서 이어 붙임
+
+        경계는 fade초 동안 양쪽 결과를 크로스페이드 (미리듣기 → 전체 결과 업그레이드용)
+        """
+        length = wav.shape[-1]
+        names = list(reuse_sources)
+        known = torch.stack([reuse_sources[name] for name in names])
+        start = min(reuse_start, length)
+        end = min(start + known.shape[-1], length)
+        known = known[..., :end - start]
+        f = min(int(fade * self.samplerate), (end - start) // 2)
+
+        spans = []
+        if start > 0:
+            spans.append((0, min(length, start + f)))
+        if end < length:
+            spans.append((max(0, end - f), length))
+        total = sum(hi - lo for lo, hi in spans)
+        done = 0
+        parts = []
+        skipped = 0.0
+        for lo, hi in spans:
+            span_progress = None
+            if progress is not None:
+                span_progress = (lambda d, t, lo=lo, hi=hi, base=done:
+                                 progress(base + (hi - lo) * d // max(t, 1), total))
+            span_info = {}
+            out = self.separate_span(wav, lo, hi, context, progress=span_progress, info=span_info)
+            parts.append(torch.stack([out[name] for name in names]))
+            skipped += span_info["skipped_seconds"]
+            done += hi - lo
+
+        result = torch.zeros(len(names), wav.shape[0], length)
+        result[..., start:end] = known
+        fade_in = torch.linspace(0, 1, f + 2)[1:-1]
+        if start > 0:
+            left = parts.pop(0)
+            result[..., :start] = left[..., :start]
+            result[..., start:start + f] = left[..., start:] * (1 - fade_in) + known[..., :f] * fade_in
+        if end < length:
+            right = parts.pop(0)
+            result[..., end - f:end] = known[..., known.shape[-1] - f:] * (1 - fade_in) + right[..., :f] * fade_in
+            result[..., end:] = right[..., f:]
+        if info is not None:
+            info["skipped_seconds"] = skipped
+            info["reused_seconds"] = (end - start - 2 * f) / self.samplerate
+        return dict(zip(names, result))
+
+    def separate_to_dir(self, audio_path, out_dir, stems=2, max_batch_segments=1, progress=None,
+                        output_format="wav", bitrate=None, trace=None, reuse=None):
+        """파일 하나를 읽고 분리해서 저장 (인코딩은 추론과 겹쳐서 진행)
+
+        trace: core.metrics.RunTrace - decode / inference / write 단계 시간 기록
+        (write는 추론이 끝난 뒤 남은 인코딩을 기다린 시간)
+        reuse: (시작 샘플, {소스명: 텐서}) - 이미 분리된 구간 (separate_with_reuse 참고)
+        """
+        stage = trace.stage if trace is not None else nullcontext
+        with stage("decode"):
+            wav = self.load_audio(audio_path)
+        if trace is not None:
+            trace.audio_seconds = wav.shape[-1] / self.samplerate
+        writer = StemWriter(out_dir, self.samplerate, output_format, bitrate)
+        info = {}
+        try:
+            with stage("inference"):
+                if reuse is not None:
+                    sources = self.separate_with_reuse(wav, *reuse, progress=progress, info=info)
+                    writer.write(combine_stems(sources, stems))
+                else:
+                    self.separate_tensor(wav, max_batch_segments=max_batch_segments,
+                                         progress=progress, info=info,
+                                         sink=lambda sources: writer.write(combine_stems(sources,
+                                                                                         stems)))
+        finally:
+            with stage("write"):
+                writer.close()
+        if trace is not None:
+            trace.info["skipped_seconds"] = info.get("skipped_seconds", 0.0)
+            if "reused_seconds" in info:
+                trace.info["reused_seconds"] = info["reused_seconds"]
+        return Path(out_dir)
+
+
+    def _separate_window(self, window_wav, pos, names, reuse, fade, context, info):
+        """스트리밍 윈도우 하나 분리 → [소스, 채널, 샘플] (reuse 구간은 모델 대신 재사용)
+
+        reuse 구간 안쪽(경계 fade 제외)은 모델을 돌리지 않고, 경계 fade 구간은 모델 결과와
+        크로스페이드 (separate_with_reuse와 같은 이음새). info에 skipped / reused 샘플 수를 기록
+        """
+        length = window_wav.shape[-1]
+        if reuse is not None:
+            start, known = reuse
+            end = start + known.shape[-1]
+            t = torch.arange(pos, pos + length, dtype=torch.float32)
+            left = ((t - start + 1) / (fade + 1)).clamp(0, 1) if start > 0 else (t >= start).float()
+            weight = torch.minimum(left, ((end - t) / (fade + 1)).clamp(0, 1))
+            inner = torch.nonzero(weight == 1).flatten()
+        if reuse is None or not inner.numel():
+            out = self.separate_tensor(window_wav, info=info)
+            chunk = torch.stack([out[name] for name in names])
+            inner_lo = inner_hi = 0
+        else:
+            inner_lo, inner_hi = int(inner[0]), int(inner[-1]) + 1
+            chunk = torch.zeros(len(names), window_wav.shape[0], length)
+            skipped = 0.0
+            for lo, hi in ((0, inner_lo), (inner_hi, length)):
+                if hi > lo:
+                    span_info = {}
+                    out = self.separate_span(window_wav, lo, hi, context, info=span_info)
+                    chunk[..., lo:hi] = torch.stack([out[name] for name in names])
+                    skipped += span_info["skipped_seconds"]
+            info["skipped_seconds"] = skipped
+        if reuse is not None:
+            lo = max(start - pos, 0)
+            hi = min(end - pos, length)
+            if hi > lo:
+                w = weight[lo:hi]
+                chunk[..., lo:hi] = (chunk[..., lo:hi] * (1 - w)
+                                     + known[..., pos + lo - start:pos + hi - start] * w)
+        info["reused"] = (inner_lo, inner_hi)
+        return chunk
+
+    def iter_stream(self, audio_path, window_seconds=30.0, overlap_seconds=5.0, progress=None,
+                    info=None, reuse=None, fade=1.0, context=1.0):
+        """긴 트랙을 윈도우 단위로 디코딩 → 분리 → 크로스페이드해서 순서대로 yield
+
+        한 번에 메모리에 올라가는 건 윈도우 하나 분량뿐이라 트랙 길이와 상관없이 메모리가 일정함
+        yield: {소스명: [채널, 샘플] 텐서} (이어 붙이면 전체 결과)
+        info: dict를 넘기면 skipped_seconds / reused_seconds를 누적 (윈도우 겹침은 내보낸 만큼만 셈)
+        reuse: (시작 샘플, {소스명: 텐서}) - 이미 분리된 구간 (미리듣기), 그 구간은 다시 계산하지 않고
+        경계를 fade초 동안 크로스페이드 (separate_with_reuse와 같음)
+        """
+        samplerate = self.samplerate
+        channels = self.audio_channels
+        window = int(window_seconds * samplerate)
+        overlap = int(overlap_seconds * samplerate)
+        if not 0 < overlap < window:
+            raise ValueError("overlap_seconds는 0보다 크고 window_seconds보다 작아야 합니다")
+        hop = window - overlap
+        fade_in = torch.linspace(0, 1, overlap + 2)[1:-1]
+        fade_out = 1 - fade_in
+        names = list(self.sources)
+        if reuse is not None:
+            start, sources = reuse
+            known = torch.stack([sources[name] for name in names])
+            reuse = (start, known)
+            fade = min(int(fade * samplerate), known.shape[-1] // 2)
+
+        total = None
+        if progress is not None:
+            try:
+                total = int(AudioFile(Path(audio_path)).duration * samplerate)
+            except Exception:
+                total = None
+
+        blocks = self.iter_audio_blocks(audio_path, hop)
+        pending = torch.zeros(channels, 0)
+        tail = None
+        emitted = 0
+        pos = 0  # pending 첫 샘플의 트랙 내 위치
+        eof = False
+        while True:
+            while pending.shape[-1] < window and not eof:
+                block = next(blocks, None)
+                if block is None:
+                    eof = True
+                else:
+                    pending = torch.cat([pending, block], dim=-1)
+
+            if pending.shape[-1] == 0:
+                return
+            if eof and tail is not None and pending.shape[-1] <= overlap:
+                # 남은 입력은 이전 윈도우의 겹침 구간뿐 → 보관해둔 꼬리를 그대로 내보냄
+                yield dict(zip(names, tail[..., :pending.shape[-1]]))
+                return
+
+            window_info = {}
+            chunk = self._separate_window(pending[..., :window], pos, names, reuse, fade, context,
+                                          window_info)
+            if tail is not None:
+                n = min(overlap, chunk.shape[-1])
+                chunk[..., :n] = tail[..., :n] * fade_out[:n] + chunk[..., :n] * fade_in[:n]
+
+            last = eof and pending.shape[-1] <= window
+            emit = chunk if last else chunk[..., :hop]
+            emitted += emit.shape[-1]
+            if info is not None:
+                info["skipped_seconds"] = (info.get("skipped_seconds", 0.0)
+                                           + window_info["skipped_seconds"]
+                                           * emit.shape[-1] / chunk.shape[-1])
+                inner_lo, inner_hi = window_info["reused"]
+                reused = max(0, min(inner_hi, emit.shape[-1]) - inner_lo)
+                if reused:
+                    info["reused_seconds"] = info.get("reused_seconds", 0.0) + reused / samplerate
+            if progress is not None:
+                progress(emitted, max(total or 0, emitted))
+            yield dict(zip(names, emit))
+            if last:
+                return
+            tail = chunk[..., hop:]
+            pending = pending[..., hop:]
+            pos += hop
+
+    def stream_to_dir(self, audio_path, out_dir, stems=2, window_seconds=30.0,
+                      overlap_seconds=5.0, progress=None, output_format="wav",
+                      bitrate=None, trace=None, reuse=None):
+        """iter_stream 결과를 스템별 파일에 이어서 기록 (메모리 일정)
+
+        trace: 디코딩/추론이 윈도우 단위로 섞여 있어서 stream 단계 하나로 기록
+        reuse: (시작 샘플, {소스명: 텐서}) - 이미 분리된 구간 (iter_stream 참고)
+        """
+        stage = trace.stage if trace is not None else nullcontext
+        writer = StemWriter(out_dir, self.samplerate, output_format, bitrate)
+        frames = 0
+        info = {}
+        try:
+            with stage("stream"):
+                for sources in self.iter_stream(audio_path, window_seconds, overlap_seconds,
+                                                progress, info, reuse=reuse):
+                    frames += next(iter(sources.values())).shape[-1]
+                    writer.write(combine_stems(sources, stems))
+        finally:
+            with stage("write"):
+                writer.close()
+        if trace is not None:
+            trace.audio_seconds = frames / self.samplerate
+            trace.info["skipped_seconds"] = info.get("skipped_seconds", 0.0)
+            if "reused_seconds" in info:
+                trace.info["reused_seconds"] = info["reused_seconds"]
+        return Path(out_dir)
+
+    def live_window_seconds(self):
+        """실시간 모드 윈도우 최대 길이(초) - 세그먼트 하나(stride 이하)에 들어가야 forward 1회"""
+        model = self.load()
+        members = model.models if isinstance(model, BagOfModels) else [model]
+        segment = min(float(m.segment) for m in members)
+        if self.segment is not None:
+            segment = min(segment, float(self.segment))
+        return (1 - self.overlap) * segment
+
+    def iter_live(self, blocks, block_seconds=1.0, lookahead_seconds=0.5, context_seconds=None,
+                  crossfade_seconds=0.05, info=None):
+        """실시간 입력 블록을 받아 block_seconds 단위로 분리 결과를 바로 yield
+
+        blocks: [채널, 샘플] 텐서 iterator (모델 샘플레이트, 크기는 제각각이어도 됨)
+        윈도우 = 과거 context + 새 블록 + 미래 lookahead → forward 한 번에 블록 하나 확정
+        알고리즘 지연 = block_seconds + lookahead_seconds (처리 시간 제외)
+        context_seconds: None이면 윈도우가 모델 세그먼트를 꽉 채우도록 (어차피 세그먼트 길이만큼 계산함)
+        블록당 비용은 블록 길이와 상관없이 세그먼트 하나 forward (htdemucs 7.8초 분량)
+        → RTF ≈ forward 시간 / block_seconds, 실시간을 따라가려면 블록이 forward 시간보다 길어야 함
+        (하드웨어별 값은 python bench/run.py run --engines live --live-blocks 1 2 4로 측정)
+        이전 윈도우의 lookahead 예측과 crossfade_seconds만큼 겹쳐서 블록 경계를 이음
+        info: dict를 넘기면 blocks / deadline_misses / processing_seconds / last_block_seconds /
+        max_block_seconds / rtf / latency_seconds / skipped_seconds를 블록마다 갱신
+        (블록 처리 시간이 블록 길이를 넘으면 deadline miss - 실시간을 따라가지 못한 블록)
+        """
+        samplerate = self.samplerate
+        channels = self.audio_channels
+        hop = int(block_seconds * samplerate)
+        lookahead = int(lookahead_seconds * samplerate)
+        max_window = int(self.live_window_seconds() * samplerate)
+        if context_seconds is None:
+            context = max_window - hop - lookahead
+        else:
+            context = int(context_seconds * samplerate)
+        window = context + hop + lookahead
+        fade = min(int(crossfade_seconds * samplerate), lookahead)
+        if hop <= 0 or context < 0 or lookahead < 0:
+            raise ValueError("block_seconds는 0보다 크고 context/lookahead는 0 이상이어야 합니다")
+        if window > max_window:
+            raise ValueError(f"context + block + lookahead가 {max_window / samplerate:.2f}초를 넘을 수 "
+                             f"없습니다 (모델 세그먼트 하나에 들어가야 함)")
+        fade_in = torch.linspace(0, 1, fade + 2)[1:-1]
+        fade_out = 1 - fade_in
+        deadline = hop / samplerate
+
+        stats = info if info is not None else {}
+        stats.update(blocks=0, deadline_misses=0, processing_seconds=0.0, last_block_seconds=0.0,
+                     max_block_seconds=0.0, rtf=0.0, skipped_seconds=0.0,
+                     latency_seconds=(hop + lookahead) / samplerate)
+        logger.info(f"🎙️ 실시간 분리: 블록 {hop / samplerate:.2f}초 · lookahead "
+                    f"{lookahead / samplerate:.2f}초 · context {context / samplerate:.2f}초")
+
+        # buffer[0]은 다음에 내보낼 블록보다 context만큼 앞 (시작 전은 무음으로 채움)
+        blocks = iter(blocks)
+        buffer = torch.zeros(channels, context)
+        received = 0
+        emitted = 0
+        tail = None
+        eof = False
+        while True:
+            while buffer.shape[-1] < window and not eof:
+                block = next(blocks, None)
+                if block is None:
+                    eof = True
+                else:
+                    received += block.shape[-1]
+                    buffer = torch.cat([buffer, block.float()], dim=-1)
+            if buffer.shape[-1] < window:
+                # 입력이 끝남 → 모자란 lookahead는 무음으로
+                buffer = torch.cat([buffer, torch.zeros(channels, window - buffer.shape[-1])],
+                                   dim=-1)
+            remaining = received - emitted
+            if remaining <= 0:
+                return
+
+            start = time.perf_counter()
+            window_info = {}
+            out = self.separate_tensor(buffer[..., :window], info=window_info, shifts=0)
+            chunk = torch.stack(list(out.values()))
+            emit = chunk[..., context:context + min(hop, remaining)]
+            if tail is not None and fade:
+                n = min(fade, emit.shape[-1])
+                emit[..., :n] = tail[..., :n] * fade_out[:n] + emit[..., :n] * fade_in[:n]
+            tail = chunk[..., context + hop:context + hop + fade]
+            elapsed = time.perf_counter() - start
+
+            emitted += emit.shape[-1]
+            stats["blocks"] += 1
+            stats["processing_seconds"] += elapsed
+            stats["last_block_seconds"] = elapsed
+            stats["max_block_seconds"] = max(stats["max_block_seconds"], elapsed)
+            stats["rtf"] = stats["processing_seconds"] / (emitted / samplerate)
+            stats["skipped_seconds"] += window_info["skipped_seconds"] * hop / window
+            if elapsed > deadline:
+                stats["deadline_misses"] += 1
+                logger.warning(f"⏰ 데드라인 초과: 블록 {stats['blocks']} 처리 {elapsed:.2f}초 "
+                               f"> {deadline:.2f}초 (block_seconds를 {elapsed:.1f}초 이상으로)")
+            yield dict(zip(out.keys(), emit))
+            buffer = buffer[..., hop:]
+
+def combine_stems(sources, stems=2):
+    """2-stem 모드면 vocals / no_vocals(나머지 합)로 묶음"""
+    if stems != 2:
+        return sources
+    vocals = sources["vocals"]
+    rest = sum(wav for name, wav in sources.items() if name != "vocals")
+    return {"vocals": vocals, "no_vocals": rest}
+
@@ -0,0 +1,206 @@
+"""
+Muing Core - 분석용 스펙트럼 특징 저장소
+스템별 모노 신호 / STFT 크기 / mel 파워 / onset 세기를 한 번만 계산해서 memory-map 파일로 보관
+멜로디, 코드, 리듬 등 분석 모듈이 같은 특징을 다시 계산하지 않고 공유
+
+키: 스템 내용 해시 + 특징 이름 + 파라미터 → <root>/<특징>-<키>.f32 (+ .json 모양 정보)
+의존 관계: onset ← mel ← stft ← audio (필요한 것만 그때그때 계산)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from core.cache import file_hash
+from core.encoding import read_mono
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_FEATURE_DIR = PROJECT_ROOT / "separated" / "features"
+DEFAULT_MAX_GB = float(os.environ.get("MUING_FEATURE_CACHE_GB", "5"))
+FEATURE_VERSION = 1
+
+# 분석 기본 파라미터 (librosa 기본값과 같음)
+SAMPLERATE = 22050
+N_FFT = 2048
+HOP = 512
+N_MELS = 128
+
+# rfft 한 번에 넣는 프레임 수 (메모리 일정하게)
+FRAME_BATCH = 1024
+
+
+class FeatureStore:
+    """스템 특징 캐시 (크기 제한 LRU, 읽기 전용 memmap 반환)
+
+    hits / misses: 특징 이름별 적중 / 계산 횟수
+    metrics: core.metrics.Metrics - 있으면 조회 결과를 카운터로도 기록
+    """
+
+    def __init__(self, root=None, max_bytes=None, metrics=None):
+        self.root = Path(root) if root else DEFAULT_FEATURE_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes if max_bytes is not None else DEFAULT_MAX_GB * 1024 ** 3)
+        self.metrics = metrics
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def path_for(self, feature, stem_path, **params):
+        payload = {"v": FEATURE_VERSION, "audio": file_hash(stem_path), "params": params}
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:24]
+        return self.root / f"{feature}-{key}.f32"
+
+    def stats(self):
+        """{특징: {"hits": n, "misses": n}}"""
+        with self._lock:
+            return {name: {"hits": self.hits.get(name, 0), "misses": self.misses.get(name, 0)}
+                    for name in sorted(set(self.hits) | set(self.misses))}
+
+    def _count(self, feature, hit):
+        with self._lock:
+            table = self.hits if hit else self.misses
+            table[feature] = table.get(feature, 0) + 1
+        if self.metrics is not None:
+            self.metrics.inc("feature_lookups_total", help="특징 저장소 조회 수",
+                             feature=feature, result="hit" if hit else "miss")
+
+    def _get(self, feature, stem_path, params, compute):
+        """있으면 memmap, 없으면 compute(params) → (모양, 블록 iterator)로 파일에 기록 후 memmap"""
+        path = self.path_for(feature, stem_path, **params)
+        with self._lock:
+            building = self._building.setdefault(path.name, threading.Lock())
+        # 같은 특징을 여러 스레드가 동시에 요청하면 한 번만 계산
+        try:
+            with building:
+                if path.exists():
+                    self._count(feature, True)
+                    os.utime(path)  # LRU 갱신
+                else:
+                    self._count(feature, False)
+                    self._write(path, *compute())
+        finally:
+            with self._lock:
+                # 끝난 키의 lock은 정리 (이미 받아 간 스레드는 그 lock으로 기다린 뒤 파일을 확인)
+                if self._building.get(path.name) is building:
+                    del self._building[path.name]
+        return self.open(path)
+
+    def open(self, path):
+        info = json.loads(path.with_suffix(".json").read_text())
+        shape = tuple(info["shape"])
+        if 0 in shape:
+            return np.zeros(shape, dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=shape)
+
+    def _write(self, path, shape, blocks):
+        """블록 단위로 계산 결과를 파일에 바로 기록 (전체를 메모리에 올리지 않음)"""
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}.f32"
+        try:
+            with open(tmp, "wb") as f:
+                for block in blocks:
+                    f.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+            path.with_suffix(".json").write_text(json.dumps({"shape": list(shape)}))
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.evict()
+
+    def audio(self, stem_path, samplerate=SAMPLERATE):
+        """모노 float32 신호 [샘플] (FFmpeg 디코딩 1회)"""
+        def compute():
+            audio = read_mono(stem_path, samplerate)
+            return audio.shape, [audio]
+        return self._get("audio", stem_path, {"sr": samplerate}, compute)
+
+    def stft(self, stem_path, samplerate=SAMPLERATE, n_fft=N_FFT, hop=HOP):
+        """STFT 크기 [프레임, n_fft // 2 + 1] - 프레임 i의 중심은 i * hop 샘플 (Hann 창)"""
+        def compute():
+            audio = self.audio(stem_path, samplerate)
+            padded = np.pad(np.asarray(audio), n_fft // 2)
+            frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop]
+            window = np.hanning(n_fft).astype(np.float32)
+
+            def blocks():
+                for start in range(0, len(frames), FRAME_BATCH):
+                    yield np.abs(np.fft.rfft(frames[start:start + FRAME_BATCH] * window, axis=1))
+            return (len(frames), n_fft // 2 + 1), blocks()
+        return self._get("stft", stem_path, {"sr": samplerate, "n_fft": n_fft, "hop": hop},
+                         compute)
+
+    def mel(self, stem_path, samplerate=SAMPLERATE, n_fft=N_FFT, hop=HOP, n_mels=N_MELS):
+        """mel 파워 스펙트로그램 [프레임, n_mels]"""
+        def compute():
+            import librosa
+
+            spectrum = self.stft(stem_path, samplerate, n_fft, hop)
+            basis = librosa.filters.mel(sr=samplerate, n_fft=n_fft, n_mels=n_mels).T
+
+            def blocks():
+                for start in range(0, len(spectrum), FRAME_BATCH):
+                    yield np.square(spectrum[start:start + FRAME_BATCH]) @ basis
+            return (len(spectrum), n_mels), blocks()
+        return self._get("mel", stem_path,
+                         {"sr": samplerate, "n_fft": n_fft, "hop": hop, "n_mels": n_mels}, compute)
+
+    def onset(self, stem_path, samplerate=SAMPLERATE, n_fft=N_FFT, hop=HOP, n_mels=N_MELS):
+        """onset 세기 [프레임] - 로그 mel의 증가분(spectral flux) 평균"""
+        def compute():
+            mel = np.asarray(self.mel(stem_path, samplerate, n_fft, hop, n_mels))
+            db = 10 * np.log10(np.maximum(mel, 1e-10))
+            if len(db):
+                db = np.maximum(db, db.max() - 80.0)
+            flux = np.zeros(len(db), dtype=np.float32)
+            flux[1:] = np.maximum(db[1:] - db[:-1], 0.0).mean(axis=1)
+            return flux.shape, [flux]
+        return self._get("onset", stem_path,
+                         {"sr": samplerate, "n_fft": n_fft, "hop": hop, "n_mels": n_mels}, compute)
+
+    def _entries(self):
+        """저장된 특징 파일 (쓰는 중인 .tmp-* 파일은 제외)"""
+        return [p for p in self.root.glob("*.f32") if not p.name.startswith(".")]
+
+    def total_size(self):
+        return sum(p.stat().st_size for p in self._entries())
+
+    def evict(self):
+        """용량 초과분을 오래 안 쓴 특징부터 삭제 (가장 최근 항목은 유지)"""
+        with self._lock:
+            items = sorted(self._entries(), key=lambda p: p.stat().st_mtime, reverse=True)
+            total = sum(p.stat().st_size for p in items)
+            removed = 0
+            while len(items) > 1 and total > self.max_bytes:
+                oldest = items.pop()
+                total -= oldest.stat().st_size
+                oldest.unlink(missing_ok=True)
+                oldest.with_suffix(".json").unlink(missing_ok=True)
+                removed += 1
+            if removed:
+                logger.info(f"🧹 특징 저장소 정리: {removed}개 삭제")
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """프로세스 공용 특징 저장소 (분석 모듈 기본값)"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = FeatureStore()
+        return _default_store
@@ -0,0 +1,436 @@
+"""
+Muing Core - 디렉토리 일괄 분리 (야간 백카탈로그 작업용)
+입력 디렉토리 트리의 음원을 전부 분리해서 출력 디렉토리에 같은 구조로 저장
+
+- 작업 목록(manifest.db, SQLite): 파일별 pending / running / done / failed 상태를 기록
+  → 중간에 죽어도 다시 실행하면 끝난 파일은 건너뛰고 이어서 처리 (running은 pending으로 되돌림)
+- 내용 해시 + 분리 설정(결과 캐시 키)이 같은 입력은 한 번만 처리 (중복 파일, 결과 캐시 적중)
+- 파이프라인: 디코딩 스레드 → (제한된 큐) → 추론 워커 N개 → 인코딩/저장 스레드
+  디코딩은 다음 파일을 미리 읽고, 인코딩은 StemWriter 스레드와 마무리 풀에서 추론과 겹쳐서 진행
+- 처리량(오디오 시간 / 벽시계 시간)을 파일이 끝날 때마다 기록
+
+사용법:
+    python -m core.ingest /music/catalog /music/stems --stems 2 --format flac --workers 2
+"""
+import logging
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.encoding import StemWriter, check_format
+from core.engine import combine_stems
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.db"
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".m4a", ".ogg", ".opus", ".aac", ".aiff", ".aif")
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    key TEXT,
+    status TEXT NOT NULL,
+    output TEXT,
+    audio_seconds REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS items_key ON items (key, status);
+"""
+
+
+class IngestManifest:
+    """일괄 분리 작업 목록 (입력 상대 경로별 상태)
+
+    key: 결과 캐시 키 (내용 해시 + 모델/스템/포맷 설정) - 같은 key가 done이면 다시 분리하지 않음
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def reset_running(self):
+        """이전 실행이 중단돼서 running으로 남은 항목을 pending으로 (반환: 항목 수)"""
+        with self._lock, self._db:
+            return self._db.execute("UPDATE items SET status = ? WHERE status = ?",
+                                    (PENDING, RUNNING)).rowcount
+
+    def get(self, path):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM items WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def find_done(self, key):
+        """같은 key로 이미 끝난 항목 (출력이 남아 있는 것만)"""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM items WHERE key = ? AND status = ?",
+                                    (key, DONE)).fetchall()
+        for row in rows:
+            if row["output"] and Path(row["output"]).exists():
+                return dict(row)
+        return None
+
+    def update(self, path, **fields):
+        """항목 하나 갱신 (없으면 생성)"""
+        fields["updated"] = time.time()
+        with self._lock, self._db:
+            self._db.execute("INSERT OR IGNORE INTO items (path, status) VALUES (?, ?)",
+                             (path, PENDING))
+            self._db.execute(
+                f"UPDATE items SET {', '.join(f'{name} = ?' for name in fields)} WHERE path = ?",
+                (*fields.values(), path))
+
+    def counts(self):
+        """{상태: 항목 수}"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Item:
+    """파이프라인을 따라 이동하는 파일 하나"""
+
+    def __init__(self, rel, path):
+        self.rel = rel
+        self.path = path
+        self.key = None
+        self.wav = None
+        self.trace = None  # 인프로세스 엔진일 때만 (CLI fallback은 separate()가 직접 계측)
+        self.audio_seconds = 0.0
+        self.staging = None
+        self.writer = None
+        self.owner = False  # 같은 key의 대기 항목들을 대신 처리하는 쪽
+
+
+class DirectoryIngest:
+    """입력 디렉토리 트리 → 출력 디렉토리 (<상대 경로에서 확장자 뺀 폴더>/<스템>.<포맷>)
+
+    separator: core.separator.MuingSeparator - 모델 / 결과 캐시 / 스케줄링 정책을 그대로 사용
+    workers: 동시에 추론하는 파일 수 (기본: 스케줄링 정책의 max_jobs)
+    decoders: 미리 해시 / 디코딩하는 스레드 수 (디코딩 결과는 workers개까지만 대기)
+    max_attempts: 실패한 파일을 다음 실행에서 다시 시도하는 최대 횟수
+    """
+
+    def __init__(self, separator, input_dir, output_dir, stems=2, output_format="wav",
+                 bitrate=None, workers=None, decoders=2, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 manifest=None, extensions=AUDIO_EXTENSIONS):
+        self.separator = separator
+        self.input_dir = Path(input_dir).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.stems = stems
+        self.output_format = check_format(output_format)
+        self.bitrate = bitrate
+        self.workers = max(1, workers or separator.scheduling.max_jobs)
+        self.decoders = max(1, decoders)
+        self.max_attempts = max_attempts
+        self.extensions = {ext.lower() for ext in extensions}
+        self.manifest = manifest or IngestManifest(self.output_dir / MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self._inflight = {}  # 처리 중인 key → 같은 내용을 기다리는 항목들
+        self._start = None
+        self.stats = {"total": 0, "done": 0, "skipped": 0, "failed": 0, "audio_seconds": 0.0}
+
+    def scan(self):
+        """입력 트리의 음원 파일 상대 경로 (정렬, 입력 안에 있는 출력 디렉토리는 제외)"""
+        return sorted(p.relative_to(self.input_dir).as_posix()
+                      for p in self.input_dir.rglob("*")
+                      if p.is_file() and p.suffix.lower() in self.extensions
+                      and self.output_dir not in p.parents)
+
+    def output_for(self, rel):
+        return self.output_dir / Path(rel).with_suffix("")
+
+    def throughput(self):
+        """오디오 시간 / 벽시계 시간 (1이면 실시간, 24면 하룻밤에 24시간 분량)"""
+        elapsed = time.time() - self._start if self._start else 0.0
+        return self.stats["audio_seconds"] / elapsed if elapsed > 0 else 0.0
+
+    def _is_done(self, rel, path):
+        """크기 / 수정 시각이 그대로고 출력이 남아 있는 완료 항목이면 해시 없이 건너뜀"""
+        row = self.manifest.get(rel)
+        if row is None:
+            return False
+        stat = path.stat()
+        if row["status"] == FAILED and row["attempts"] >= self.max_attempts:
+            if row["size"] == stat.st_size and row["mtime"] == stat.st_mtime:
+                return True
+        return (row["status"] == DONE and row["size"] == stat.st_size
+                and row["mtime"] == stat.st_mtime and bool(row["output"])
+                and Path(row["output"]).exists())
+
+    def run(self):
+        """트리 전체 처리 → {"total", "done", "skipped", "failed", "audio_seconds",
+        "wall_seconds", "audio_hours_per_hour"}"""
+        self._start = time.time()
+        resumed = self.manifest.reset_running()
+        if resumed:
+            logger.info(f"🔁 중단된 항목 {resumed}개를 다시 처리합니다")
+        for tmp in self.output_dir.glob(".tmp-*"):
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        todo = []
+        files = self.scan()
+        for rel in files:
+            path = self.input_dir / rel
+            if self._is_done(rel, path):
+                self.stats["skipped"] += 1
+            else:
+                todo.append(_Item(rel, path))
+        self.stats["total"] = len(files)
+        logger.info(f"📂 일괄 분리: {len(todo)}개 처리 / {self.stats['skipped']}개 건너뜀 "
+                    f"(추론 {self.workers}개 · 디코딩 {self.decoders}개 동시)")
+
+        inputs = queue.Queue()
+        for item in todo:
+            inputs.put(item)
+        for _ in range(self.decoders):
+            inputs.put(None)
+        # 디코딩이 추론보다 빠르면 여기서 막힘 → 메모리에는 workers개 분량만 대기
+        decoded = queue.Queue(maxsize=self.workers)
+        finisher = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="muing-ingest-write")
+
+        decoders = [threading.Thread(target=self._decode_loop, args=(inputs, decoded),
+                                     name=f"muing-ingest-decode-{i}", daemon=True)
+                    for i in range(self.decoders)]
+        workers = [threading.Thread(target=self._infer_loop, args=(decoded, finisher),
+                                    name=f"muing-ingest-infer-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for thread in decoders + workers:
+            thread.start()
+        for thread in decoders:
+            thread.join()
+        for _ in workers:
+            decoded.put(None)
+        for thread in workers:
+            thread.join()
+        finisher.shutdown(wait=True)
+
+        wall = time.time() - self._start
+        summary = dict(self.stats, wall_seconds=round(wall, 2),
+                       audio_hours_per_hour=round(self.throughput(), 3))
+        logger.info(f"🏁 일괄 분리 종료: 완료 {summary['done']} · 실패 {summary['failed']} · "
+                    f"건너뜀 {summary['skipped']} · 오디오 {summary['audio_seconds'] / 3600:.2f}시간 / "
+                    f"{wall / 3600:.2f}시간 ({summary['audio_hours_per_hour']:.2f}배)")
+        return summary
+
+    def _decode_loop(self, inputs, decoded):
+        while True:
+            item = inputs.get()
+            if item is None:
+                return
+            try:
+                if self._prepare(item):
+                    decoded.put(item)
+            except Exception as e:
+                self._fail(item, e)
+
+    def _prepare(self, item):
+        """해시 → 중복 / 캐시 적중이면 바로 완료, 아니면 디코딩 (반환: 추론이 필요한지)"""
+        sep = self.separator
+        stat = item.path.stat()
+        item.key = sep.cache_key(item.path, self.stems, self.output_format, self.bitrate)
+        row = self.manifest.get(item.rel) or {}
+        self.manifest.update(item.rel, size=stat.st_size, mtime=stat.st_mtime, key=item.key,
+                             status=RUNNING, attempts=row.get("attempts", 0) + 1, error=None)
+
+        with self._lock:
+            duplicate = self.manifest.find_done(item.key)
+            if duplicate is None and item.key in self._inflight:
+                # 같은 내용을 다른 워커가 처리 중 → 끝나면 그 결과를 같이 씀
+                self._inflight[item.key].append(item)
+                return False
+            if duplicate is None:
+                self._inflight[item.key] = []
+                item.owner = True
+        if duplicate is not None:
+            # 같은 내용이 이미 처리됨 (수정 시각만 바뀌었거나 다른 경로의 같은 파일) → 그 결과를 가리킴
+            if duplicate["path"] != item.rel:
+                logger.info(f"♻️ 중복 입력: {item.rel} = {duplicate['path']}")
+            self._done(item, duplicate["output"], duplicate["audio_seconds"] or 0.0, count=False)
+            return False
+        cached = sep.cache.get(item.key)
+        if cached is not None:
+            # 웹 앱 등에서 이미 분리한 결과 → 복사만
+            out = self._publish(item, cached, copy=True)
+            meta = sep.cache.read_meta(cached)
+            self._done(item, out, meta.get("audio_seconds") or 0.0, count=False)
+            return False
+
+        if sep.engine is not None:
+            item.trace = sep.start_trace(None, item.path, stems=self.stems,
+                                         format=self.output_format, mode="ingest")
+            with item.trace.stage("decode"):
+                # 파일마다 한 번만 읽으므로 PCM 캐시(대화형 작업과 공유)에 넣지 않음
+                item.wav = sep.engine.load_audio(item.path, cache=False)
+            item.audio_seconds = item.wav.shape[-1] / sep.engine.samplerate
+            item.trace.audio_seconds = item.audio_seconds
+        return True
+
+    def _infer_loop(self, decoded, finisher):
+        while True:
+            item = decoded.get()
+            if item is None:
+                return
+            try:
+                self._infer(item)
+                finisher.submit(self._finish, item)
+            except Exception as e:
+                if item.writer is not None:
+                    try:
+                        item.writer.close()
+                    except Exception:
+                        pass
+                if item.staging is not None:
+                    shutil.rmtree(item.staging, ignore_errors=True)
+                self._fail(item, e)
+
+    def _infer(self, item):
+        sep = self.separator
+        item.staging = self.output_dir / f".tmp-{uuid.uuid4().hex}"
+        if sep.engine is None:
+            # CLI fallback - separate()가 코어 슬롯 / 계측을 직접 처리 (슬롯은 재진입 불가라 밖에서 호출)
+            result = sep.separate(item.path, stems=self.stems,
+                                  output_format=self.output_format, bitrate=self.bitrate)
+            if result is None:
+                raise RuntimeError("분리 실패")
+            shutil.copytree(result, item.staging)
+            item.audio_seconds = sep.cache.read_meta(result).get("audio_seconds") or 0.0
+            return
+        trace = item.trace
+        with sep.cpu_slot(trace):
+            item.writer = StemWriter(item.staging, sep.engine.samplerate, self.output_format,
+                                     self.bitrate)
+            info = {}
+            with trace.stage("inference"):
+                sep.engine.separate_tensor(
+                    item.wav, info=info,
+                    sink=lambda sources: item.writer.write(combine_stems(sources, self.stems)))
+            trace.info["skipped_seconds"] = info.get("skipped_seconds", 0.0)
+        item.wav = None
+
+    def _finish(self, item):
+        """남은 인코딩을 기다리고 출력 위치로 옮긴 뒤 완료 기록 (추론 워커는 다음 파일로)"""
+        trace = item.trace
+        try:
+            if trace is None:
+                out = self._publish(item, item.staging)
+            else:
+                with trace.stage("write"):
+                    item.writer.close()
+                with trace.stage("store"):
+                    out = self._publish(item, item.staging)
+            self._done(item, out, item.audio_seconds)
+            if trace is not None:
+                self.separator.finish_trace(trace, out)
+        except Exception as e:
+            shutil.rmtree(item.staging, ignore_errors=True)
+            self._fail(item, e)
+
+    def _publish(self, item, src, copy=False):
+        """결과 디렉토리를 출력 위치에 확정 (같은 경로의 이전 결과는 교체)"""
+        out = self.output_for(item.rel)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if copy:
+            staging = self.output_dir / f".tmp-{uuid.uuid4().hex}"
+            shutil.copytree(src, staging)
+            src = staging
+        if out.exists():
+            shutil.rmtree(out)
+        shutil.move(str(src), str(out))
+        return out
+
+    def _done(self, item, output, audio_seconds, count=True):
+        self.manifest.update(item.rel, status=DONE, output=str(output),
+                             audio_seconds=audio_seconds, error=None)
+        with self._lock:
+            if count:
+                self.stats["done"] += 1
+                self.stats["audio_seconds"] += audio_seconds
+            else:
+                self.stats["skipped"] += 1
+            finished = self.stats["done"] + self.stats["failed"] + self.stats["skipped"]
+            total = self.stats["total"]
+        rate = self.throughput()
+        self.separator.metrics.set("ingest_audio_hours_per_hour", rate,
+                                   help="일괄 분리 처리량 (오디오 시간 / 벽시계 시간)")
+        logger.info(f"✅ [{finished}/{total}] {item.rel} · 처리량 {rate:.2f} 오디오시간/시간")
+        for waiting in self._release(item):
+            logger.info(f"♻️ 중복 입력: {waiting.rel} = {item.rel}")
+            self._done(waiting, output, audio_seconds, count=False)
+
+    def _fail(self, item, error):
+        logger.error(f"❌ 일괄 분리 실패: {item.rel}: {error}")
+        self.manifest.update(item.rel, status=FAILED, error=str(error))
+        with self._lock:
+            self.stats["failed"] += 1
+        if item.trace is not None:
+            self.separator.finish_trace(item.trace, None)
+        for waiting in self._release(item):
+            self._fail(waiting, error)
+
+    def _release(self, item):
+        """item이 처리하던 key를 기다리던 항목들 (item이 처리 담당이 아니면 빈 목록)"""
+        if not item.owner:
+            return []
+        item.owner = False
+        with self._lock:
+            return self._inflight.pop(item.key, [])
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from core.scheduling import SchedulingPolicy, available_cores
+    from core.separator import MuingSeparator
+
+    parser = argparse.ArgumentParser(description="디렉토리 트리 일괄 분리 (중단 후 이어서 실행 가능)")
+    parser.add_argument("input_dir", help="입력 디렉토리")
+    parser.add_argument("output_dir", help="출력 디렉토리 (manifest.db도 여기에 저장)")
+    parser.add_argument("--stems", type=int, default=2, choices=[2, 4])
+    parser.add_argument("--format", default="wav", help="출력 포맷 (wav/flac/opus/f16/s16)")
+    parser.add_argument("--bitrate", type=int, default=None, help="Opus 비트레이트 (kbps)")
+    parser.add_argument("--workers", type=int, default=None, help="동시 추론 파일 수")
+    parser.add_argument("--decoders", type=int, default=2, help="미리 디코딩하는 스레드 수")
+    parser.add_argument("--precision", default="fp32", help="fp32 / bf16 / int8")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    scheduling = None
+    if args.workers:
+        # 추론 워커마다 코어를 나눠서 과다 구독 방지
+        threads = max(1, len(available_cores()) // args.workers)
+        scheduling = SchedulingPolicy(threads_per_job=threads, max_jobs=args.workers)
+    separator = MuingSeparator(scheduling=scheduling, precision=args.precision)
+    ingest = DirectoryIngest(separator, args.input_dir, args.output_dir, stems=args.stems,
+                             output_format=args.format, bitrate=args.bitrate,
+                             workers=args.workers, decoders=args.decoders,
+                             max_attempts=args.max_attempts)
+    summary = ingest.run()
+    print(json.dumps(summary, ensure_ascii=False))
+    raise SystemExit(1 if summary["failed"] else 0)
@@ -0,0 +1,162 @@
+"""
+Muing Core - 백그라운드 분리 작업 큐
+작업을 제출하면 job id를 받고, 제한된 워커 풀에서 실행되는 동안 진행률을 조회
+"""
+import logging
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """대기열이 가득 차서 작업을 받을 수 없음"""
+
+
+class Job:
+    """작업 하나의 상태"""
+
+    def __init__(self, job_id, session_id, label=""):
+        self.id = job_id
+        self.session_id = session_id
+        self.label = label
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def progress(self):
+        """0.0 ~ 1.0 (처리한 세그먼트 기준)"""
+        if self.status == DONE:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+class JobManager:
+    """제한된 워커 풀 + 입장 제어가 있는 작업 관리자
+
+    max_workers: 동시에 실행되는 작업 수
+    max_queue: 실행 대기 가능한 작업 수 (넘으면 QueueFullError)
+    max_per_session: 세션 하나가 동시에 걸어둘 수 있는 작업 수
+    """
+
+    def __init__(self, max_workers=2, max_queue=8, max_per_session=1, work_root=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.work_root = Path(work_root) if work_root else PROJECT_ROOT / "temp"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="muing-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def session_dir(self, session_id):
+        """세션별로 분리된 작업 디렉토리"""
+        path = self.work_root / session_id
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def submit(self, session_id, fn, *args, label="", **kwargs):
+        """작업 제출 → job id 반환
+
+        fn은 progress=콜백(done, total) 키워드 인자를 받아야 함
+        """
+        with self._lock:
+            self._prune()
+            active = [j for j in self._jobs.values() if j.active]
+            if sum(j.session_id == session_id for j in active) >= self.max_per_session:
+                raise QueueFullError("이미 진행 중인 작업이 있습니다")
+            if sum(j.status == QUEUED for j in active) >= self.max_queue:
+                raise QueueFullError("대기열이 가득 찼습니다. 잠시 후 다시 시도하세요")
+            job = Job(uuid.uuid4().hex[:12], session_id, label)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"📥 작업 제출: {job.id} ({label})")
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started = time.time()
+
+        def progress(done, total):
+            job.done = done
+            job.total = total
+
+        try:
+            job.result = fn(*args, progress=progress, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"❌ 작업 실패: {job.id}: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def queue_position(self, job_id):
+        """대기 순번 (1부터). 실행 중이거나 끝났으면 0"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return 0
+        with self._lock:
+            waiting = [j for j in self._jobs.values() if j.status == QUEUED]
+        return sum(j.submitted <= job.submitted for j in waiting)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            'running': sum(j.status == RUNNING for j in jobs),
+            'queued': sum(j.status == QUEUED for j in jobs),
+            'max_workers': self.max_workers,
+        }
+
+    def _prune(self, max_age=3600):
+        """오래전에 끝난 작업 기록 정리 (lock 안에서 호출)"""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if not job.active and now - job.finished > max_age:
+                del self._jobs[job_id]
+
+    def cleanup_sessions(self, max_age=24 * 3600):
+        """오래된 세션 작업 디렉토리 삭제"""
+        if not self.work_root.exists():
+            return 0
+        now = time.time()
+        active = {j.session_id for j in self._jobs.values() if j.active}
+        removed = 0
+        for path in self.work_root.iterdir():
+            if path.is_dir() and path.name not in active and now - path.stat().st_mtime > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,189 @@
+"""
+Muing Core - 실시간 입력 소스
+배열 iterator / 파일 객체(쓰는 중인 WAV, ffmpeg 파이프) / 경로를 [샘플, 채널] float32 블록으로 읽음
+분리는 MuingSeparator.separate_live (엔진의 iter_live - 블록 단위 지연 제한 분리)
+
+예: 노래방 반주 모니터링
+  ffmpeg -re -i song.mp3 -f f32le -ar 44100 -ac 2 - \\
+    | python -m core.live --stem no_vocals \\
+    | ffplay -f f32le -ar 44100 -ac 2 -
+"""
+import logging
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 파일 객체에서 한 번에 읽는 프레임 수 (44.1kHz 기준 약 23ms)
+READ_FRAMES = 1024
+# 쓰는 중인 파일을 따라갈 때 새 데이터를 기다리는 간격(초)
+POLL_SECONDS = 0.05
+# raw PCM 형식 → (dtype, 정규화 배율)
+RAW_FORMATS = {"f32le": ("<f4", 1.0), "s16le": ("<i2", 1 / 32768)}
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _match_channels(data, channels):
+    """[샘플, 채널] → 모델 채널 수 (모노는 복제, 모노 출력은 평균)"""
+    if data.shape[1] == channels:
+        return data
+    if data.shape[1] == 1:
+        return np.repeat(data, channels, axis=1)
+    if channels == 1:
+        return data.mean(axis=1, keepdims=True)
+    raise ValueError(f"입력 채널 수({data.shape[1]})가 모델 채널 수({channels})와 다릅니다")
+
+
+def _read_exact(f, size, follow_seconds):
+    """size 바이트 읽기 - 모자라면 follow_seconds 동안 새 데이터를 기다림 (쓰는 중인 파일용)"""
+    data = b""
+    idle = 0.0
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if chunk:
+            data += chunk
+            idle = 0.0
+        elif idle < follow_seconds:
+            time.sleep(POLL_SECONDS)
+            idle += POLL_SECONDS
+        else:
+            break
+    return data
+
+
+def _read_wav_header(f, follow_seconds):
+    """RIFF 헤더 다음부터 data 청크 직전까지 읽고 (채널, 샘플레이트, 디코더) 반환
+
+    data 크기는 무시 (쓰는 중인 파일 / 파이프는 크기가 0이거나 임시 값)
+    """
+    fmt = None
+    while True:
+        header = _read_exact(f, 8, follow_seconds)
+        if len(header) < 8:
+            raise ValueError("WAV data 청크를 찾지 못했습니다")
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"data":
+            break
+        body = _read_exact(f, size + (size & 1), follow_seconds)
+        if chunk_id == b"fmt ":
+            fmt = body
+    if fmt is None:
+        raise ValueError("WAV fmt 청크가 없습니다")
+    tag, channels, samplerate = struct.unpack("<HHI", fmt[:8])
+    bits = struct.unpack("<H", fmt[14:16])[0]
+    if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        tag = struct.unpack("<H", fmt[24:26])[0]
+    if tag == WAVE_FORMAT_FLOAT and bits in (32, 64):
+        dtype = np.dtype(f"<f{bits // 8}")
+        return channels, samplerate, bits // 8, lambda raw: np.frombuffer(raw, dtype).astype(np.float32)
+    if tag == WAVE_FORMAT_PCM and bits in (16, 32):
+        dtype = np.dtype(f"<i{bits // 8}")
+        scale = 1 / 2 ** (bits - 1)
+        return channels, samplerate, bits // 8, lambda raw: np.frombuffer(raw, dtype) * np.float32(scale)
+    if tag == WAVE_FORMAT_PCM and bits == 24:
+        def decode(raw):
+            b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+            value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+            value = np.where(value >= 1 << 23, value - (1 << 24), value)
+            return value * np.float32(1 / 2 ** 23)
+        return channels, samplerate, 3, decode
+    raise ValueError(f"지원하지 않는 WAV 형식 (format {tag}, {bits}bit)")
+
+
+def iter_file_blocks(f, samplerate, channels, raw_format="f32le", block_frames=READ_FRAMES,
+                     follow_seconds=0.0):
+    """파일 객체 → [샘플, 채널] float32 블록 (WAV 헤더가 있으면 헤더 형식, 없으면 raw_format)
+
+    raw PCM은 샘플레이트 / 채널이 모델과 같다고 가정 (ffmpeg -ar / -ac로 맞춰서 보냄)
+    follow_seconds: 읽을 데이터가 없을 때 이만큼 새 데이터를 기다린 뒤 종료 (쓰는 중인 파일)
+    """
+    head = _read_exact(f, 12, follow_seconds)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        source_channels, source_rate, width, decode = _read_wav_header(f, follow_seconds)
+        if source_rate != samplerate:
+            raise ValueError(f"입력 샘플레이트 {source_rate}Hz가 모델({samplerate}Hz)과 다릅니다 "
+                             f"(ffmpeg -ar {samplerate}로 변환해서 넣어주세요)")
+        pending = b""
+    else:
+        if raw_format not in RAW_FORMATS:
+            raise ValueError(f"지원하지 않는 raw 형식: {raw_format} (가능: {', '.join(RAW_FORMATS)})")
+        dtype, scale = RAW_FORMATS[raw_format]
+        dtype = np.dtype(dtype)
+        source_channels, width = channels, dtype.itemsize
+        decode = lambda raw: np.frombuffer(raw, dtype) * np.float32(scale)
+        pending = head
+
+    frame_bytes = width * source_channels
+    block_bytes = frame_bytes * block_frames
+    while True:
+        pending += _read_exact(f, block_bytes - len(pending), follow_seconds)
+        whole = len(pending) - len(pending) % frame_bytes
+        if whole:
+            data = decode(pending[:whole]).astype(np.float32, copy=False)
+            yield _match_channels(data.reshape(-1, source_channels), channels)
+        if len(pending) < block_bytes:
+            return
+        pending = pending[whole:]
+
+
+def iter_source_blocks(source, samplerate, channels, raw_format="f32le", block_frames=READ_FRAMES,
+                       follow_seconds=0.0):
+    """실시간 입력 → [샘플, 채널] float32 블록
+
+    source:
+      - 파일 객체 (read 메서드): sys.stdin.buffer, ffmpeg 프로세스 stdout 등
+      - 경로: 쓰는 중인 WAV / raw 파일 (follow_seconds로 새 데이터를 기다림)
+      - 배열 iterator: numpy는 [샘플, 채널] (1차원이면 모노), torch 텐서는 [채널, 샘플]
+    """
+    if hasattr(source, "read"):
+        yield from iter_file_blocks(source, samplerate, channels, raw_format, block_frames,
+                                    follow_seconds)
+        return
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            yield from iter_file_blocks(f, samplerate, channels, raw_format, block_frames,
+                                        follow_seconds)
+        return
+    for block in source:
+        if hasattr(block, "detach"):
+            block = block.detach().cpu().numpy().T
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 1:
+            block = block[:, None]
+        yield _match_channels(block, channels)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    from core.separator import MuingSeparator
+
+    parser = argparse.ArgumentParser(description="표준 입력(raw PCM/WAV)을 실시간 분리해서 "
+                                                 "스템 하나를 표준 출력으로 (f32le)")
+    parser.add_argument("--stem", default="no_vocals", help="출력할 스템 (기본: 반주)")
+    parser.add_argument("--stems", type=int, default=2)
+    parser.add_argument("--format", default="f32le", choices=list(RAW_FORMATS),
+                        help="헤더 없는 입력의 형식")
+    parser.add_argument("--block", type=float, default=1.0, help="블록 길이(초)")
+    parser.add_argument("--lookahead", type=float, default=0.5, help="미래 context(초)")
+    parser.add_argument("--context", type=float, default=None, help="과거 context(초)")
+    args = parser.parse_args()
+
+    separator = MuingSeparator()
+    stats = {}
+    out = sys.stdout.buffer
+    for stems in separator.separate_live(sys.stdin.buffer, stems=args.stems,
+                                         block_seconds=args.block,
+                                         lookahead_seconds=args.lookahead,
+                                         context_seconds=args.context, raw_format=args.format,
+                                         stats=stats):
+        out.write(np.ascontiguousarray(stems[args.stem].numpy().T, dtype=np.float32).tobytes())
+        out.flush()
+    print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
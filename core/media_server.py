@@ -0,0 +1,183 @@
+"""
+Muing Core - 스템 파일 스트리밍 서버
+디스크의 파일을 sendfile로 바로 전송 (base64/메모리 적재 없음), HTTP Range 지원으로 플레이어 탐색 가능
+metrics를 넘기면 /metrics 경로로 계측 값 노출 (Prometheus 텍스트 형식)
+인증이 없으므로 스템 / 피크 파일만 전송하고 기본은 127.0.0.1에만 바인딩
+(모든 인터페이스로 열려면 MUING_MEDIA_HOST=0.0.0.0)
+"""
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+
+from core.catalog import CATALOG_FILE
+from core.encoding import FORMATS, mime_type
+from core.peaks import PEAKS_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = int(os.environ.get("MUING_MEDIA_PORT", "8502"))
+DEFAULT_HOST = os.environ.get("MUING_MEDIA_HOST", "127.0.0.1")
+# 전송 가능한 파일 (스템 포맷 + 파형 피크) - 캐시 메타데이터 / 카탈로그 / 작업 파일은 제외
+SERVED_SUFFIXES = tuple(ext for ext, _ in FORMATS.values()) + (PEAKS_SUFFIX,)
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """Range 헤더 → (start, end) 포함 구간. 해석 불가면 None, 범위 밖이면 False"""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # 다중 구간 등은 전체 전송
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N → 마지막 N바이트
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _servable(rel):
+    """요청 경로가 전송 가능한 파일인지 (점으로 시작하는 구성 요소 - 임시 파일 / 상위 경로 - 는 거부)"""
+    names = rel.split("/")
+    if any(not name or name.startswith(".") for name in names):
+        return False
+    return names[-1] != CATALOG_FILE and names[-1].endswith(SERVED_SUFFIXES)
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    """마운트된 디렉토리 안의 스템 / 피크 파일만 전송 (숨김 경로 / 카탈로그 DB는 거부)"""
+
+    mounts = {}
+    metrics = None
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _resolve(self):
+        parts = urlsplit(self.path)
+        mount, _, rel = unquote(parts.path).lstrip("/").partition("/")
+        root = self.mounts.get(mount)
+        if root is None or not rel or not _servable(rel):
+            return None, parts.query
+        path = (root / rel).resolve()
+        if root not in path.parents or not path.is_file():
+            return None, parts.query
+        return path, parts.query
+
+    def _serve_metrics(self, head):
+        body = self.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _serve(self, head):
+        if self.metrics is not None and urlsplit(self.path).path == "/metrics":
+            self._serve_metrics(head)
+            return
+        path, query = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+        header = self.headers.get("Range")
+        if header:
+            parsed = parse_range(header, size)
+            if parsed is False:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            if parsed:
+                start, end = parsed
+                status = 206
+        length = end - start + 1
+
+        self.send_response(status)
+        self.send_header("Content-Type", mime_type(path))
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Cache-Control", "public, max-age=86400")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        if "download" in query:
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(path.name)}")
+        self.end_headers()
+        if head or length <= 0:
+            return
+
+        with open(path, "rb") as f:
+            try:
+                # 커널에서 바로 소켓으로 복사 (zero-copy)
+                self.connection.sendfile(f, offset=start, count=length)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 플레이어가 탐색하면서 연결을 끊는 건 정상
+
+    def log_message(self, format, *args):
+        logger.debug("media: " + format, *args)
+
+
+class MediaServer:
+    """백그라운드 스레드에서 도는 파일 스트리밍 서버
+
+    mounts: {"이름": 디렉토리} → http://<host>/<이름>/<상대경로>
+    host: 바인딩 주소 (기본 MUING_MEDIA_HOST 또는 127.0.0.1 - 외부 접속은 명시적으로 설정해야 함)
+    base_url: 브라우저가 접근할 주소 (기본 MUING_MEDIA_URL 또는 http://localhost:<port>)
+    """
+
+    def __init__(self, mounts, host=None, port=DEFAULT_PORT, base_url=None, metrics=None):
+        self.mounts = {name: Path(root).resolve() for name, root in mounts.items()}
+        self.metrics = metrics
+        self.host = host or DEFAULT_HOST
+        self.port = port
+        self.base_url = (base_url or os.environ.get("MUING_MEDIA_URL")
+                         or f"http://localhost:{port}").rstrip("/")
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        handler = type("MountedMediaHandler", (MediaRequestHandler,),
+                       {"mounts": self.mounts, "metrics": self.metrics})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="muing-media",
+                                        daemon=True)
+        self._thread.start()
+        if self.host not in ("127.0.0.1", "localhost", "::1"):
+            logger.warning(f"⚠️ 미디어 서버가 {self.host}에 열려 있습니다 (인증 없음)")
+        logger.info(f"📡 미디어 서버 시작: {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def url_for(self, path, download=False):
+        """파일 경로 → 브라우저용 URL (마운트 밖이면 None)"""
+        path = Path(path).resolve()
+        for name, root in self.mounts.items():
+            if root in path.parents:
+                url = f"{self.base_url}/{name}/{quote(path.relative_to(root).as_posix())}"
+                return url + "?download=1" if download else url
+        return None
@@ -0,0 +1,267 @@
+"""
+Muing Core - 멜로디(F0) 추출
+분리된 보컬 스템에서 40ms 단위 음높이 곡선을 뽑고, 스템 내용 해시로 캐시
+
+- 모델: CREPE (torchcrepe, 설치돼 있을 때) - 프레임 수백~수천 개를 한 번에 배치 추론
+  없으면 librosa YIN으로 대신 (정확도는 낮지만 의존성 없음)
+- 추론 전에 프레임 RMS / 영교차율로 무음·무성음 프레임을 걸러서 모델에 넣지 않음
+- 결과: f0(Hz, 무성음은 0) float32 + 신뢰도 float16 배열 → .npz, MIDI 변환은 pretty_midi
+- 기본 간격 40ms: CREPE 연산량은 프레임 수에 비례 → tiny 모델이 CPU 코어 하나로 실시간의 10배 이상
+  (전부 유성음인 60초 440Hz 톤 기준 약 11배, 20ms는 약 5배) - 음 단위(MIDI, 최소 80ms)에는 충분
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from core.cache import file_hash
+from core.features import default_store
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_MELODY_DIR = PROJECT_ROOT / "separated" / "melody"
+MELODY_VERSION = 1
+
+# CREPE 입력 규격
+SAMPLERATE = 16000
+WINDOW = 1024
+DEFAULT_HOP = 640  # 40ms
+
+# 모델 호출 한 번에 넣는 프레임 수 (full은 첫 층 출력이 커서 작게)
+BATCH_SIZES = {"tiny": 1024, "full": 128}
+
+# 보컬 음역 (Hz)
+FMIN = 65.0
+FMAX = 1100.0
+
+# 이보다 조용한 프레임은 무음으로 보고 추론 생략
+SILENCE_DB = -50.0
+# 샘플당 영교차 비율이 이보다 높으면 무성음(치찰음/숨소리)으로 보고 생략
+MAX_ZCR = 0.25
+# 모델 신뢰도가 이보다 낮으면 무성음
+VOICING_THRESHOLD = 0.5
+
+# CREPE 출력 360개 구간 → cents (20 cents 간격)
+CENTS_PER_BIN = 20
+CENTS_OFFSET = 1997.3794084376191
+
+
+def _crepe_available():
+    try:
+        import torchcrepe  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def frame_activity(audio, hop=DEFAULT_HOP, silence_db=SILENCE_DB, max_zcr=MAX_ZCR):
+    """프레임별 (RMS dB, 영교차율, 추론 대상 여부) - 누적합으로 한 번에 계산
+
+    프레임 i는 CREPE와 같이 i * hop 샘플을 중심으로 한 WINDOW 샘플
+    """
+    count = 1 + len(audio) // hop
+    padded = np.pad(audio, WINDOW // 2)
+    starts = np.arange(count) * hop
+    energy = np.concatenate([[0.0], np.cumsum(padded.astype(np.float64) ** 2)])
+    rms = np.sqrt((energy[starts + WINDOW] - energy[starts]) / WINDOW)
+    rms_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    crossings = np.concatenate([[0], np.cumsum(np.signbit(padded[1:]) != np.signbit(padded[:-1]))])
+    zcr = (crossings[starts + WINDOW - 1] - crossings[starts]) / (WINDOW - 1)
+    active = (rms_db > silence_db) & (zcr < max_zcr)
+    return rms_db, zcr, active
+
+
+def _decode_cents(probabilities):
+    """CREPE 출력 → (cents, 신뢰도) - argmax 주변 9개 구간 가중 평균 (벡터화)"""
+    bins = probabilities.argmax(axis=1)
+    window = np.clip(bins[:, None] + np.arange(-4, 5), 0, probabilities.shape[1] - 1)
+    weights = np.take_along_axis(probabilities, window, axis=1)
+    cents = CENTS_OFFSET + CENTS_PER_BIN * (weights * window).sum(axis=1) / np.maximum(
+        weights.sum(axis=1), 1e-9)
+    return cents, probabilities.max(axis=1)
+
+
+class MelodyExtractor:
+    """보컬 스템 → 멜로디 곡선 (내용 해시 캐시)
+
+    model: CREPE 크기 ("tiny": CPU 코어 하나로 실시간의 약 11배, "full": 정확하지만 수십 배 느림)
+    hop: 프레임 간격 (16kHz 샘플, 기본 40ms - 320(20ms)이면 해상도 2배, 속도 절반)
+    batch_size: 모델 호출 한 번에 넣는 프레임 수 (기본은 모델별 BATCH_SIZES)
+    features: core.features.FeatureStore - 16kHz 디코딩 결과를 다른 분석과 공유
+    """
+
+    def __init__(self, model="tiny", device="cpu", hop=DEFAULT_HOP, batch_size=None,
+                 silence_db=SILENCE_DB, features=None, cache_dir=None):
+        self.features = features or default_store()
+        self.model = model
+        self.device = device
+        self.hop = hop
+        self.batch_size = batch_size or BATCH_SIZES.get(model, 128)
+        self.silence_db = silence_db
+        self.backend = "crepe" if _crepe_available() else "yin"
+        if self.backend == "yin":
+            logger.warning("⚠️ torchcrepe가 없어 YIN으로 멜로디 추출 (pip install torchcrepe 권장)")
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_MELODY_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, stem_path):
+        payload = {
+            "v": MELODY_VERSION,
+            "audio": file_hash(stem_path),
+            "backend": self.backend,
+            "model": self.model,
+            "hop": self.hop,
+            "silence_db": self.silence_db,
+        }
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+        return self.cache_dir / f"{key}.npz"
+
+    def cached(self, stem_path):
+        """이미 추출한 결과가 있으면 반환 (없으면 None - 새로 계산하지 않음)"""
+        cache_path = self._cache_path(stem_path)
+        return load_melody(cache_path) if cache_path.exists() else None
+
+    def extract(self, stem_path, progress=None):
+        """멜로디 곡선 dict (f0, confidence, hop_seconds, voiced_ratio, skipped_ratio, backend)
+
+        같은 내용의 스템이면 저장된 결과를 바로 반환
+        """
+        stem_path = Path(stem_path)
+        cache_path = self._cache_path(stem_path)
+        if cache_path.exists():
+            logger.info(f"⚡ 멜로디 캐시 hit: {stem_path.name}")
+            return load_melody(cache_path)
+
+        logger.info(f"🎼 멜로디 추출 시작: {stem_path.name} ({self.backend}/{self.model})")
+        audio = np.asarray(self.features.audio(stem_path, SAMPLERATE))
+        _, _, active = frame_activity(audio, self.hop, self.silence_db)
+        f0 = np.zeros(len(active), dtype=np.float32)
+        confidence = np.zeros(len(active), dtype=np.float32)
+        if active.any():
+            if self.backend == "crepe":
+                self._run_crepe(audio, active, f0, confidence, progress)
+            else:
+                self._run_yin(audio, active, f0, confidence)
+        f0[confidence < VOICING_THRESHOLD] = 0.0
+
+        melody = {
+            "f0": f0,
+            "confidence": confidence.astype(np.float16),
+            "hop_seconds": self.hop / SAMPLERATE,
+            "voiced_ratio": float((f0 > 0).mean()) if len(f0) else 0.0,
+            "skipped_ratio": float(1 - active.mean()) if len(active) else 0.0,
+            "backend": self.backend,
+        }
+        tmp = cache_path.with_suffix(f".{uuid.uuid4().hex}.tmp.npz")
+        np.savez(tmp, **melody)
+        os.replace(tmp, cache_path)
+        logger.info(f"✅ 멜로디 추출 완료: 유성음 {melody['voiced_ratio']*100:.0f}% "
+                    f"(무음/무성음 {melody['skipped_ratio']*100:.0f}% 추론 생략)")
+        return melody
+
+    def _run_crepe(self, audio, active, f0, confidence, progress):
+        """추론 대상 프레임만 모아 batch_size개씩 CREPE 실행"""
+        import torch
+        import torchcrepe
+
+        windows = np.lib.stride_tricks.sliding_window_view(np.pad(audio, WINDOW // 2),
+                                                           WINDOW)[::self.hop]
+        indices = np.flatnonzero(active)
+        # torchcrepe 버전에 따라 세 번째 인자가 device 또는 embed → 키워드로만 전달
+        infer_args = {"model": self.model}
+        if "device" in inspect.signature(torchcrepe.infer).parameters:
+            infer_args["device"] = self.device
+        cents = np.zeros(len(indices))
+        probs = np.zeros(len(indices))
+        with torch.inference_mode():
+            for start in range(0, len(indices), self.batch_size):
+                batch = indices[start:start + self.batch_size]
+                frames = windows[batch].astype(np.float32)
+                # CREPE 입력 정규화 (프레임별 평균 0, 표준편차 1)
+                frames -= frames.mean(axis=1, keepdims=True)
+                frames /= np.maximum(frames.std(axis=1, keepdims=True), 1e-10)
+                output = torchcrepe.infer(torch.from_numpy(frames).to(self.device), **infer_args)
+                cents[start:start + len(batch)], probs[start:start + len(batch)] = \
+                    _decode_cents(output.cpu().numpy())
+                if progress is not None:
+                    progress(min(start + self.batch_size, len(indices)), len(indices))
+        hz = 10 * 2 ** (cents / 1200)
+        in_range = (hz >= FMIN) & (hz <= FMAX)
+        f0[indices] = np.where(in_range, hz, 0.0)
+        confidence[indices] = np.where(in_range, probs, 0.0)
+
+    def _run_yin(self, audio, active, f0, confidence):
+        """torchcrepe가 없을 때 - YIN은 신뢰도가 없으므로 추론 대상 프레임은 1로 둠"""
+        import librosa
+
+        hz = librosa.yin(audio, fmin=FMIN, fmax=FMAX, sr=SAMPLERATE, frame_length=WINDOW,
+                         hop_length=self.hop, center=True)[:len(active)]
+        f0[:len(hz)] = np.where(active[:len(hz)], hz, 0.0)
+        confidence[:len(hz)] = active[:len(hz)]
+
+
+def load_melody(path):
+    """저장된 멜로디 곡선 (.npz) → dict"""
+    with np.load(path) as data:
+        melody = {name: data[name] for name in data.files}
+    for name in ("hop_seconds", "voiced_ratio", "skipped_ratio"):
+        melody[name] = float(melody[name])
+    melody["backend"] = str(melody["backend"])
+    return melody
+
+
+def melody_notes(melody, min_seconds=0.08):
+    """f0 곡선 → [(시작초, 끝초, MIDI 음번호)] - 같은 반음이 이어지는 구간을 음 하나로"""
+    f0 = melody["f0"]
+    hop = melody["hop_seconds"]
+    pitch = np.zeros(len(f0), dtype=np.int16)
+    voiced = f0 > 0
+    pitch[voiced] = np.round(69 + 12 * np.log2(f0[voiced] / 440.0))
+    # 음높이가 바뀌는 지점에서 자름
+    edges = np.flatnonzero(np.diff(pitch, prepend=-1, append=-1))
+    notes = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if pitch[start] > 0 and (end - start) * hop >= min_seconds:
+            notes.append((float(start * hop), float(end * hop), int(pitch[start])))
+    return notes
+
+
+def melody_to_midi(melody, path, program=0, velocity=100):
+    """멜로디를 MIDI 파일로 저장 (pretty_midi 필요, path는 파일 객체도 가능)"""
+    import pretty_midi
+
+    midi = pretty_midi.PrettyMIDI()
+    instrument = pretty_midi.Instrument(program=program, name="melody")
+    for start, end, pitch in melody_notes(melody):
+        instrument.notes.append(pretty_midi.Note(velocity=velocity, pitch=pitch,
+                                                 start=start, end=end))
+    midi.instruments.append(instrument)
+    midi.write(path if hasattr(path, "write") else str(path))
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="보컬 스템에서 멜로디(F0) 추출")
+    parser.add_argument("stem", help="보컬 스템 파일 (separate_file 결과의 vocals)")
+    parser.add_argument("--model", default="tiny", choices=["tiny", "full"])
+    parser.add_argument("--midi", help="MIDI로도 저장할 경로")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = MelodyExtractor(model=args.model).extract(args.stem)
+    elapsed = time.perf_counter() - start
+    duration = len(result["f0"]) * result["hop_seconds"]
+    print(f"프레임 {len(result['f0'])}개 · 유성음 {result['voiced_ratio']*100:.0f}% · "
+          f"{elapsed:.2f}초 (실시간의 {duration / max(elapsed, 1e-9):.1f}배)")
+    if args.midi:
+        print(f"MIDI 저장: {melody_to_midi(result, args.midi)}")
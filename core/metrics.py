@@ -0,0 +1,194 @@
+"""
+Muing Core - 분리 파이프라인 계측
+단계별 시간(디코딩/모델 로드/추론/저장/캐시 조회), CPU 시간, 최대 메모리, 실시간 배율을 기록
+결과는 구조화 이벤트(dict)로 내보내고, 카운터/히스토그램은 Prometheus 텍스트 형식으로 제공
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 단계 시간(초) 히스토그램 구간
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# 실시간 배율(처리 시간 / 음원 길이) 히스토그램 구간
+RTF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4, 8)
+
+
+def peak_rss_bytes():
+    """프로세스 최대 RSS (리눅스 ru_maxrss 단위는 KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Metrics:
+    """스레드 안전한 카운터 / 게이지 / 히스토그램 모음 + 최근 이벤트 보관
+
+    render()는 Prometheus 텍스트 형식 (미디어 서버의 /metrics로 노출)
+    listeners: 이벤트 dict를 받는 콜백 목록, MUING_EVENTS_LOG가 있으면 JSONL로도 기록
+    """
+
+    def __init__(self, namespace="muing", max_events=200, events_path=None):
+        self.namespace = namespace
+        self.events = deque(maxlen=max_events)
+        self.listeners = []
+        self.events_path = events_path or os.environ.get("MUING_EVENTS_LOG")
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _name(self, name):
+        return f"{self.namespace}_{name}"
+
+    def inc(self, name, value=1.0, help="", **labels):
+        with self._lock:
+            series = self._counters.setdefault(self._name(name), {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+            self._help.setdefault(self._name(name), help)
+
+    def set(self, name, value, help="", **labels):
+        with self._lock:
+            self._gauges.setdefault(self._name(name), {})[_label_key(labels)] = float(value)
+            self._help.setdefault(self._name(name), help)
+
+    def observe(self, name, value, buckets=STAGE_BUCKETS, help="", **labels):
+        with self._lock:
+            series = self._histograms.setdefault(self._name(name), {})
+            key = _label_key(labels)
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = {"buckets": buckets, "counts": [0] * len(buckets),
+                                      "sum": 0.0, "count": 0}
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+            self._help.setdefault(self._name(name), help)
+
+    def emit(self, event):
+        """구조화 이벤트 기록 + 리스너 호출"""
+        self.events.append(event)
+        logger.debug(f"📈 {json.dumps(event, ensure_ascii=False, default=str)}")
+        if self.events_path:
+            try:
+                with open(self.events_path, "a") as f:
+                    f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                logger.warning(f"⚠️ 이벤트 로그 기록 실패: {e}")
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"⚠️ 계측 리스너 오류: {e}")
+
+    def render(self):
+        """Prometheus 텍스트 노출 형식"""
+        lines = []
+        with self._lock:
+            for kind, table in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(table.items()):
+                    if self._help.get(name):
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(key)} {value!r}")
+            for name, series in sorted(self._histograms.items()):
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    for bound, count in zip(hist["buckets"], hist["counts"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist['sum']!r}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# 프로세스 전역 기본 레지스트리 (MuingSeparator 기본값)
+METRICS = Metrics()
+
+
+class RunTrace:
+    """분리 한 번의 단계별 계측
+
+    with trace.stage("inference"): ... 처럼 감싸면 단계별 벽시계/CPU 시간이 쌓임
+    CPU 시간과 최대 RSS는 프로세스 단위라 동시 작업이 있으면 서로 섞여서 보임
+    """
+
+    def __init__(self, metrics=None, **info):
+        self.metrics = metrics
+        self.info = dict(info)
+        self.stages = {}
+        self.audio_seconds = None
+        self.event = None
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            stage = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            stage["wall"] += time.perf_counter() - wall
+            stage["cpu"] += time.process_time() - cpu
+
+    def finish(self, status="ok", **info):
+        """이벤트 dict를 만들고 레지스트리에 반영 (여러 번 불러도 한 번만 기록)"""
+        if self.event is not None:
+            return self.event
+        self.info.update(info)
+        wall = time.perf_counter() - self._start
+        work = wall - self.stages.get("model_load", {}).get("wall", 0.0)
+        rtf = work / self.audio_seconds if self.audio_seconds else None
+        self.event = {
+            "event": "separation",
+            "time": time.time(),
+            "status": status,
+            **self.info,
+            "stages": {name: {k: round(v, 4) for k, v in s.items()}
+                       for name, s in self.stages.items()},
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(time.process_time() - self._cpu_start, 4),
+            "audio_seconds": self.audio_seconds,
+            "rtf": round(rtf, 4) if rtf is not None else None,
+            "peak_rss_mb": round(peak_rss_bytes() / 1024 ** 2, 1),
+        }
+
+        m = self.metrics
+        if m is not None:
+            mode = self.info.get("mode", "")
+            m.inc("separations_total", help="완료된 분리 요청 수", mode=mode, status=status)
+            for name, s in self.stages.items():
+                m.observe("stage_seconds", s["wall"], help="단계별 처리 시간(초)", stage=name)
+                m.inc("stage_cpu_seconds_total", s["cpu"], help="단계별 CPU 시간 누적", stage=name)
+            if self.audio_seconds:
+                m.inc("audio_seconds_total", self.audio_seconds, help="처리한 음원 길이 누적(초)",
+                      mode=mode)
+            if rtf is not None and not self.info.get("cache_hit"):
+                m.observe("rtf", rtf, buckets=RTF_BUCKETS, help="실시간 배율 (처리 시간/음원 길이)",
+                          mode=mode)
+            m.set("peak_rss_bytes", peak_rss_bytes(), help="프로세스 최대 RSS")
+            m.emit(self.event)
+        return self.event
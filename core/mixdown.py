@@ -0,0 +1,302 @@
+"""
+Muing Core - 스템 리믹스 (다시 분리하지 않고 저장된 스템으로 믹스다운)
+스템별 볼륨 / 음소거 / 팬을 적용해서 새 믹스 파일 하나를 만듦 ("보컬 30%", "드럼 빼기" 등)
+
+- 스템은 memory-map(16bit WAV / raw PCM) 또는 고정 크기 블록(FLAC / Opus)으로 읽고
+  블록마다 [스템, 샘플, 채널] x [스템, 채널] 가중치를 한 번에 합산 → 곡 길이와 무관하게 메모리 일정
+- 결과는 (결과 디렉토리, 정규화한 믹스 설정, 포맷) 키로 캐시 → 같은 요청은 파일 I/O만
+  구조: <root>/<키><확장자> (크기 제한 LRU)
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from core.encoding import FORMATS, RAW_DTYPES, StemWriter, read_raw_pcm, stem_files
+from core.pcm_cache import iter_ffmpeg_blocks
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_MIX_DIR = PROJECT_ROOT / "separated" / "mixes"
+DEFAULT_MAX_GB = float(os.environ.get("MUING_MIX_CACHE_GB", "2"))
+MIX_VERSION = 1
+
+# 믹스 출력 포맷 (브라우저 재생 가능한 것만)
+MIX_FORMATS = ("wav", "flac", "opus")
+OPUS_SAMPLERATE = 48000
+# 한 번에 합산하는 프레임 수 (스템 4개 x 스테레오 float32 기준 약 4MB)
+BLOCK_FRAMES = 1 << 17
+MAX_GAIN = 4.0
+
+
+def normalize_spec(spec, names):
+    """믹스 설정 → [(스템명, 볼륨, 팬)] (스템 순서 고정, 빠진 스템은 볼륨 1 / 가운데)
+
+    spec: {스템명: 볼륨} 또는 {스템명: {"gain": 0~4, "mute": bool, "pan": -1(왼쪽)~1(오른쪽)}}
+    """
+    spec = dict(spec or {})
+    unknown = set(spec) - set(names)
+    if unknown:
+        raise ValueError(f"없는 스템: {', '.join(sorted(unknown))} (가능: {', '.join(names)})")
+    mix = []
+    for name in names:
+        value = spec.get(name, {})
+        if not isinstance(value, dict):
+            value = {"gain": value}
+        gain = 0.0 if value.get("mute") else float(value.get("gain", 1.0))
+        pan = float(value.get("pan", 0.0))
+        if not 0.0 <= gain <= MAX_GAIN:
+            raise ValueError(f"{name} 볼륨은 0~{MAX_GAIN:g} 사이여야 합니다: {gain}")
+        if not -1.0 <= pan <= 1.0:
+            raise ValueError(f"{name} 팬은 -1~1 사이여야 합니다: {pan}")
+        mix.append((name, round(gain, 4), round(pan, 4)))
+    return mix
+
+
+def channel_weights(mix, channels):
+    """[(스템, 볼륨, 팬)] → [스템, 채널] 가중치 (스테레오는 밸런스 방식: 가운데 = 원래 레벨)"""
+    gains = np.array([gain for _, gain, _ in mix], dtype=np.float32)
+    if channels != 2:
+        return np.repeat(gains[:, None], channels, axis=1)
+    pans = np.array([pan for _, _, pan in mix], dtype=np.float32)
+    left = np.minimum(1.0, 1.0 - pans)
+    right = np.minimum(1.0, 1.0 + pans)
+    return gains[:, None] * np.stack([left, right], axis=1)
+
+
+def _wav_memmap(path):
+    """16bit PCM WAV의 data 청크를 [샘플, 채널] int16 memmap으로 (다른 형식이면 None)"""
+    with open(path, "rb") as f:
+        if f.read(12)[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"data":
+                offset = f.tell()
+                break
+            body = f.read(size + (size & 1))
+            if chunk_id == b"fmt ":
+                fmt = body
+    if fmt is None:
+        return None
+    tag, channels = struct.unpack("<HH", fmt[:4])
+    bits = struct.unpack("<H", fmt[14:16])[0]
+    if tag not in (1, 0xFFFE) or bits != 16:
+        return None
+    frames = (min(size, os.path.getsize(path) - offset) // (2 * channels))
+    if frames == 0:
+        return np.zeros((0, channels), dtype=np.int16)
+    return np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(frames, channels))
+
+
+class _StemReader:
+    """스템 파일 하나를 [block_frames, 채널] float32 블록으로 순서대로 읽음"""
+
+    def __init__(self, path, block_frames):
+        self.path = Path(path)
+        self.block_frames = block_frames
+        self.data = None  # memmap이면 [샘플, 채널]
+        self.scale = 1.0
+        fmt = self.path.suffix[1:]
+        if fmt in RAW_DTYPES:
+            self.data, self.samplerate = read_raw_pcm(self.path)
+            self.scale = 1 / 32767 if fmt == "s16" else 1.0
+        elif fmt == "opus":
+            self.samplerate = OPUS_SAMPLERATE
+        else:
+            self.samplerate = sf.info(str(self.path)).samplerate
+            if fmt == "wav":
+                self.data = _wav_memmap(self.path)
+                self.scale = 1 / 32768
+        self.channels = self.data.shape[1] if self.data is not None else 2
+
+    def blocks(self):
+        if self.data is not None:
+            for start in range(0, self.data.shape[0], self.block_frames):
+                yield self.data[start:start + self.block_frames].astype(np.float32) * np.float32(self.scale)
+        elif self.path.suffix == ".opus":
+            yield from iter_ffmpeg_blocks(self.path, self.samplerate, self.channels,
+                                          self.block_frames)
+        else:
+            yield from sf.blocks(str(self.path), blocksize=self.block_frames, dtype="float32",
+                                 always_2d=True)
+
+
+def mix_blocks(readers, weights):
+    """스템 블록들을 가중치로 합산한 [샘플, 채널] 블록을 yield (길이가 다르면 0으로 채움)"""
+    iterators = [reader.blocks() for reader in readers]
+    while True:
+        blocks = [next(it, None) for it in iterators]
+        if all(block is None for block in blocks):
+            return
+        frames = max(len(block) for block in blocks if block is not None)
+        channels = weights.shape[1]
+        stacked = np.zeros((len(blocks), frames, channels), dtype=np.float32)
+        for i, block in enumerate(blocks):
+            if block is not None:
+                stacked[i, :len(block)] = block
+        yield np.einsum("sfc,sc->fc", stacked, weights)
+
+
+class StemMixer:
+    """저장된 스템 → 믹스 파일 (결과 캐시)
+
+    hits / misses: 캐시 적중 / 새로 만든 횟수
+    metrics: core.metrics.Metrics - 있으면 조회 결과를 카운터로도 기록
+    """
+
+    def __init__(self, root=None, max_bytes=None, metrics=None, block_frames=BLOCK_FRAMES):
+        self.root = Path(root) if root else DEFAULT_MIX_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes if max_bytes is not None else DEFAULT_MAX_GB * 1024 ** 3)
+        self.metrics = metrics
+        self.block_frames = block_frames
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def stems(self, result_dir):
+        """{스템명: 파일} (결과 디렉토리에 있는 순서)"""
+        return {path.stem: path for path in stem_files(result_dir)}
+
+    def key_for(self, result_dir, mix, output_format, bitrate=None):
+        files = self.stems(result_dir)
+        payload = {
+            "v": MIX_VERSION,
+            "dir": str(Path(result_dir).resolve()),
+            # 같은 경로에 결과가 다시 만들어진 경우 구분
+            "files": {name: [path.stat().st_size, path.stat().st_mtime_ns]
+                      for name, path in files.items()},
+            "mix": mix,
+            "format": output_format,
+            "bitrate": bitrate if output_format == "opus" else None,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+    def mix(self, result_dir, spec=None, output_format="wav", bitrate=None):
+        """스템별 볼륨/음소거/팬을 적용한 믹스 파일 경로 (캐시에 있으면 바로 반환)"""
+        if output_format not in MIX_FORMATS:
+            raise ValueError(f"지원하지 않는 믹스 포맷: {output_format} (가능: {', '.join(MIX_FORMATS)})")
+        files = self.stems(result_dir)
+        if not files:
+            raise FileNotFoundError(f"스템 파일이 없습니다: {result_dir}")
+        mix = normalize_spec(spec, list(files))
+        key = self.key_for(result_dir, mix, output_format, bitrate)
+        path = self.root / f"{key}{FORMATS[output_format][0]}"
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        # 같은 믹스를 여러 세션이 동시에 요청하면 한 번만 만듦
+        try:
+            with building:
+                if path.exists():
+                    self._count(True)
+                    os.utime(path)  # LRU 갱신
+                    return path
+                self._count(False)
+                self._render(files, mix, path, output_format, bitrate)
+        finally:
+            with self._lock:
+                # 끝난 키의 lock은 정리 (이미 받아 간 스레드는 그 lock으로 기다린 뒤 파일을 확인)
+                if self._building.get(key) is building:
+                    del self._building[key]
+        self.evict()
+        return path
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.metrics is not None:
+            self.metrics.inc("mix_lookups_total", help="리믹스 캐시 조회 수",
+                             result="hit" if hit else "miss")
+
+    def _render(self, files, mix, path, output_format, bitrate):
+        readers = [_StemReader(files[name], self.block_frames) for name, _, _ in mix]
+        samplerates = {reader.samplerate for reader in readers}
+        if len(samplerates) != 1:
+            raise ValueError(f"스템 샘플레이트가 서로 다릅니다: {sorted(samplerates)}")
+        channels = max(reader.channels for reader in readers)
+        weights = channel_weights(mix, channels)
+        staging = self.root / f".tmp-{uuid.uuid4().hex}"
+        writer = StemWriter(staging, samplerates.pop(), output_format, bitrate, peaks=False)
+        try:
+            try:
+                for block in mix_blocks(readers, weights):
+                    writer.write({"mix": block.T})
+            finally:
+                writer.close()
+            os.replace(staging / f"mix{FORMATS[output_format][0]}", path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        summary = ", ".join(f"{name} {gain:.0%}" + (f" pan {pan:+.2f}" if pan else "")
+                            for name, gain, pan in mix)
+        logger.info(f"🎚️ 믹스 생성: {summary} → {path.name}")
+
+    def total_size(self):
+        return sum(p.stat().st_size for p in self.root.iterdir() if p.is_file())
+
+    def evict(self):
+        """용량 초과분을 오래 안 쓴 믹스부터 삭제 (가장 최근 항목은 유지)"""
+        with self._lock:
+            # 만드는 중인 .tmp-* 항목은 제외
+            items = sorted((p for p in self.root.iterdir()
+                            if p.is_file() and not p.name.startswith(".")),
+                           key=lambda p: p.stat().st_mtime, reverse=True)
+            total = sum(p.stat().st_size for p in items)
+            removed = 0
+            while len(items) > 1 and total > self.max_bytes:
+                oldest = items.pop()
+                total -= oldest.stat().st_size
+                oldest.unlink(missing_ok=True)
+                removed += 1
+            if removed:
+                logger.info(f"🧹 믹스 캐시 정리: {removed}개 삭제")
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+
+def parse_mix_args(items):
+    """CLI 인자 ["vocals=0.3", "drums=mute", "bass=1:-0.5"] → 믹스 설정 dict"""
+    spec = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        if value == "mute":
+            spec[name] = {"mute": True}
+        else:
+            gain, _, pan = value.partition(":")
+            spec[name] = {"gain": float(gain or 1.0), "pan": float(pan or 0.0)}
+    return spec
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="저장된 스템으로 리믹스 (볼륨/음소거/팬)")
+    parser.add_argument("result_dir", help="분리 결과 디렉토리")
+    parser.add_argument("mix", nargs="*", help="스템=볼륨[:팬] 또는 스템=mute (예: vocals=0.3 drums=mute)")
+    parser.add_argument("--format", default="wav", choices=MIX_FORMATS)
+    parser.add_argument("--bitrate", type=int, default=None, help="Opus 비트레이트 (kbps)")
+    args = parser.parse_args()
+
+    mixer = StemMixer()
+    print(mixer.mix(args.result_dir, parse_mix_args(args.mix), args.format, args.bitrate))
@@ -0,0 +1,171 @@
+"""
+Muing Core - 디코딩 1회 PCM 캐시
+입력을 한 번만 FFmpeg로 디코딩해서 float32 PCM 파일로 저장하고, 이후엔 memory-map으로 바로 읽음
+분리 모델, 2/4-stem 전환, 분석 모듈이 모두 같은 디코딩 결과를 공유
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from core.cache import file_hash
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_PCM_DIR = PROJECT_ROOT / "separated" / "pcm"
+DEFAULT_MAX_GB = float(os.environ.get("MUING_PCM_CACHE_GB", "10"))
+CANONICAL_SAMPLERATE = 44100
+CANONICAL_CHANNELS = 2
+
+
+def iter_ffmpeg_blocks(audio_path, samplerate, channels, block_frames, seek=None, duration=None):
+    """FFmpeg 파이프로 디코딩하면서 [block_frames, 채널] float32 배열을 순서대로 yield
+
+    seek / duration: 초 단위 - 주면 그 구간만 디코딩 (-ss / -t 입력 옵션)
+    """
+    cmd = ["ffmpeg", "-loglevel", "error"]
+    if seek:
+        cmd += ["-ss", f"{seek:.6f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.6f}"]
+    cmd += [
+        "-i", str(audio_path),
+        "-f", "f32le", "-ac", str(channels), "-ar", str(samplerate), "-",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    frame_bytes = 4 * channels
+    try:
+        while True:
+            data = proc.stdout.read(block_frames * frame_bytes)
+            frames = len(data) // frame_bytes
+            if frames == 0:
+                break
+            yield np.frombuffer(data[:frames * frame_bytes], dtype=np.float32).reshape(frames, channels)
+        if proc.wait() != 0:
+            raise RuntimeError(f"FFmpeg 디코딩 실패: {proc.stderr.read().decode(errors='ignore')}")
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stderr.close()
+
+
+class PCMCache:
+    """내용 해시 기반 디코딩 결과 캐시 (크기 제한 LRU)
+
+    구조: <root>/<해시>-<샘플레이트>-<채널>.f32 (+ .json 정보)
+    load()는 [샘플, 채널] float32 memmap을 반환 (copy-on-write라 원본은 안 바뀜)
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root) if root else DEFAULT_PCM_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes if max_bytes is not None else DEFAULT_MAX_GB * 1024 ** 3)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, audio_path, samplerate=CANONICAL_SAMPLERATE, channels=CANONICAL_CHANNELS):
+        return self.root / f"{file_hash(audio_path)}-{samplerate}-{channels}.f32"
+
+    def load(self, audio_path, samplerate=CANONICAL_SAMPLERATE, channels=CANONICAL_CHANNELS):
+        """디코딩된 PCM을 memmap으로 반환 (없으면 디코딩해서 저장)"""
+        path = self.path_for(audio_path, samplerate, channels)
+        if path.exists():
+            self.hits += 1
+            os.utime(path)  # LRU 갱신
+        else:
+            self.misses += 1
+            self._decode(audio_path, path, samplerate, channels)
+        return self.open(path)
+
+    def cached(self, audio_path, samplerate=CANONICAL_SAMPLERATE, channels=CANONICAL_CHANNELS):
+        """이미 디코딩된 PCM이 있으면 memmap, 없으면 None (새로 디코딩하지 않음)"""
+        path = self.path_for(audio_path, samplerate, channels)
+        if not path.exists():
+            return None
+        self.hits += 1
+        os.utime(path)  # LRU 갱신
+        return self.open(path)
+
+    def iter_blocks(self, audio_path, block_frames, samplerate=CANONICAL_SAMPLERATE,
+                    channels=CANONICAL_CHANNELS):
+        """[block_frames, 채널] float32 블록을 순서대로 yield (스트리밍 분리용)
+
+        캐시에 있으면 memmap에서 잘라서, 없으면 FFmpeg 출력을 바로 내보내면서 캐시에도 기록
+        (전체 디코딩을 기다리지 않고 첫 블록부터 처리 가능, 끝까지 읽었을 때만 캐시에 확정)
+        """
+        path = self.path_for(audio_path, samplerate, channels)
+        if path.exists():
+            self.hits += 1
+            os.utime(path)  # LRU 갱신
+            pcm = self.open(path)
+            for start in range(0, pcm.shape[0], block_frames):
+                yield pcm[start:start + block_frames]
+            return
+        self.misses += 1
+        yield from self._decode_blocks(audio_path, path, samplerate, channels, block_frames)
+
+    def open(self, path):
+        info = json.loads(path.with_suffix(".json").read_text())
+        if info["frames"] == 0:
+            return np.zeros((0, info["channels"]), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="c", shape=(info["frames"], info["channels"]))
+
+    def _decode(self, audio_path, path, samplerate, channels):
+        """FFmpeg 출력을 블록 단위로 파일에 바로 기록 (메모리 일정)"""
+        for _ in self._decode_blocks(audio_path, path, samplerate, channels, samplerate * 10):
+            pass
+
+    def _decode_blocks(self, audio_path, path, samplerate, channels, block_frames):
+        """FFmpeg 블록을 임시 파일에 쓰면서 그대로 yield - 끝까지 읽으면 캐시 파일로 확정
+
+        중간에 멈추면(소비자가 닫으면) 임시 파일은 지움
+        """
+        logger.info(f"🎛️ 디코딩: {Path(audio_path).name} → PCM 캐시")
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}.f32"
+        frames = 0
+        try:
+            with open(tmp, "wb") as f:
+                for block in iter_ffmpeg_blocks(audio_path, samplerate, channels, block_frames):
+                    f.write(block.tobytes())
+                    frames += block.shape[0]
+                    yield block
+            info = {"samplerate": samplerate, "channels": channels, "frames": frames,
+                    "source": Path(audio_path).name}
+            path.with_suffix(".json").write_text(json.dumps(info, ensure_ascii=False))
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.evict()
+
+    def evict(self):
+        """용량 초과분을 오래 안 쓴 항목부터 삭제 (가장 최근 항목은 유지)"""
+        with self._lock:
+            # 디코딩 중인 .tmp-* 파일은 제외
+            items = sorted((p for p in self.root.glob("*.f32") if not p.name.startswith(".")),
+                           key=lambda p: p.stat().st_mtime, reverse=True)
+            total = sum(p.stat().st_size for p in items)
+            removed = 0
+            while len(items) > 1 and total > self.max_bytes:
+                oldest = items.pop()
+                total -= oldest.stat().st_size
+                oldest.unlink(missing_ok=True)
+                oldest.with_suffix(".json").unlink(missing_ok=True)
+                removed += 1
+            if removed:
+                logger.info(f"🧹 PCM 캐시 정리: {removed}개 삭제")
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
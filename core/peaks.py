@@ -0,0 +1,174 @@
+"""
+Muing Core - 파형 표시용 min/max 피크 피라미드
+스템을 쓸 때 조각 단위로 같이 계산해서 스템 옆에 저장 → 화면에서는 오디오를 디코딩하지 않고 바로 그림
+
+구조: <결과 디렉토리>/<스템>.peaks.npy ([구간, 2] int8 = min/max, 모든 레벨을 이어 붙임)
+      <결과 디렉토리>/peaks.json (샘플레이트, 레벨별 구간 길이/오프셋)
+레벨 0은 BASE_BLOCK 샘플당 1구간, 위로 갈수록 FACTOR배씩 묶음
+"""
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PEAKS_INFO_FILE = "peaks.json"
+PEAKS_SUFFIX = ".peaks.npy"
+BASE_BLOCK = 256
+FACTOR = 4
+# 이보다 구간 수가 적어지면 위 레벨은 만들지 않음 (화면 폭 정도)
+MIN_LEVEL_BINS = 512
+
+
+def peaks_path(stem_file):
+    stem_file = Path(stem_file)
+    return stem_file.parent / f"{stem_file.stem}{PEAKS_SUFFIX}"
+
+
+def _quantize(values):
+    return np.round(np.clip(values, -1.0, 1.0) * 127).astype(np.int8)
+
+
+def _reduce(mins, maxs, factor):
+    """구간을 factor개씩 묶음 (마지막 남는 구간도 포함)"""
+    pad = -len(mins) % factor
+    if pad:
+        mins = np.concatenate([mins, np.full(pad, mins[-1], dtype=mins.dtype)])
+        maxs = np.concatenate([maxs, np.full(pad, maxs[-1], dtype=maxs.dtype)])
+    return mins.reshape(-1, factor).min(axis=1), maxs.reshape(-1, factor).max(axis=1)
+
+
+class PeakBuilder:
+    """조각 단위로 받은 스템에서 레벨 0 min/max를 누적하고, 끝나면 위 레벨을 한 번에 만듦"""
+
+    def __init__(self, block=BASE_BLOCK):
+        self.block = block
+        self._rest = (np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32))
+        self._mins = []
+        self._maxs = []
+
+    def add(self, data):
+        """data: [샘플, 채널] 배열 - 채널은 합치지 않고 전체 min/max로 봄"""
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[:, None]
+        # 채널 축(2 정도)으로 min()을 부르면 메모리 배치에 따라 수십 배 느려짐 → 채널끼리 원소별 비교
+        lo, hi = data[:, 0], data[:, 0]
+        for channel in range(1, data.shape[1]):
+            lo, hi = np.minimum(lo, data[:, channel]), np.maximum(hi, data[:, channel])
+        # 앞 조각에서 남은 샘플과 이어 붙여서 block 단위로 자름
+        lo = np.concatenate([self._rest[0], lo])
+        hi = np.concatenate([self._rest[1], hi])
+        usable = len(lo) // self.block * self.block
+        if usable:
+            self._mins.append(lo[:usable].reshape(-1, self.block).min(axis=1))
+            self._maxs.append(hi[:usable].reshape(-1, self.block).max(axis=1))
+        self._rest = (lo[usable:], hi[usable:])
+
+    def levels(self):
+        """[(mins, maxs), ...] 레벨 0부터 (float32)"""
+        mins, maxs = list(self._mins), list(self._maxs)
+        if len(self._rest[0]):
+            mins.append(self._rest[0].min(keepdims=True))
+            maxs.append(self._rest[1].max(keepdims=True))
+        if not mins:
+            return []
+        levels = [(np.concatenate(mins), np.concatenate(maxs))]
+        while len(levels[-1][0]) > MIN_LEVEL_BINS:
+            levels.append(_reduce(*levels[-1], FACTOR))
+        return levels
+
+    def save(self, stem_file, samplerate):
+        """<스템>.peaks.npy 저장 → peaks.json에 넣을 레벨 정보 반환"""
+        levels = self.levels()
+        if not levels:
+            return None
+        data = np.concatenate([np.stack([_quantize(lo), _quantize(hi)], axis=1)
+                               for lo, hi in levels])
+        np.save(peaks_path(stem_file), data)
+        offsets = np.cumsum([0] + [len(lo) for lo, _ in levels])
+        return {
+            "samplerate": samplerate,
+            "block": self.block,
+            "factor": FACTOR,
+            "levels": [[int(offsets[i]), len(lo)] for i, (lo, _) in enumerate(levels)],
+        }
+
+
+def write_peaks_info(result_dir, infos):
+    """스템별 레벨 정보를 peaks.json에 합쳐서 기록"""
+    path = Path(result_dir) / PEAKS_INFO_FILE
+    try:
+        existing = json.loads(path.read_text())
+    except (OSError, ValueError):
+        existing = {}
+    existing.update({name: info for name, info in infos.items() if info})
+    path.write_text(json.dumps(existing))
+
+
+def build_peaks(result_dir, block_frames=1 << 18):
+    """피크가 없는 WAV/FLAC 스템에 대해 파일을 읽어서 만듦 (CLI fallback 결과 / 예전 캐시용)"""
+    import soundfile as sf
+
+    result_dir = Path(result_dir)
+    infos = {}
+    for stem_file in sorted(result_dir.iterdir()):
+        if stem_file.suffix not in (".wav", ".flac") or peaks_path(stem_file).exists():
+            continue
+        builder = PeakBuilder()
+        for block in sf.blocks(str(stem_file), blocksize=block_frames, dtype="float32",
+                               always_2d=True):
+            builder.add(block)
+        infos[stem_file.stem] = builder.save(stem_file, sf.info(str(stem_file)).samplerate)
+    if infos:
+        write_peaks_info(result_dir, infos)
+    return infos
+
+
+class PeakPyramid:
+    """저장된 피크 피라미드 (memory-map) - 보이는 범위에 맞는 레벨만 잘라서 반환"""
+
+    def __init__(self, data, info):
+        self.data = data
+        self.samplerate = info["samplerate"]
+        self.block = info["block"]
+        self.factor = info["factor"]
+        self.levels = info["levels"]
+
+    @property
+    def duration(self):
+        return self.levels[0][1] * self.block / self.samplerate
+
+    def view(self, start=0.0, end=None, width=1000):
+        """[start, end)초 구간을 약 width개 점으로 → (시각, min, max) float 배열
+
+        구간이 width개 이상 남는 가장 거친 레벨을 고름 (한 시간짜리도 몇 KB만 읽음)
+        """
+        end = self.duration if end is None else min(end, self.duration)
+        start = max(0.0, min(start, end))
+        level = 0
+        for i in range(len(self.levels) - 1, -1, -1):
+            bin_seconds = self.block * self.factor ** i / self.samplerate
+            if (end - start) / bin_seconds >= width:
+                level = i
+                break
+        offset, length = self.levels[level]
+        bin_seconds = self.block * self.factor ** level / self.samplerate
+        first = int(start / bin_seconds)
+        last = min(length, max(first + 1, int(np.ceil(end / bin_seconds))))
+        bins = np.asarray(self.data[offset + first:offset + last], dtype=np.float32) / 127
+        times = (np.arange(first, last) + 0.5) * bin_seconds
+        return times, bins[:, 0], bins[:, 1]
+
+
+def load_peaks(stem_file):
+    """스템 파일의 피크 피라미드 (없으면 None)"""
+    stem_file = Path(stem_file)
+    try:
+        info = json.loads((stem_file.parent / PEAKS_INFO_FILE).read_text())[stem_file.stem]
+        data = np.load(peaks_path(stem_file), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    return PeakPyramid(data, info)
@@ -0,0 +1,189 @@
+"""
+Muing Core - 리듬 분석 (onset / 템포 / 비트)
+반주 스템의 onset 세기(core.features 저장소에서 공유)로 템포를 추정하고 비트 위치를 찾음
+
+- 템포: onset 세기의 자기상관(FFT 한 번) x 120 BPM 중심 로그 정규 가중치 → 최댓값
+- 비트: 동적 계획법 (Ellis 2007) - 이전 비트 후보 구간 전체를 한 번에 비교
+- onset: 이웃 최댓값 + 임계값 피크 검출 (sliding window 벡터 연산)
+- 결과: {"tempo", "beats", "onsets"} - 스템 내용 해시로 JSON 캐시
+"""
+import hashlib
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from core.cache import file_hash
+from core.features import HOP, SAMPLERATE, default_store
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_RHYTHM_DIR = PROJECT_ROOT / "separated" / "rhythm"
+RHYTHM_VERSION = 1
+
+MIN_BPM = 40.0
+MAX_BPM = 240.0
+# 템포 사전 분포 (중심 BPM, 옥타브 단위 표준편차)
+PRIOR_BPM = 120.0
+PRIOR_OCTAVES = 1.0
+# 비트 간격이 템포에서 벗어날 때의 벌점 (클수록 일정한 간격 강제)
+TIGHTNESS = 100.0
+# onset 피크: 이웃 ±PEAK_RADIUS 프레임 중 최대 + 평균보다 PEAK_DELTA 표준편차 이상
+PEAK_RADIUS = 3
+PEAK_DELTA = 0.5
+
+
+def estimate_tempo(envelope, frame_rate):
+    """onset 세기 → BPM (자기상관 최댓값, 포물선 보간)"""
+    if len(envelope) < 4:
+        return 0.0
+    x = envelope - envelope.mean()
+    size = 1 << int(np.ceil(np.log2(2 * len(x))))
+    spectrum = np.fft.rfft(x, size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(x)]
+    lags = np.arange(len(autocorr))
+    bpm = np.zeros(len(lags))
+    bpm[1:] = 60.0 * frame_rate / lags[1:]
+    valid = (bpm >= MIN_BPM) & (bpm <= MAX_BPM)
+    if not valid.any():
+        return 0.0
+    weight = np.exp(-0.5 * (np.log2(np.maximum(bpm, 1e-9) / PRIOR_BPM) / PRIOR_OCTAVES) ** 2)
+    score = np.where(valid, autocorr * weight, -np.inf)
+    lag = int(score.argmax())
+    # 정수 지연 사이를 포물선으로 보간
+    if 1 < lag < len(score) - 1 and np.isfinite(score[lag - 1]) and np.isfinite(score[lag + 1]):
+        a, b, c = score[lag - 1], score[lag], score[lag + 1]
+        denominator = a - 2 * b + c
+        if denominator != 0:
+            lag = lag + 0.5 * (a - c) / denominator
+    return float(60.0 * frame_rate / lag)
+
+
+def track_beats(envelope, frame_rate, tempo, tightness=TIGHTNESS):
+    """onset 세기 + 템포 → 비트 프레임 번호 (동적 계획법)"""
+    if tempo <= 0 or len(envelope) == 0 or envelope.std() == 0:
+        return np.zeros(0, dtype=np.int64)
+    period = 60.0 * frame_rate / tempo
+    # 템포 간격 정도로 부드럽게 한 onset 세기를 비트 후보 점수로
+    width = max(1, int(period))
+    kernel = np.exp(-0.5 * (np.arange(-width, width + 1) * 32.0 / period) ** 2)
+    local = np.convolve(envelope / envelope.std(), kernel, mode="same")
+
+    # 이전 비트는 현재에서 [period/2, 2*period] 앞 → 그 범위의 벌점을 미리 계산
+    offsets = np.arange(int(np.round(2 * period)), int(np.round(period / 2)) - 1, -1)
+    offsets = offsets[offsets > 0]
+    penalty = -tightness * np.log(offsets / period) ** 2
+    score = local.copy()
+    backlink = np.full(len(local), -1, dtype=np.int64)
+    for t in range(int(offsets.min()), len(local)):
+        candidates = t - offsets
+        valid = candidates >= 0
+        totals = score[candidates[valid]] + penalty[valid]
+        best = int(totals.argmax())
+        if totals[best] > 0:
+            score[t] = local[t] + totals[best]
+            backlink[t] = candidates[valid][best]
+
+    # 끝부분 국소 최댓값 중 점수가 충분히 큰 마지막 프레임에서 역추적
+    peaks = np.flatnonzero((score[1:-1] >= score[:-2]) & (score[1:-1] > score[2:])) + 1
+    if not len(peaks):
+        return np.zeros(0, dtype=np.int64)
+    threshold = 0.5 * np.median(score[peaks])
+    t = int(peaks[score[peaks] >= threshold][-1])
+    beats = []
+    while t >= 0:
+        beats.append(t)
+        t = backlink[t]
+    return np.array(beats[::-1], dtype=np.int64)
+
+
+def pick_onsets(envelope, radius=PEAK_RADIUS, delta=PEAK_DELTA):
+    """onset 세기의 피크 프레임 번호 (이웃 최댓값 + 임계값, 최소 간격 radius)"""
+    if len(envelope) == 0:
+        return np.zeros(0, dtype=np.int64)
+    padded = np.pad(envelope, radius, constant_values=-np.inf)
+    neighborhood = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1).max(axis=1)
+    threshold = envelope.mean() + delta * envelope.std()
+    peaks = np.flatnonzero((envelope >= neighborhood) & (envelope > threshold))
+    if len(peaks) < 2:
+        return peaks
+    # 같은 높이 평탄 구간에서 여러 개가 잡히지 않도록 간격 유지
+    keep = np.diff(peaks, prepend=-radius - 1) > radius
+    return peaks[keep]
+
+
+class RhythmAnalyzer:
+    """반주 스템 → 템포 / 비트 / onset (스템 내용 해시 캐시)
+
+    features: core.features.FeatureStore - onset 세기(와 그 아래 STFT/mel)를 다른 분석과 공유
+    """
+
+    def __init__(self, features=None, samplerate=SAMPLERATE, hop=HOP, cache_dir=None):
+        self.features = features or default_store()
+        self.samplerate = samplerate
+        self.hop = hop
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_RHYTHM_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def frame_rate(self):
+        return self.samplerate / self.hop
+
+    def _cache_path(self, stem_path):
+        payload = {
+            "v": RHYTHM_VERSION,
+            "audio": file_hash(stem_path),
+            "sr": self.samplerate,
+            "hop": self.hop,
+        }
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+        return self.cache_dir / f"{key}.json"
+
+    def cached(self, stem_path):
+        """이미 분석한 결과가 있으면 반환 (없으면 None - 새로 계산하지 않음)"""
+        try:
+            return json.loads(self._cache_path(stem_path).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def analyze(self, stem_path):
+        """{"tempo": BPM, "beats": [초], "onsets": [초]}"""
+        result = self.cached(stem_path)
+        if result is not None:
+            return result
+        envelope = np.asarray(self.features.onset(stem_path, self.samplerate, hop=self.hop),
+                              dtype=np.float64)
+        tempo = estimate_tempo(envelope, self.frame_rate)
+        beats = track_beats(envelope, self.frame_rate, tempo)
+        onsets = pick_onsets(envelope)
+        result = {
+            "tempo": round(tempo, 2),
+            "beats": [round(float(b / self.frame_rate), 3) for b in beats],
+            "onsets": [round(float(o / self.frame_rate), 3) for o in onsets],
+        }
+        path = self._cache_path(stem_path)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(result))
+        os.replace(tmp, path)
+        logger.info(f"🥁 리듬 분석 완료: {result['tempo']:.1f} BPM, 비트 {len(beats)}개")
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="반주 스템에서 템포 / 비트 분석")
+    parser.add_argument("stems", nargs="+", help="반주 스템 파일")
+    args = parser.parse_args()
+
+    analyzer = RhythmAnalyzer()
+    for stem in args.stems:
+        result = analyzer.analyze(stem)
+        print(f"🥁 {stem}: {result['tempo']:.1f} BPM · 비트 {len(result['beats'])}개 · "
+              f"onset {len(result['onsets'])}개")
+    print(f"특징 저장소: {analyzer.features.stats()}")
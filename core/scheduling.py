@@ -0,0 +1,137 @@
+"""
+Muing Core - CPU 스레드 / 코어 배분 정책
+동시 분리 작업들이 코어를 나눠 쓰도록 작업당 스레드 수, 동시 작업 수, 코어 고정(affinity)을 관리
+(작업마다 전체 코어 수만큼 스레드를 띄우면 과다 구독으로 캐시가 깨져서 오히려 느려짐)
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Demucs는 스레드 8개 이상부터는 거의 빨라지지 않음 → 남는 코어는 동시 작업으로
+DEFAULT_MAX_THREADS_PER_JOB = 8
+
+
+def available_cores():
+    """이 프로세스가 쓸 수 있는 CPU 목록 (컨테이너 cpuset 반영)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+class CoreSlot:
+    """작업 하나에 배정된 코어 묶음"""
+
+    def __init__(self, index, cores, threads, pin):
+        self.index = index
+        self.cores = cores
+        self.threads = threads
+        self.pin = pin
+
+    def env(self):
+        """하위 프로세스(demucs CLI)용 스레드 수 환경 변수"""
+        value = str(self.threads)
+        return dict(os.environ, OMP_NUM_THREADS=value, MKL_NUM_THREADS=value,
+                    OPENBLAS_NUM_THREADS=value)
+
+    def pin_process(self, pid):
+        """시작한 하위 프로세스를 코어 묶음에 고정 (pin=False면 아무것도 안 함)
+
+        preexec_fn은 스레드가 있는 프로세스(Streamlit, 작업 워커)에서 fork 후 교착될 수 있어서
+        Popen 직후 pid로 고정 - 연산 스레드는 그 뒤에 만들어지므로 같은 affinity를 물려받음
+        """
+        if not self.pin or not hasattr(os, "sched_setaffinity"):
+            return
+        try:
+            os.sched_setaffinity(pid, set(self.cores))
+        except ProcessLookupError:
+            pass  # 이미 끝난 프로세스
+
+
+class SchedulingPolicy:
+    """작업당 스레드 수 / 동시 작업 수 / 코어 고정 정책
+
+    threads_per_job: 작업 하나가 쓰는 연산 스레드 수 (기본: 코어 수와 8 중 작은 값)
+    max_jobs: 동시에 추론하는 작업 수 (기본: 코어 수 / threads_per_job)
+    pin_cores: True면 작업마다 겹치지 않는 코어 묶음에 고정 - CLI 하위 프로세스는 프로세스 전체가
+    고정되지만, 인프로세스 추론은 작업 스레드만 고정하는 best-effort (torch 연산 스레드 풀은
+    프로세스 공용이라 작업 간 격리가 안 됨 - 격리가 필요하면 작업마다 프로세스를 따로 띄울 것)
+    환경 변수 MUING_THREADS_PER_JOB / MUING_MAX_JOBS / MUING_PIN_CORES로도 설정 가능
+    """
+
+    def __init__(self, threads_per_job=None, max_jobs=None, pin_cores=None, cores=None):
+        self.cores = list(cores) if cores is not None else available_cores()
+        n = len(self.cores)
+        self.threads_per_job = max(1, min(
+            threads_per_job or _env_int("MUING_THREADS_PER_JOB")
+            or min(n, DEFAULT_MAX_THREADS_PER_JOB), n))
+        self.max_jobs = max(1, max_jobs or _env_int("MUING_MAX_JOBS")
+                            or n // self.threads_per_job)
+        if pin_cores is None:
+            pin_cores = os.environ.get("MUING_PIN_CORES", "0") == "1"
+        # 작업 수 x 스레드 수가 코어 수를 넘으면 고정해도 겹치므로 고정 안 함
+        self.pin_cores = pin_cores and self.max_jobs * self.threads_per_job <= n
+        self._free = list(range(self.max_jobs))
+        self._cond = threading.Condition()
+
+    def __repr__(self):
+        return (f"SchedulingPolicy(cores={len(self.cores)}, threads_per_job={self.threads_per_job}, "
+                f"max_jobs={self.max_jobs}, pin_cores={self.pin_cores})")
+
+    def cores_for(self, index):
+        start = index * self.threads_per_job
+        if self.pin_cores:
+            return self.cores[start:start + self.threads_per_job]
+        return list(self.cores)
+
+    @contextmanager
+    def slot(self):
+        """코어 묶음 하나를 빌려옴 (전부 사용 중이면 반납될 때까지 대기)"""
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            index = self._free.pop(0)
+        try:
+            yield CoreSlot(index, self.cores_for(index), self.threads_per_job, self.pin_cores)
+        finally:
+            with self._cond:
+                self._free.append(index)
+                self._cond.notify()
+
+    @contextmanager
+    def pinned(self, slot):
+        """현재 스레드만 슬롯의 코어에 고정 (best-effort) - 끝나면 원래대로
+
+        리눅스 sched_setaffinity(0)은 호출한 스레드에만 적용 → torch가 이미 띄운 연산 스레드는
+        고정되지 않음 (하위 프로세스는 CoreSlot.pin_process로 프로세스 전체를 고정)
+        """
+        if not slot.pin or not hasattr(os, "sched_setaffinity"):
+            yield
+            return
+        previous = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, set(slot.cores))
+        try:
+            yield
+        finally:
+            os.sched_setaffinity(0, previous)
+
+
+_default_policy = None
+_default_lock = threading.Lock()
+
+
+def default_policy():
+    """프로세스 공용 정책 (여러 MuingSeparator가 같은 코어 슬롯을 나눠 씀)"""
+    global _default_policy
+    with _default_lock:
+        if _default_policy is None:
+            _default_policy = SchedulingPolicy()
+            logger.info(f"🧮 스케줄링: {_default_policy}")
+        return _default_policy
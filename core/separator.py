@@ -3,7 +3,12 @@ Muing Core - 음원 분리 모듈
 FFmpeg 설치 후 작동 버전
 """
 import os
+import shlex
+import shutil
 import subprocess
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 import logging
 import sys
@@ -12,112 +17,704 @@ import sys
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from core.cache import ResultCache, file_hash
+from core.capabilities import capabilities, device_available
+from core.encoding import StemWriter, check_format, stem_files, stem_path, transcode_dir
+from core.engine import PRECISIONS, DemucsEngine, combine_stems
+from core.live import iter_source_blocks
+from core.metrics import METRICS, RunTrace
+from core.pcm_cache import PCMCache
+from core.scheduling import default_policy
+
+# 스트리밍 분리 결과와 전체 트랙 분리 결과의 최소 SNR (dB)
+STREAM_TOLERANCE_DB = 30.0
+# 저정밀(bf16/int8) 결과와 fp32 결과의 최소 SDR (dB) - check_precision_drift 기준
+PRECISION_TOLERANCE_DB = 20.0
+# 세그먼트 전체 RMS가 이보다 낮으면(dBFS) 모델을 건너뛰고 무음으로 기록 - 사실상 들리지 않는 레벨
+SILENCE_DB = -60.0
+# 구간 미리듣기 기본 길이(초)와 메모리에 보관할 미리듣기 결과 수 (전체 분리 때 재사용)
+PREVIEW_SECONDS = 20.0
+MAX_PREVIEWS = 4
+
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
 logger = logging.getLogger(__name__)
 
 class MuingSeparator:
-    """Muing 음원 분리 엔진"""
+    """Muing 음원 분리 엔진
+    
+    engine="inprocess": 모델을 한 번 로드해서 계속 재사용 (기본값)
+    engine="subprocess": 매번 demucs CLI 실행 (인프로세스 엔진을 못 쓸 때 자동 fallback)
+    preload=False면 모델은 첫 분리 때 로드 (warm_up()으로 백그라운드에서 미리 로드 가능)
+    scheduling: core.scheduling.SchedulingPolicy - 작업당 스레드 수 / 동시 작업 수 / 코어 고정
+    (기본은 프로세스 공용 정책, 같은 프로세스의 Separator들이 코어 슬롯을 나눠 씀)
+    precision: "fp32" | "bf16" | "int8" - 인프로세스 엔진의 추론 정밀도 (빠른 모드, 품질은
+    check_precision_drift로 확인). CLI fallback은 항상 fp32이고 결과 dict에 실제 값이 기록됨
+    silence_db: 이 레벨 아래인 세그먼트는 추론 생략 (None이면 끔) - 건너뛴 길이는 결과 dict의
+    skipped_seconds
+    """
     
-    def __init__(self, model="htdemucs", device="cpu"):
+    def __init__(self, model="htdemucs", device="cpu", engine="inprocess", cache=None,
+                 pcm_cache=None, metrics=None, preload=True, scheduling=None, precision="fp32",
+                 silence_db=SILENCE_DB):
+        if precision not in PRECISIONS:
+            raise ValueError(f"지원하지 않는 precision: {precision} (가능: {', '.join(PRECISIONS)})")
         self.model = model
+        if not device_available(device):
+            logger.warning(f"⚠️ 장치 {device} 사용 불가, cpu로 실행합니다")
+            device = "cpu"
         self.device = device
+        self.scheduling = scheduling or default_policy()
+        self.precision = precision
+        self.silence_db = silence_db
+        # 미리듣기 구간 분리 결과 (전체 분리 때 재사용) - {설정 키: (시작 샘플, {소스명: 텐서})}
+        self._previews = OrderedDict()
+        self._previews_lock = threading.Lock()
+        self.shifts = 1
+        self.overlap = 0.25
         self.output_dir = PROJECT_ROOT / "separated"  # outputs 대신 separated 사용
         self.output_dir.mkdir(parents=True, exist_ok=True)
         logger.info(f"📁 출력 디렉토리: {self.output_dir}")
         
+        # 결과 캐시 (내용 해시 기반, web/app.py와 공유)
+        self.cache = cache or ResultCache(self.output_dir / "cache")
+        # 디코딩 결과 캐시 (모델/스템 설정을 바꿔도 디코딩은 한 번만, 분석 모듈과 공유)
+        self.pcm_cache = pcm_cache or PCMCache(self.output_dir / "pcm")
+        # 계측 (단계별 시간, 카운터/히스토그램 - core.metrics)
+        self.metrics = metrics or METRICS
+        
         # FFmpeg 확인
         if not self.check_ffmpeg():
             raise RuntimeError("FFmpeg가 설치되지 않았습니다")
+        
+        # 인프로세스 엔진: 모델을 미리 로드해서 warm 상태 유지
+        self.engine = None
+        if engine == "inprocess":
+            try:
+                self.engine = DemucsEngine(model=model, device=device,
+                                           shifts=self.shifts, overlap=self.overlap,
+                                           pcm_cache=self.pcm_cache, precision=precision,
+                                           silence_db=silence_db)
+                if preload:
+                    self._load_engine()
+            except Exception as e:
+                logger.warning(f"⚠️ 인프로세스 엔진 사용 불가, CLI로 대체: {e}")
+                self.engine = None
+        self.engine_mode = "inprocess" if self.engine else "subprocess"
+        logger.info(f"⚙️ 엔진 모드: {self.engine_mode}")
     
-    def check_ffmpeg(self):
-        """FFmpeg 설치 확인"""
+    def _load_engine(self):
+        self.engine.load()
+        self.metrics.observe("stage_seconds", self.engine.load_seconds,
+                             help="단계별 처리 시간(초)", stage="model_load")
+    
+    def warm_up(self):
+        """모델을 백그라운드 스레드에서 로드 (UI가 먼저 뜨도록) - 이미 로드됐으면 None"""
+        if self.engine is None or self.engine.loaded:
+            return None
+        thread = threading.Thread(target=self._warm_up, name="muing-warmup", daemon=True)
+        thread.start()
+        return thread
+    
+    def _warm_up(self):
         try:
-            result = subprocess.run("ffmpeg -version", shell=True, capture_output=True)
-            if result.returncode == 0:
-                logger.info("✅ FFmpeg 확인됨")
-                return True
-        except:
-            pass
+            self._load_engine()
+        except Exception as e:
+            logger.warning(f"⚠️ 인프로세스 엔진 사용 불가, CLI로 대체: {e}")
+            self.engine = None
+            self.engine_mode = "subprocess"
+    
+    @contextmanager
+    def cpu_slot(self, trace):
+        """코어 슬롯을 빌려서 추론 (대기 시간은 wait 단계)
+
+        동시 작업 수는 슬롯으로 제한. 스레드 수는 프로세스 전역이라 정책 값으로 한 번만 설정하고,
+        affinity는 현재 스레드만 고정하는 best-effort (core.scheduling.SchedulingPolicy.pinned)
+        """
+        with ExitStack() as stack:
+            with trace.stage("wait"):
+                slot = stack.enter_context(self.scheduling.slot())
+            stack.enter_context(self.scheduling.pinned(slot))
+            engine = self.engine
+            if engine is not None and self.device == "cpu":
+                engine.set_num_threads(self.scheduling.threads_per_job)
+            trace.info["threads"] = slot.threads
+            yield slot
+    
+    def check_ffmpeg(self):
+        """FFmpeg 설치 확인 (core.capabilities - 프로세스당 1회, 결과는 디스크에도 캐시)"""
+        if capabilities()["ffmpeg"]:
+            logger.info("✅ FFmpeg 확인됨")
+            return True
         
         logger.error("❌ FFmpeg가 없습니다. 설치: sudo apt install ffmpeg")
         return False
     
-    def separate(self, audio_path, stems=2):
-        """음원 분리 실행 - 단순하고 안정적인 버전"""
-        # 경로 처리
+    def _resolve_path(self, audio_path):
+        """상대 경로는 프로젝트 루트 기준으로 처리"""
         if not Path(audio_path).is_absolute():
             audio_path = PROJECT_ROOT / audio_path
         audio_path = Path(audio_path)
         
         if not audio_path.exists():
             raise FileNotFoundError(f"파일을 찾을 수 없습니다: {audio_path}")
+        return audio_path
+    
+    def cache_key(self, audio_path, stems, output_format="wav", bitrate=None, **extra):
+        """결과 캐시 키 (모델 / 스템 / 포맷 / 정밀도 등 결과에 영향을 주는 설정 포함)"""
+        if output_format != "opus":
+            bitrate = None
+        if self.precision != "fp32":
+            extra["precision"] = self.precision
+        if self.silence_db is not None:
+            extra["silence_db"] = self.silence_db
+        return self.cache.key_for(audio_path, self.model, stems,
+                                  shifts=self.shifts, overlap=self.overlap,
+                                  format=output_format, bitrate=bitrate, **extra)
+    
+    def separate(self, audio_path, stems=2, progress=None, output_format="wav", bitrate=None,
+                 trace=None):
+        """음원 분리 실행 - 단순하고 안정적인 버전
         
-        logger.info(f"🎵 Muing 음원 분리 시작: {audio_path.name}")
-        logger.info(f"📊 파일 크기: {audio_path.stat().st_size / 1024:.1f} KB")
+        progress: 콜백(처리한 세그먼트 수, 전체 세그먼트 수) - 백그라운드 작업 진행률용
+        output_format: "wav" | "flac" | "opus" | "f16" | "s16" (raw PCM), bitrate는 Opus용 kbps
+        trace: core.metrics.RunTrace - 넘기면 끝난 뒤 trace.event로 단계별 계측 결과 확인 가능
+        """
+        trace = self.start_trace(trace, audio_path, stems=stems, format=output_format)
+        result = None
+        try:
+            result = self._separate(audio_path, stems, progress, output_format, bitrate, trace)
+            return result
+        finally:
+            self.finish_trace(trace, result)
+    
+    def _separate(self, audio_path, stems, progress, output_format, bitrate, trace):
+        with trace.stage("lookup"):
+            audio_path = self._resolve_path(audio_path)
+            check_format(output_format)
+            
+            logger.info(f"🎵 Muing 음원 분리 시작: {audio_path.name}")
+            logger.info(f"📊 파일 크기: {audio_path.stat().st_size / 1024:.1f} KB")
+            
+            # 캐시 확인: 같은 내용 + 같은 설정이면 바로 반환
+            key = self.cache_key(audio_path, stems, output_format, bitrate)
+            cached = self.cache.get(key)
+        if cached is not None:
+            trace.info.update(mode="cache", cache_hit=True)
+            if progress is not None:
+                progress(1, 1)
+            return self._report(cached)
+        
+        staging = self.cache.staging_dir()
+        done = False
+        with self.cpu_slot(trace) as slot:
+            if self.engine is not None:
+                trace.info.update(mode="inprocess", precision=self.precision)
+                try:
+                    self.engine.separate_to_dir(audio_path, staging, stems=stems, progress=progress,
+                                                output_format=output_format, bitrate=bitrate,
+                                                trace=trace, reuse=self._get_preview(audio_path))
+                    done = True
+                except Exception as e:
+                    logger.error(f"❌ 인프로세스 분리 실패, CLI로 재시도: {e}")
+            
+            if not done:
+                trace.info.update(mode="subprocess", precision="fp32")
+                with trace.stage("subprocess"):
+                    done = self._separate_subprocess(audio_path, staging, stems, slot)
+                if done:
+                    with trace.stage("transcode"):
+                        transcode_dir(staging, output_format, bitrate)
         
-        # Demucs 명령어 (가장 단순한 형태)
+        if not done:
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        
+        logger.info("✅ 분리 완료!")
+        with trace.stage("store"):
+            result_path = self._store(key, staging, audio_path, stems, output_format,
+                                      trace.audio_seconds, precision=trace.info["precision"],
+                                      skipped_seconds=trace.info.get("skipped_seconds", 0.0))
+        return self._report(result_path)
+    
+    def _store(self, key, staging, audio_path, stems, output_format, audio_seconds=None, **meta):
+        """결과를 캐시에 확정 (결과 색인용 입력 해시 / 음원 길이 포함)"""
+        return self.cache.put(key, staging, name=audio_path.name, input_hash=file_hash(audio_path),
+                              model=self.model, stems=stems, format=output_format,
+                              audio_seconds=audio_seconds, **meta)
+    
+    def start_trace(self, trace, audio_path, **info):
+        """계측 시작 - trace가 없으면 새로 만들고 파일 / 모델 / 장치 정보 기록"""
+        trace = trace or RunTrace()
+        if trace.metrics is None:
+            trace.metrics = self.metrics
+        trace.info.update(file=Path(audio_path).name, model=self.model, device=self.device,
+                          precision=self.precision, cache_hit=False, **info)
+        return trace
+    
+    def finish_trace(self, trace, result):
+        """이벤트 기록 + 캐시 적중률 갱신"""
+        hit = trace.info.get("cache_hit")
+        self.metrics.inc("cache_lookups_total", help="결과 캐시 조회 수",
+                         result="hit" if hit else "miss")
+        self.metrics.set("pcm_cache_hits", self.pcm_cache.hits, help="PCM 캐시 적중 수")
+        self.metrics.set("pcm_cache_misses", self.pcm_cache.misses, help="PCM 캐시 미적중 수")
+        event = trace.finish("ok" if result else "failed")
+        if not hit and result:
+            stages = " · ".join(f"{name} {s['wall']:.1f}초" for name, s in event["stages"].items())
+            rtf = f", RTF {event['rtf']:.2f}" if event["rtf"] is not None else ""
+            logger.info(f"⏱️ {stages} (총 {event['wall_seconds']:.1f}초{rtf})")
+            if event.get("skipped_seconds"):
+                logger.info(f"🔇 무음 구간 {event['skipped_seconds']:.1f}초는 추론 생략")
+            if event.get("reused_seconds"):
+                logger.info(f"♻️ 미리듣기 구간 {event['reused_seconds']:.1f}초 재사용")
+    
+    def _report(self, result_path):
+        """결과 파일 로그 출력"""
+        files = stem_files(result_path)
+        logger.info(f"📁 결과 위치: {result_path}")
+        logger.info(f"📄 생성된 파일: {len(files)}개")
+        for f in files:
+            logger.info(f"  - {f.name}: {f.stat().st_size / 1024 / 1024:.1f} MB")
+        return result_path
+    
+    def _separate_subprocess(self, audio_path, out_dir, stems=2, slot=None):
+        """demucs CLI 실행 (fallback 경로) - 결과 wav를 out_dir로 모음
+        
+        slot: core.scheduling.CoreSlot - 스레드 수 환경 변수 + 코어 고정 적용
+        """
+        # 인프로세스 경로(StemWriter)와 같은 ±0.99 clamp (CLI 기본값 rescale은 스템마다 음량이 달라짐)
+        cmd = ["demucs", "-n", self.model, "-d", self.device, "--clip-mode", "clamp",
+               "-o", str(out_dir), str(audio_path)]
         if stems == 2:
-            cmd = f"demucs --two-stems=vocals -d cpu -o {self.output_dir} \"{audio_path}\""
-        else:
-            cmd = f"demucs -d cpu -o {self.output_dir} \"{audio_path}\""
+            cmd[1:1] = ["--two-stems=vocals"]
         
-        logger.info(f"🔄 실행 명령: {cmd}")
+        logger.info(f"🔄 실행 명령: {shlex.join(cmd)}")
         
-        # 실행
+        # 실행 (셸 없이 바로 실행해야 pid가 demucs 프로세스 자체 → 시작 직전이 아니라 직후에 코어 고정)
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                    env=slot.env() if slot else None)
+            if slot:
+                slot.pin_process(proc.pid)
+            _, stderr = proc.communicate()
             
-            if result.returncode == 0:
-                logger.info("✅ 분리 완료!")
-                
-                # 결과 경로 찾기 (Demucs는 htdemucs 폴더에 저장)
-                stem_name = audio_path.stem
-                result_path = self.output_dir / "htdemucs" / stem_name
-                
-                if result_path.exists():
-                    # 결과 파일 확인
-                    files = list(result_path.glob("*.wav"))
-                    logger.info(f"📁 결과 위치: {result_path}")
-                    logger.info(f"�� 생성된 파일: {len(files)}개")
-                    for f in files:
-                        logger.info(f"  - {f.name}: {f.stat().st_size / 1024 / 1024:.1f} MB")
-                    return result_path
-                else:
-                    logger.warning(f"⚠️ 예상 경로에 결과 없음: {result_path}")
-                    # 다른 가능한 경로 탐색
-                    for path in self.output_dir.iterdir():
-                        if path.is_dir():
-                            possible = path / stem_name
-                            if possible.exists():
-                                logger.info(f"📁 결과 발견: {possible}")
-                                return possible
-                    
-                    logger.error("❌ 결과 파일을 찾을 수 없습니다")
-                    return None
-            else:
+            if proc.returncode != 0:
                 logger.error(f"❌ Demucs 실행 실패")
-                logger.error(f"에러: {result.stderr}")
-                return None
+                logger.error(f"에러: {stderr}")
+                return False
+            
+            # Demucs는 <out_dir>/<모델>/<파일명>/ 에 저장 → out_dir 바로 아래로 이동
+            files = list(out_dir.glob("*/*/*.wav"))
+            if not files:
+                logger.error("❌ 결과 파일을 찾을 수 없습니다")
+                return False
+            for f in files:
+                shutil.move(str(f), str(out_dir / f.name))
+            # 인프로세스 시도에서 남은 다른 포맷 파일 정리
+            for f in stem_files(out_dir):
+                if f.suffix != ".wav":
+                    f.unlink()
+            shutil.rmtree(files[0].parent.parent, ignore_errors=True)
+            return True
                 
         except Exception as e:
             logger.error(f"❌ 오류 발생: {e}")
-            return None
+            return False
+    
+    def _preview_key(self, audio_path):
+        # 스템 수 / 출력 포맷과 무관하게 모델 출력(전체 소스)을 재사용
+        return self.cache_key(audio_path, "sources")
+    
+    def _get_preview(self, audio_path):
+        with self._previews_lock:
+            return self._previews.get(self._preview_key(audio_path))
     
-    def separate_file(self, file_path):
-        """외부에서 쉽게 사용할 수 있는 간단한 인터페이스"""
+    def _remember_preview(self, audio_path, start, sources):
+        with self._previews_lock:
+            key = self._preview_key(audio_path)
+            self._previews[key] = (start, sources)
+            self._previews.move_to_end(key)
+            while len(self._previews) > MAX_PREVIEWS:
+                self._previews.popitem(last=False)
+    
+    def separate_range(self, audio_path, start, end=None, stems=2, progress=None,
+                       output_format="wav", bitrate=None, trace=None):
+        """[start, end)초 구간만 분리 (나머지는 처리 안 함) - 미리듣기용
+        
+        end가 없으면 start부터 PREVIEW_SECONDS초. 결과는 메모리에 보관돼서
+        이후 같은 파일의 separate() 전체 분리가 이 구간을 다시 계산하지 않음
+        """
+        if self.engine is None:
+            raise RuntimeError("구간 분리는 인프로세스 엔진이 필요합니다")
+        if end is None:
+            end = start + PREVIEW_SECONDS
+        if not 0 <= start < end:
+            raise ValueError("구간은 0 <= start < end 이어야 합니다")
+        trace = self.start_trace(trace, audio_path, stems=stems, format=output_format,
+                                  mode="range", range=(start, end))
+        result = None
         try:
-            result = self.separate(file_path)
+            with trace.stage("lookup"):
+                audio_path = self._resolve_path(audio_path)
+                check_format(output_format)
+                key = self.cache_key(audio_path, stems, output_format, bitrate,
+                                      range=(start, end))
+                cached = self.cache.get(key)
+            if cached is not None:
+                trace.info.update(mode="cache", cache_hit=True)
+                result = self._report(cached)
+                return result
+            
+            logger.info(f"⏩ 구간 분리: {audio_path.name} [{start:.1f}초, {end:.1f}초)")
+            with self.cpu_slot(trace):
+                samplerate = self.engine.samplerate
+                length = int((end - start) * samplerate)
+                with trace.stage("decode"):
+                    # 구간 + 앞뒤 context만 디코딩 (파일 전체를 읽지 않음)
+                    wav, offset = self.engine.load_range(audio_path, start, end)
+                    total = offset + wav.shape[-1]
+                    if total < int(start * samplerate) + length:
+                        # 파일보다 뒤쪽을 요청 → 끝에 맞춰서 같은 길이만큼
+                        if wav.shape[-1]:
+                            # 디코딩이 일찍 끝난 곳이 파일 끝 → 그 앞쪽만 다시 디코딩
+                            length = min(length, total)
+                            begin = (total - length) / samplerate
+                            wav, offset = self.engine.load_range(audio_path, begin,
+                                                                 begin + length / samplerate)
+                        else:
+                            # 시작 위치가 파일 끝보다 뒤라 길이를 모름 → 전체 디코딩
+                            wav, offset = self.engine.load_audio(audio_path), 0
+                            total = wav.shape[-1]
+                            length = min(length, total)
+                lo = min(int(start * samplerate), total - length)
+                trace.audio_seconds = length / samplerate
+                info = {}
+                with trace.stage("inference"):
+                    sources = self.engine.separate_span(wav, lo - offset, lo - offset + length,
+                                                        progress=progress, info=info)
+            self._remember_preview(audio_path, lo, sources)
+            trace.info["skipped_seconds"] = info["skipped_seconds"]
+            
+            staging = self.cache.staging_dir()
+            with trace.stage("write"):
+                writer = StemWriter(staging, samplerate, output_format, bitrate)
+                writer.write(combine_stems(sources, stems))
+                writer.close()
+            with trace.stage("store"):
+                result_path = self._store(key, staging, audio_path, stems, output_format,
+                                          trace.audio_seconds, precision=self.precision,
+                                          preview=(start, end),
+                                          skipped_seconds=info["skipped_seconds"])
+            result = self._report(result_path)
+            return result
+        finally:
+            self.finish_trace(trace, result)
+    
+    def separate_stream(self, audio_path, stems=2, window_seconds=30.0, overlap_seconds=5.0,
+                        progress=None, output_format="wav", bitrate=None, trace=None):
+        """긴 트랙용 스트리밍 분리 - 윈도우 단위로 처리하고 스템 파일에 바로 기록
+        
+        메모리 사용량이 트랙 길이와 무관하게 일정 (DJ 셋, 라이브 녹음 등)
+        결과는 전체 트랙 분리와 STREAM_TOLERANCE_DB 이상의 SNR로 일치 (check_stream_consistency 참고)
+        separate_range로 미리 분리한 구간이 있으면 그 구간은 재사용 (경계는 크로스페이드)
+        """
+        if self.engine is None:
+            raise RuntimeError("스트리밍 분리는 인프로세스 엔진이 필요합니다")
+        trace = self.start_trace(trace, audio_path, stems=stems, format=output_format,
+                                  mode="stream")
+        result = None
+        try:
+            with trace.stage("lookup"):
+                audio_path = self._resolve_path(audio_path)
+                
+                logger.info(f"🌊 스트리밍 분리 시작: {audio_path.name} (윈도우 {window_seconds}초)")
+                key = self.cache_key(audio_path, stems, output_format, bitrate,
+                                      stream=(window_seconds, overlap_seconds))
+                cached = self.cache.get(key)
+            if cached is not None:
+                trace.info.update(mode="cache", cache_hit=True)
+                result = self._report(cached)
+                return result
+            
+            staging = self.cache.staging_dir()
+            try:
+                with self.cpu_slot(trace):
+                    self.engine.stream_to_dir(audio_path, staging, stems=stems,
+                                              window_seconds=window_seconds,
+                                              overlap_seconds=overlap_seconds, progress=progress,
+                                              output_format=output_format, bitrate=bitrate,
+                                              trace=trace, reuse=self._get_preview(audio_path))
+            except Exception as e:
+                logger.error(f"❌ 스트리밍 분리 실패: {e}")
+                shutil.rmtree(staging, ignore_errors=True)
+                return None
+            
+            logger.info("✅ 분리 완료!")
+            with trace.stage("store"):
+                result_path = self._store(key, staging, audio_path, stems, output_format,
+                                          trace.audio_seconds, precision=self.precision,
+                                          skipped_seconds=trace.info.get("skipped_seconds", 0.0))
+            result = self._report(result_path)
+            return result
+        finally:
+            self.finish_trace(trace, result)
+    
+    def iter_stream(self, audio_path, stems=2, window_seconds=30.0, overlap_seconds=5.0):
+        """스템 조각을 완성되는 대로 yield하는 제너레이터 - {스템명: [채널, 샘플] 텐서}"""
+        if self.engine is None:
+            raise RuntimeError("스트리밍 분리는 인프로세스 엔진이 필요합니다")
+        audio_path = self._resolve_path(audio_path)
+        for sources in self.engine.iter_stream(audio_path, window_seconds, overlap_seconds):
+            yield combine_stems(sources, stems)
+    
+    def separate_live(self, source, stems=2, block_seconds=1.0, lookahead_seconds=0.5,
+                      context_seconds=None, raw_format="f32le", follow_seconds=0.0, stats=None,
+                      trace=None):
+        """실시간 분리 - 입력 블록이 들어오는 대로 block_seconds 단위 스템 조각을 yield
+
+        source: 배열 iterator / 파일 객체(ffmpeg 파이프 등) / 쓰는 중인 파일 경로 (core.live 참고)
+        지연은 block_seconds + lookahead_seconds로 제한되고, 블록 처리 시간이 블록 길이를 넘으면
+        deadline miss로 기록 (stats dict / live_deadline_misses_total 카운터)
+        코어 슬롯은 스트림이 끝날 때까지 점유 (모델은 계속 올라가 있는 인프로세스 엔진 사용)
+        """
+        if self.engine is None:
+            raise RuntimeError("실시간 분리는 인프로세스 엔진이 필요합니다")
+        import torch
+
+        engine = self.engine
+        stats = stats if stats is not None else {}
+        trace = self.start_trace(trace, "live", stems=stems, mode="live")
+        result = None
+        try:
+            with self.cpu_slot(trace):
+                blocks = iter_source_blocks(source, engine.samplerate, engine.audio_channels,
+                                            raw_format, follow_seconds=follow_seconds)
+                tensors = (torch.from_numpy(block.copy()).t() for block in blocks)
+                misses = 0
+                frames = 0
+                for sources in engine.iter_live(tensors, block_seconds, lookahead_seconds,
+                                                context_seconds, info=stats):
+                    self.metrics.observe("live_block_seconds", stats["last_block_seconds"],
+                                         help="실시간 모드 블록 처리 시간(초)")
+                    if stats["deadline_misses"] > misses:
+                        misses = stats["deadline_misses"]
+                        self.metrics.inc("live_deadline_misses_total",
+                                         help="실시간 모드 데드라인 초과 블록 수")
+                    frames += next(iter(sources.values())).shape[-1]
+                    yield combine_stems(sources, stems)
+            trace.audio_seconds = frames / engine.samplerate
+            trace.info.update({f"live_{k}": v for k, v in stats.items()})
+            result = True
+            logger.info(f"🎙️ 실시간 분리 종료: {stats['blocks']}블록, RTF {stats['rtf']:.2f}, "
+                        f"데드라인 초과 {stats['deadline_misses']}회")
+        finally:
+            self.finish_trace(trace, result)
+
+    def separate_batch(self, paths, stems=2, max_batch_segments=8, output_format="wav",
+                       bitrate=None):
+        """여러 파일을 세그먼트 배치로 묶어 한 번에 분리
+        
+        짧은 클립이 여러 개 대기 중일 때 사용. 결과는 separate_file과 같은 dict 리스트 (입력 순서 유지)
+        """
+        check_format(output_format)
+        results = [None] * len(paths)
+        pending = []
+        for i, path in enumerate(paths):
+            try:
+                audio_path = self._resolve_path(path)
+                key = self.cache_key(audio_path, stems, output_format, bitrate)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    results[i] = self._result_dict(cached)
+                else:
+                    pending.append((i, audio_path, key))
+            except Exception as e:
+                results[i] = {'success': False, 'error': str(e)}
+        
+        if pending and self.engine is not None:
+            logger.info(f"📦 배치 분리 시작: {len(pending)}개 파일 (배치당 최대 {max_batch_segments} 세그먼트)")
+            trace = self.start_trace(None, f"{len(pending)} files", stems=stems,
+                                      format=output_format, mode="batch", files=len(pending))
+            writers = []
+            batch_ok = False
+            try:
+                with trace.stage("decode"):
+                    wavs = [self.engine.load_audio(audio_path) for _, audio_path, _ in pending]
+                trace.audio_seconds = sum(wav.shape[-1] for wav in wavs) / self.engine.samplerate
+                writers = [StemWriter(self.cache.staging_dir(), self.engine.samplerate,
+                                      output_format, bitrate) for _ in pending]
+                info = {}
+                with self.cpu_slot(trace), trace.stage("inference"):
+                    self.engine.separate_tensors(
+                        wavs, max_batch_segments=max_batch_segments,
+                        sink=lambda index, sources: writers[index].write(combine_stems(sources, stems)),
+                        info=info
+                    )
+                trace.info["skipped_seconds"] = sum(info["skipped_seconds"])
+                for (i, audio_path, key), wav, writer, skipped_seconds in zip(
+                        pending, wavs, writers, info["skipped_seconds"]):
+                    with trace.stage("write"):
+                        writer.close()
+                    with trace.stage("store"):
+                        result_path = self._store(key, writer.out_dir, audio_path, stems,
+                                                  output_format,
+                                                  wav.shape[-1] / self.engine.samplerate,
+                                                  precision=self.precision,
+                                                  skipped_seconds=skipped_seconds)
+                    results[i] = self._result_dict(result_path)
+                pending = []
+                batch_ok = True
+            except Exception as e:
+                logger.error(f"❌ 배치 분리 실패, 파일별로 재시도: {e}")
+                for writer in writers:
+                    if writer.out_dir.exists():
+                        shutil.rmtree(writer.out_dir, ignore_errors=True)
+            finally:
+                self.finish_trace(trace, batch_ok)
+        
+        # 엔진이 없거나 배치 실패 시 하나씩 처리
+        for i, audio_path, _ in pending:
+            if results[i] is None:
+                results[i] = self.separate_file(audio_path, stems=stems, output_format=output_format,
+                                                bitrate=bitrate)
+        return results
+    
+    def _result_dict(self, result):
+        meta = self.cache.read_meta(result)
+        return {
+            'success': True,
+            'path': result,
+            'vocals': stem_path(result, "vocals"),
+            'accompaniment': stem_path(result, "no_vocals"),
+            'precision': meta.get('precision', 'fp32'),
+            'skipped_seconds': meta.get('skipped_seconds', 0.0)
+        }
+    
+    def separate_file(self, file_path, stems=2, output_format="wav", bitrate=None):
+        """외부에서 쉽게 사용할 수 있는 간단한 인터페이스 (metrics: 단계별 계측 이벤트)"""
+        trace = RunTrace()
+        try:
+            result = self.separate(file_path, stems=stems, output_format=output_format,
+                                   bitrate=bitrate, trace=trace)
             if result:
-                return {
-                    'success': True,
-                    'path': result,
-                    'vocals': result / "vocals.wav",
-                    'accompaniment': result / "no_vocals.wav"
-                }
+                return dict(self._result_dict(result), metrics=trace.event)
             else:
-                return {'success': False, 'error': 'Separation failed'}
+                return {'success': False, 'error': 'Separation failed', 'metrics': trace.event}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e), 'metrics': trace.event}
+
+def compare_batch_throughput(files, max_batch_segments=8):
+    """separate_batch vs 파일별 separate_file 처리량 비교 (캐시 없이 측정)"""
+    import tempfile
+    import time
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        separator = MuingSeparator(cache=ResultCache(Path(tmp) / "loop"))
+        if separator.engine is None:
+            logger.error("❌ 배치 비교는 인프로세스 엔진이 필요합니다")
+            return None
+        audio_seconds = sum(
+            separator.engine.load_audio(f).shape[-1] for f in files
+        ) / separator.engine.samplerate
+        
+        start = time.time()
+        for f in files:
+            separator.separate_file(f)
+        loop_time = time.time() - start
+        
+        separator.cache = ResultCache(Path(tmp) / "batch")
+        start = time.time()
+        separator.separate_batch(files, max_batch_segments=max_batch_segments)
+        batch_time = time.time() - start
+    
+    report = {
+        'files': len(files),
+        'audio_seconds': audio_seconds,
+        'loop_seconds': loop_time,
+        'batch_seconds': batch_time,
+        'loop_throughput': audio_seconds / loop_time,
+        'batch_throughput': audio_seconds / batch_time,
+        'speedup': loop_time / batch_time,
+    }
+    logger.info(f"⏱️ 파일별: {loop_time:.1f}초 ({report['loop_throughput']:.2f}x 실시간)")
+    logger.info(f"⏱️ 배치({max_batch_segments}): {batch_time:.1f}초 ({report['batch_throughput']:.2f}x 실시간)")
+    logger.info(f"🚀 속도 향상: {report['speedup']:.2f}배")
+    return report
+
+def check_stream_consistency(audio_path, window_seconds=30.0, overlap_seconds=5.0):
+    """스트리밍 결과가 전체 트랙 결과와 허용 오차 안에서 일치하는지 확인 (짧은 참조 클립용)
+    
+    랜덤 shift를 끄고 같은 입력을 두 방식으로 분리해서 스템별 SNR(dB)을 비교
+    """
+    import torch
+    
+    separator = MuingSeparator()
+    engine = separator.engine
+    if engine is None:
+        logger.error("❌ 인프로세스 엔진이 필요합니다")
+        return None
+    
+    engine.shifts = 0
+    full = engine.separate_tensor(engine.load_audio(audio_path))
+    chunks = list(engine.iter_stream(audio_path, window_seconds, overlap_seconds))
+    streamed = {name: torch.cat([c[name] for c in chunks], dim=-1) for name in full}
+    
+    report = {}
+    for name, ref in full.items():
+        err = streamed[name][..., :ref.shape[-1]] - ref
+        snr = 10 * torch.log10(ref.pow(2).sum() / err.pow(2).sum().clamp_min(1e-12))
+        report[name] = snr.item()
+        logger.info(f"📏 {name}: SNR {report[name]:.1f} dB")
+    
+    passed = min(report.values()) >= STREAM_TOLERANCE_DB
+    logger.info(f"{'✅' if passed else '❌'} 허용 기준: {STREAM_TOLERANCE_DB} dB")
+    return {'snr_db': report, 'passed': passed}
+
+def _sdr(ref, est):
+    """SDR / SI-SDR (dB) - ref 기준, 채널/샘플 전체"""
+    import torch
+    
+    ref = ref.flatten().double()
+    est = est.flatten().double()
+    eps = 1e-12
+    sdr = 10 * torch.log10(ref.pow(2).sum() / (ref - est).pow(2).sum().clamp_min(eps))
+    target = (est @ ref) / ref.pow(2).sum().clamp_min(eps) * ref
+    si_sdr = 10 * torch.log10(target.pow(2).sum() / (est - target).pow(2).sum().clamp_min(eps))
+    return sdr.item(), si_sdr.item()
+
+def check_precision_drift(audio_path, precision="bf16", model="htdemucs", seconds=20.0):
+    """저정밀 모드가 fp32 결과와 얼마나 다른지 참조 클립으로 확인
+    
+    랜덤 shift를 끄고 앞부분 seconds초를 두 정밀도로 분리해서 스템별 SDR/SI-SDR(dB)과 속도 비교
+    모든 스템의 SDR이 PRECISION_TOLERANCE_DB 이상이면 통과
+    """
+    import time
+    
+    reference = DemucsEngine(model=model)
+    reduced = DemucsEngine(model=model, precision=precision)
+    for engine in (reference, reduced):
+        engine.shifts = 0
+        engine.load()
+    wav = reference.load_audio(audio_path)[..., :int(seconds * reference.samplerate)]
+    
+    timings = {}
+    outputs = {}
+    for name, engine in (("fp32", reference), (precision, reduced)):
+        start = time.time()
+        outputs[name] = engine.separate_tensor(wav)
+        timings[name] = time.time() - start
+    
+    report = {}
+    for stem, ref in outputs["fp32"].items():
+        sdr, si_sdr = _sdr(ref, outputs[precision][stem])
+        report[stem] = {'sdr': sdr, 'si_sdr': si_sdr}
+        logger.info(f"📏 {stem}: SDR {sdr:.1f} dB · SI-SDR {si_sdr:.1f} dB")
+    
+    speedup = timings["fp32"] / timings[precision]
+    passed = min(r['sdr'] for r in report.values()) >= PRECISION_TOLERANCE_DB
+    logger.info(f"🚀 {precision} 속도: {speedup:.2f}배 (fp32 {timings['fp32']:.1f}초 → {timings[precision]:.1f}초)")
+    logger.info(f"{'✅' if passed else '❌'} 허용 기준: SDR {PRECISION_TOLERANCE_DB} dB")
+    return {'precision': precision, 'drift_db': report, 'speedup': speedup, 'passed': passed}
 
 def test_separator():
     """간단한 테스트 함수"""
@@ -168,6 +765,16 @@ def test_separator():
         return False
 
 if __name__ == "__main__":
+    # 배치 처리량 비교: python core/separator.py --compare-batch a.mp3 b.mp3 ...
+    if len(sys.argv) > 2 and sys.argv[1] == "--compare-batch":
+        compare_batch_throughput(sys.argv[2:])
+        sys.exit(0)
+    
+    # 저정밀 모드 품질 확인: python core/separator.py --check-precision bf16 clip.mp3
+    if len(sys.argv) > 3 and sys.argv[1] == "--check-precision":
+        result = check_precision_drift(sys.argv[3], precision=sys.argv[2])
+        sys.exit(0 if result['passed'] else 1)
+    
     # 테스트 실행
     success = test_separator()
     
@@ -1,27 +1,41 @@
-import subprocess
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from core.capabilities import capabilities, device_available
+
 print("🔍 Muing 환경 진단")
 print("=" * 50)
 
 # Python 버전
 print(f"Python: {sys.version}")
 
+# 설치 상태 (core.capabilities - demucs를 import하거나 which를 실행하지 않음)
+caps = capabilities()
+
 # Demucs 확인
-try:
-    import demucs
-    print(f"✅ Demucs 설치됨: {demucs.__version__}")
-except:
+if caps["demucs"]:
+    print(f"✅ Demucs 설치됨: {caps['versions']['demucs']}")
+else:
     print("❌ Demucs 없음")
 
 # CLI 확인
-result = subprocess.run("which demucs", shell=True, capture_output=True, text=True)
-if result.stdout:
-    print(f"✅ Demucs CLI: {result.stdout.strip()}")
+if caps["demucs_cli"]:
+    print(f"✅ Demucs CLI: {caps['demucs_cli']}")
 else:
     print("❌ Demucs CLI 없음")
 
+# FFmpeg 확인
+if caps["ffmpeg"]:
+    print(f"✅ FFmpeg: {caps['ffmpeg_version']}")
+else:
+    print("❌ FFmpeg 없음")
+
+# 장치 확인 (cpu 외에는 torch를 import해서 확인)
+if "--devices" in sys.argv:
+    for device in ("cpu", "cuda", "mps"):
+        print(f"{'✅' if device_available(device) else '❌'} 장치: {device}")
+
 # 디렉토리 확인
 print(f"\n📁 현재 위치: {Path.cwd()}")
 print(f"📁 data/ 존재: {Path('data').exists()}")
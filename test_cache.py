@@ -0,0 +1,73 @@
+"""
+결과 캐시(core.cache) 점검 - 캐시 키 / LRU 정리
+모델 없이 임시 디렉토리에서 실행
+
+python test_cache.py
+"""
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.cache import ResultCache, make_key
+
+
+def test_cache_key():
+    root = Path(tempfile.mkdtemp())
+    try:
+        cache = ResultCache(root / "cache")
+        (root / "a.mp3").write_bytes(b"same audio")
+        (root / "b.mp3").write_bytes(b"same audio")
+        (root / "c.mp3").write_bytes(b"other audio")
+        key = cache.key_for(root / "a.mp3", "htdemucs", 2, format="wav")
+        # 파일명이 아니라 내용 기준
+        assert cache.key_for(root / "b.mp3", "htdemucs", 2, format="wav") == key
+        assert cache.key_for(root / "c.mp3", "htdemucs", 2, format="wav") != key
+        # 결과에 영향을 주는 설정은 모두 키에 들어감 (설정 순서는 무관)
+        assert cache.key_for(root / "a.mp3", "htdemucs", 4, format="wav") != key
+        assert cache.key_for(root / "a.mp3", "mdx", 2, format="wav") != key
+        assert cache.key_for(root / "a.mp3", "htdemucs", 2, format="flac") != key
+        assert make_key("h", "m", 2, a=1, b=2) == make_key("h", "m", 2, b=2, a=1)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _put(cache, key, size):
+    staging = cache.staging_dir()
+    (staging / "vocals.wav").write_bytes(b"x" * size)
+    entry = cache.put(key, staging, name=key)
+    time.sleep(0.01)  # last_access 순서가 확실히 갈리도록
+    return entry
+
+
+def test_lru_eviction():
+    root = Path(tempfile.mkdtemp())
+    try:
+        # 항목 하나가 약 1000바이트 (meta.json 포함) → 두 개까지만 들어감
+        cache = ResultCache(root / "cache", max_bytes=2500)
+        _put(cache, "first", 1000)
+        _put(cache, "second", 1000)
+        assert cache.get("first") is not None  # first를 최근 사용으로
+        time.sleep(0.01)
+        _put(cache, "third", 1000)
+        assert cache.get("second") is None, "가장 오래 안 쓴 항목이 지워져야 함"
+        assert cache.get("first") is not None and cache.get("third") is not None
+        assert not (root / "cache" / "second").exists()
+        assert cache.total_size() <= 2500
+
+        # 예산보다 큰 항목도 방금 넣은 하나는 남김
+        _put(cache, "huge", 5000)
+        assert cache.get("huge") is not None
+        assert [entry["key"] for entry in cache.entries()] == ["huge"]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_lru_eviction()
+    print("✅ 결과 캐시 키 / LRU 정리 통과")
@@ -0,0 +1,78 @@
+"""
+일괄 분리(core.ingest) 점검 - CLI fallback(engine=None) 경로
+모델 없이 가짜 Separator로 실행: separate()가 코어 슬롯을 직접 잡아도 멈추지 않아야 함
+
+python test_ingest.py
+"""
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.ingest import DirectoryIngest
+from core.metrics import Metrics
+from core.scheduling import SchedulingPolicy
+
+
+class _Cache:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def get(self, key):
+        return None
+
+    def read_meta(self, entry):
+        return {"audio_seconds": 1.5}
+
+
+class _CLISeparator:
+    """engine=None인 MuingSeparator 흉내 - separate()가 실제처럼 코어 슬롯을 잡음"""
+
+    def __init__(self, root):
+        self.engine = None
+        self.scheduling = SchedulingPolicy(max_jobs=1, threads_per_job=1)
+        self.metrics = Metrics()
+        self.cache = _Cache(root / "cache")
+
+    def cache_key(self, audio_path, stems, output_format="wav", bitrate=None, **extra):
+        return f"{Path(audio_path).name}-{stems}-{output_format}"
+
+    def separate(self, audio_path, stems=2, progress=None, output_format="wav", bitrate=None,
+                 trace=None):
+        with self.scheduling.slot():
+            out = self.cache.root / self.cache_key(audio_path, stems, output_format)
+            out.mkdir(parents=True, exist_ok=True)
+            for name in ("vocals", "no_vocals"):
+                (out / f"{name}.{output_format}").write_bytes(b"stem")
+            return out
+
+
+def test_ingest_cli_fallback():
+    root = Path(tempfile.mkdtemp())
+    try:
+        (root / "in" / "album").mkdir(parents=True)
+        for name in ("a.mp3", "album/b.mp3"):
+            (root / "in" / name).write_bytes(name.encode())
+        ingest = DirectoryIngest(_CLISeparator(root), root / "in", root / "out")
+
+        summary = {}
+        thread = threading.Thread(target=lambda: summary.update(ingest.run()), daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+        assert not thread.is_alive(), "일괄 분리가 멈춤 (코어 슬롯 재진입?)"
+        assert summary["done"] == 2 and summary["failed"] == 0, summary
+        assert summary["audio_seconds"] == 3.0, summary
+        assert (root / "out" / "a" / "vocals.wav").exists()
+        assert (root / "out" / "album" / "b" / "no_vocals.wav").exists()
+        assert not list((root / "out").glob(".tmp-*"))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_ingest_cli_fallback()
+    print("✅ 일괄 분리 CLI fallback 통과")
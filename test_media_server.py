@@ -0,0 +1,55 @@
+"""
+미디어 서버(core.media_server) 점검 - Range 헤더 해석 / 전송 가능한 경로
+서버를 띄우지 않고 순수 함수만 확인
+
+python test_media_server.py
+"""
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.media_server import _servable, parse_range
+
+
+def test_parse_range():
+    size = 1000
+    cases = {
+        "bytes=0-499": (0, 499),
+        "bytes=500-": (500, 999),
+        "bytes=900-2000": (900, 999),  # 끝이 파일보다 길면 파일 끝까지
+        "bytes=-100": (900, 999),  # 마지막 100바이트
+        "bytes=-5000": (0, 999),
+        " bytes=10-10 ": (10, 10),
+        # 범위 밖 → 416
+        "bytes=1000-": False,
+        "bytes=500-400": False,
+        "bytes=-0": False,
+        # 해석 불가 / 다중 구간 → 전체 전송
+        "bytes=-": None,
+        "bytes=0-1,5-9": None,
+        "items=0-10": None,
+        "": None,
+    }
+    for header, expected in cases.items():
+        assert parse_range(header, size) == expected, (header, parse_range(header, size))
+    # 빈 파일은 어떤 구간도 만족 못 함
+    assert parse_range("bytes=0-", 0) is False
+
+
+def test_servable():
+    assert _servable("abc123/vocals.wav")
+    assert _servable("abc123/no_vocals.opus")
+    assert _servable("abc123/vocals.peaks.npy")
+    assert not _servable("abc123/meta.json")
+    assert not _servable("catalog.db")
+    assert not _servable(".tmp-1234/vocals.wav")
+    assert not _servable("../secret/vocals.wav")
+    assert not _servable("abc123//vocals.wav")
+
+
+if __name__ == "__main__":
+    test_parse_range()
+    test_servable()
+    print("✅ Range 헤더 / 전송 경로 확인 통과")
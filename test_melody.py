@@ -0,0 +1,47 @@
+"""
+멜로디 추출(core.melody) 점검 - 440Hz 사인파가 440Hz 근처로 나오는지 + 처리 속도
+(torchcrepe가 있으면 CREPE, 없으면 YIN)
+
+python test_melody.py
+"""
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.features import FeatureStore
+from core.melody import MelodyExtractor
+
+SECONDS = 30
+
+
+def test_melody_440():
+    root = Path(tempfile.mkdtemp())
+    try:
+        samplerate = 44100
+        t = np.arange(SECONDS * samplerate) / samplerate
+        tone = root / "tone.wav"
+        sf.write(str(tone), (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), samplerate)
+        extractor = MelodyExtractor(features=FeatureStore(root / "features"),
+                                    cache_dir=root / "melody")
+        start = time.perf_counter()
+        melody = extractor.extract(tone)
+        elapsed = time.perf_counter() - start
+        f0 = melody["f0"][melody["f0"] > 0]
+        assert melody["voiced_ratio"] > 0.9, melody["voiced_ratio"]
+        assert abs(np.median(f0) - 440) < 440 * (2 ** (1 / 24) - 1), np.median(f0)  # 반음의 절반 이내
+        return elapsed
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    elapsed = test_melody_440()
+    print(f"✅ 440Hz 톤 → 440Hz · {SECONDS}초 분량 {elapsed:.2f}초 (실시간의 {SECONDS / elapsed:.1f}배)")
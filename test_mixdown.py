@@ -0,0 +1,54 @@
+"""
+스템 리믹스(core.mixdown) 점검 - 믹스 설정 정규화 / 채널 가중치(팬)
+파일 없이 순수 함수만 확인
+
+python test_mixdown.py
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.mixdown import channel_weights, normalize_spec, parse_mix_args
+
+NAMES = ["drums", "bass", "other", "vocals"]
+
+
+def test_normalize_spec():
+    # 빠진 스템은 볼륨 1 / 가운데, 순서는 스템 순서로 고정
+    assert normalize_spec(None, NAMES) == [(name, 1.0, 0.0) for name in NAMES]
+    mix = normalize_spec({"vocals": 0.3, "drums": {"mute": True, "gain": 2.0},
+                          "bass": {"gain": 1.5, "pan": -0.5}}, NAMES)
+    assert mix == [("drums", 0.0, 0.0), ("bass", 1.5, -0.5), ("other", 1.0, 0.0),
+                   ("vocals", 0.3, 0.0)], mix
+    # 같은 설정은 입력 순서 / 표기와 무관하게 같은 값 (믹스 캐시 키)
+    assert normalize_spec({"other": 1, "vocals": {"gain": 0.30000001}}, NAMES) == \
+        normalize_spec({"vocals": 0.3}, NAMES)
+    assert normalize_spec(parse_mix_args(["vocals=0.3", "drums=mute", "bass=1.5:-0.5"]),
+                          NAMES) == mix
+    for bad in ({"piano": 1.0}, {"vocals": -0.1}, {"vocals": 4.5}, {"bass": {"pan": 1.5}}):
+        try:
+            normalize_spec(bad, NAMES)
+        except ValueError:
+            continue
+        raise AssertionError(f"잘못된 설정이 통과함: {bad}")
+
+
+def test_channel_weights():
+    mix = [("vocals", 0.5, 0.0), ("bass", 1.0, -1.0), ("drums", 2.0, 0.5)]
+    weights = channel_weights(mix, 2)
+    # 밸런스 방식: 가운데는 원래 레벨, 한쪽으로 돌리면 반대쪽만 줄어듦
+    expected = np.array([[0.5, 0.5], [1.0, 0.0], [1.0, 2.0]], dtype=np.float32)
+    assert weights.shape == (3, 2) and np.allclose(weights, expected), weights
+    # 모노 / 다채널은 팬 없이 볼륨만
+    assert np.allclose(channel_weights(mix, 1), [[0.5], [1.0], [2.0]])
+    assert channel_weights(mix, 6).shape == (3, 6)
+
+
+if __name__ == "__main__":
+    test_normalize_spec()
+    test_channel_weights()
+    print("✅ 믹스 설정 정규화 / 채널 가중치 통과")
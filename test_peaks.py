@@ -0,0 +1,68 @@
+"""
+파형 피크 피라미드(core.peaks) 점검 - PeakPyramid.view가 원본 샘플의 min/max와 같은지
+조각 단위로 쌓은 피라미드를 저장 → memmap으로 다시 열어서 확인
+
+python test_peaks.py
+"""
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.peaks import PeakBuilder, load_peaks, write_peaks_info
+
+SAMPLERATE = 44100
+SECONDS = 120
+
+
+def _build(root, audio):
+    stem = root / "vocals.wav"
+    builder = PeakBuilder()
+    # 블록 크기와 맞지 않는 조각으로 나눠서 넣어도 결과는 같아야 함
+    for start in range(0, len(audio), 100_003):
+        builder.add(audio[start:start + 100_003])
+    write_peaks_info(root, {"vocals": builder.save(stem, SAMPLERATE)})
+    return load_peaks(stem)
+
+
+def test_peak_view():
+    root = Path(tempfile.mkdtemp())
+    try:
+        rng = np.random.RandomState(0)
+        t = np.arange(SECONDS * SAMPLERATE) / SAMPLERATE
+        envelope = 0.2 + 0.7 * np.abs(np.sin(2 * np.pi * t / 17))
+        audio = (envelope[:, None] * rng.uniform(-1, 1, (len(t), 2))).astype(np.float32)
+        pyramid = _build(root, audio)
+        assert abs(pyramid.duration - SECONDS) < pyramid.block / SAMPLERATE
+
+        mono_min, mono_max = audio.min(axis=1), audio.max(axis=1)
+        for start, end, width in ((0, None, 800), (10.0, 20.0, 500), (33.3, 34.1, 200),
+                                  (100.0, 200.0, 300)):
+            times, lo, hi = pyramid.view(start, end, width)
+            stop = SECONDS if end is None else min(end, SECONDS)
+            # width개 이상 (레벨 0으로도 모자라면 레벨 0 전부), 너무 많지도 않게
+            finest = int((stop - start) * SAMPLERATE / pyramid.block)
+            assert min(width, finest) <= len(times) < width * pyramid.factor + 2, \
+                (start, end, len(times))
+            bin_frames = int(round((times[1] - times[0]) * SAMPLERATE))
+            assert times[0] <= start + bin_frames / SAMPLERATE
+            assert times[-1] >= stop - bin_frames / SAMPLERATE
+            for time, got_lo, got_hi in zip(times, lo, hi):
+                first = int(round(time * SAMPLERATE - bin_frames / 2))
+                want_lo = mono_min[first:first + bin_frames].min()
+                want_hi = mono_max[first:first + bin_frames].max()
+                # int8 양자화 오차 이내
+                assert abs(got_lo - want_lo) <= 0.5 / 127 + 1e-6, (time, got_lo, want_lo)
+                assert abs(got_hi - want_hi) <= 0.5 / 127 + 1e-6, (time, got_hi, want_hi)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_peak_view()
+    print("✅ 피크 피라미드 view = 원본 min/max 통과")
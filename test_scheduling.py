@@ -0,0 +1,66 @@
+"""
+스케줄링 정책(core.scheduling) 점검 - 코어 슬롯 분할 / 동시 작업 수 제한
+실제 코어 대신 가상의 8코어 목록으로 실행 (affinity는 바꾸지 않음)
+
+python test_scheduling.py
+"""
+import sys
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.scheduling import SchedulingPolicy
+
+CORES = list(range(8))
+
+
+def test_slot_partitioning():
+    policy = SchedulingPolicy(threads_per_job=2, pin_cores=True, cores=CORES)
+    assert policy.max_jobs == 4 and policy.pin_cores
+    with ExitStack() as stack:
+        slots = [stack.enter_context(policy.slot()) for _ in range(policy.max_jobs)]
+        # 슬롯끼리 코어가 겹치지 않고, 합치면 전체 코어
+        assert sorted(core for slot in slots for core in slot.cores) == CORES
+        assert all(len(slot.cores) == 2 and slot.threads == 2 for slot in slots)
+        assert len({slot.index for slot in slots}) == policy.max_jobs
+        assert slots[0].env()["OMP_NUM_THREADS"] == "2"
+
+
+def test_oversubscribed_policy_does_not_pin():
+    # 작업 수 x 스레드 수가 코어 수를 넘으면 고정해도 겹침 → 고정 안 하고 전체 코어
+    policy = SchedulingPolicy(threads_per_job=4, max_jobs=3, pin_cores=True, cores=CORES)
+    assert not policy.pin_cores
+    assert policy.cores_for(2) == CORES
+    # 작업당 스레드는 코어 수를 넘지 않음
+    assert SchedulingPolicy(threads_per_job=32, cores=CORES).threads_per_job == len(CORES)
+
+
+def test_slot_waits_when_full():
+    policy = SchedulingPolicy(threads_per_job=4, pin_cores=True, cores=CORES)
+    acquired = threading.Event()
+    got = []
+
+    def worker():
+        with policy.slot() as slot:
+            got.append(slot.cores)
+            acquired.set()
+
+    with policy.slot() as first, policy.slot() as second:
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        # 슬롯 두 개가 모두 사용 중 → 세 번째는 기다려야 함
+        assert not acquired.wait(0.2), "슬롯이 다 찼는데 새 작업이 시작됨"
+        used = [first.cores, second.cores]
+    thread.join(timeout=5)
+    assert acquired.is_set(), "반납된 슬롯을 받지 못함"
+    assert got[0] in used
+
+
+if __name__ == "__main__":
+    test_slot_partitioning()
+    test_oversubscribed_policy_does_not_pin()
+    test_slot_waits_when_full()
+    print("✅ 코어 슬롯 분할 / 동시 작업 수 제한 통과")
@@ -3,10 +3,12 @@ Muing Web Interface - 실제 작동 버전
 """
 import streamlit as st
 from pathlib import Path
-import subprocess
+import sys
 import time
+import uuid
+import io
+import logging
 import os
-import base64
 
 st.set_page_config(
     page_title="Muing - AI Music Analysis",
@@ -16,28 +18,354 @@ st.set_page_config(
 
 # 프로젝트 루트
 PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
 
-def separate_audio(input_path, output_dir="separated"):
-    """실제 Demucs 실행"""
-    cmd = f"demucs --two-stems=vocals -d cpu -o {output_dir} {input_path}"
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+from core.cache import ResultCache
+from core.chords import NO_CHORD, ChordAnalyzer
+from core.encoding import mime_type, stem_path
+from core.features import FeatureStore
+from core.jobs import JobManager, QueueFullError, DONE
+from core.media_server import MediaServer
+from core.melody import MelodyExtractor, melody_to_midi
+from core.metrics import METRICS, RunTrace
+from core.mixdown import StemMixer
+from core.rhythm import RhythmAnalyzer
+from core.peaks import load_peaks, peaks_path
+from core.scheduling import default_policy
+from core.separator import MuingSeparator
+
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_cache():
+    """분리 결과 캐시 (MuingSeparator와 같은 디렉토리 공유)"""
+    return ResultCache(PROJECT_ROOT / "separated" / "cache")
+
+@st.cache_resource
+def get_separator():
+    """모델을 올려둔 Separator (모든 세션이 공유) - 모델은 UI가 그려지는 동안 백그라운드에서 로드"""
+    separator = MuingSeparator(cache=get_cache(), preload=False)
+    separator.warm_up()
+    return separator
+
+@st.cache_resource
+def get_feature_store():
+    """분석 모듈이 공유하는 스펙트럼 특징 저장소 (디코딩/STFT/mel/onset 1회 계산)"""
+    return FeatureStore(metrics=METRICS)
+
+@st.cache_resource
+def get_melody_extractor():
+    """보컬 멜로디(F0) 추출기 (결과는 보컬 스템 내용 해시로 캐시)"""
+    return MelodyExtractor(features=get_feature_store())
+
+@st.cache_resource
+def get_chord_analyzer():
+    """반주 코드 진행 분석기 (결과는 반주 스템 내용 해시로 캐시)"""
+    return ChordAnalyzer(features=get_feature_store())
+
+@st.cache_resource
+def get_rhythm_analyzer():
+    """반주 템포/비트 분석기 (결과는 반주 스템 내용 해시로 캐시)"""
+    return RhythmAnalyzer(features=get_feature_store())
+
+@st.cache_resource
+def get_mixer():
+    """저장된 스템으로 리믹스 (믹스 결과는 설정별로 캐시)"""
+    return StemMixer(metrics=METRICS)
+
+@st.cache_resource
+def get_job_manager():
+    """백그라운드 작업 큐 (모든 세션이 공유)"""
+    # 동시 작업 수는 코어 배분 정책에 맞춤 (작업마다 코어 묶음 하나)
+    jobs = JobManager(max_workers=default_policy().max_jobs, max_queue=8, max_per_session=1)
+    jobs.cleanup_sessions()
+    return jobs
+
+# 이보다 큰 파일은 스트리밍 분리 (메모리 일정)
+STREAM_THRESHOLD_MB = 30
+
+# 웹에서 선택 가능한 출력 포맷 (브라우저 재생 가능한 것만)
+OUTPUT_FORMATS = {
+    "WAV (무손실, 큰 용량)": ("wav", None),
+    "FLAC (무손실 압축)": ("flac", None),
+    "Opus 128kbps (작은 용량)": ("opus", 128),
+}
+
+# 결과 갤러리 한 페이지당 항목 수
+GALLERY_PAGE_SIZE = 10
+
+# 미리듣기 길이(초) - 먼저 이 구간만 분리해서 들려주고 전체는 이어서 처리
+PREVIEW_SECONDS = 20
+
+def separate_audio(input_path, progress=None, output_format="wav", bitrate=None,
+                   preview_start=None, partial=None):
+    """실제 Demucs 실행 (같은 내용이면 캐시에서 바로 반환) → (결과 경로, 계측 이벤트)
     
-    if result.returncode == 0:
-        # 결과 경로 찾기
-        stem_name = Path(input_path).stem
-        result_path = Path(output_dir) / "htdemucs" / stem_name
-        if result_path.exists():
-            return result_path
-    return None
+    preview_start가 있으면 그 위치부터 PREVIEW_SECONDS초를 먼저 분리해서 partial["preview"]에 넣고
+    전체 분리는 그 구간을 재사용 (큰 파일의 스트리밍 분리도 separator가 보관한 미리듣기를 이어 붙임)
+    """
+    separator = get_separator()
+    if preview_start is not None and partial is not None and separator.engine:
+        trace = RunTrace()
+        preview = separator.separate_range(input_path, preview_start,
+                                           preview_start + PREVIEW_SECONDS, stems=2,
+                                           progress=progress, output_format=output_format,
+                                           bitrate=bitrate, trace=trace)
+        partial["preview"] = (preview, trace.event)
+    trace = RunTrace()
+    if Path(input_path).stat().st_size > STREAM_THRESHOLD_MB * 1024 * 1024 and separator.engine:
+        result = separator.separate_stream(input_path, stems=2, progress=progress,
+                                           output_format=output_format, bitrate=bitrate,
+                                           trace=trace)
+    else:
+        result = separator.separate(input_path, stems=2, progress=progress,
+                                    output_format=output_format, bitrate=bitrate, trace=trace)
+    return result, trace.event
+
+def analyze_result(result_dir, progress=None):
+    """분리된 곡의 멜로디/코드/리듬 분석 - 분리가 끝난 뒤 별도 백그라운드 작업으로 실행 (캐시에 있으면 건너뜀)"""
+    steps = (
+        ("멜로디 추출", lambda: get_melody_extractor().extract(stem_path(result_dir, "vocals"))),
+        ("코드 분석", lambda: get_chord_analyzer().analyze(stem_path(result_dir, "no_vocals"))),
+        ("리듬 분석", lambda: get_rhythm_analyzer().analyze(stem_path(result_dir, "no_vocals"))),
+    )
+    for done, (label, step) in enumerate(steps):
+        if progress:
+            progress(done, len(steps))
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"⚠️ {label} 실패: {e}")
+    if progress:
+        progress(len(steps), len(steps))
+
+@st.cache_resource
+def get_media_server():
+    """스템 파일 스트리밍 서버 (프로세스당 1개, Range 지원)"""
+    try:
+        return MediaServer({
+            "cache": get_cache().root,
+            "mixes": get_mixer().root,
+        }, metrics=METRICS).start()
+    except OSError as e:
+        logger.warning(f"⚠️ 미디어 서버 시작 실패: {e}")
+        return None
+
+def show_audio(file_path):
+    """오디오 플레이어 - 브라우저가 미디어 서버에서 직접 받아감 (페이지에 데이터 안 넣음)"""
+    media = get_media_server()
+    url = media.url_for(file_path) if media else None
+    st.audio(url or str(file_path), format=mime_type(file_path))
 
 def get_download_link(file_path, file_label):
-    """다운로드 링크 생성"""
-    with open(file_path, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    href = f'<a href="data:audio/wav;base64,{b64}" download="{Path(file_path).name}">💾 {file_label} 다운로드</a>'
+    """다운로드 링크 생성 (파일을 디스크에서 바로 스트리밍)"""
+    media = get_media_server()
+    url = media.url_for(file_path, download=True) if media else None
+    if url is None:
+        return f'<span>⚠️ {file_label} 다운로드 서버를 사용할 수 없습니다</span>'
+    href = f'<a href="{url}" download="{Path(file_path).name}">💾 {file_label} 다운로드</a>'
     return href
 
+# 파형 한 줄에 그리는 점 수 (피크 피라미드에서 이 정도 해상도의 레벨을 골라 읽음)
+WAVEFORM_POINTS = 1200
+
+def _stamp(path):
+    """렌더링 캐시 키용 파일 수정 시각 (없으면 None) - 파일이 바뀌면 다시 만듦"""
+    try:
+        return Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+
+class _NotAnalyzed(LookupError):
+    """아직 분석 결과가 없음 (st.cache_data는 예외를 캐시하지 않으므로 분석이 끝나면 다시 만듦)"""
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def cached_peaks(stem_file, stamp):
+    """피크 피라미드 (피크 파일이 그대로면 다시 읽지 않음)"""
+    return load_peaks(stem_file)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def melody_artifacts(vocal_file, stamp):
+    """멜로디 곡선 표 + MIDI 바이트 (스템이 그대로면 분석 결과 조회 / MIDI 변환을 다시 안 함)"""
+    import numpy as np
+    import pandas as pd
+
+    melody = get_melody_extractor().cached(vocal_file)
+    if melody is None:
+        raise _NotAnalyzed(vocal_file)
+    f0 = melody["f0"]
+    voiced = f0 > 0
+    notes = np.full(len(f0), np.nan, dtype=np.float32)
+    notes[voiced] = 69 + 12 * np.log2(f0[voiced] / 440.0)
+    frame = pd.DataFrame({"시간(초)": np.arange(len(f0)) * melody["hop_seconds"], "음높이(MIDI)": notes})
+    midi = None
+    try:
+        buffer = io.BytesIO()
+        melody_to_midi(melody, buffer)
+        midi = buffer.getvalue()
+    except ImportError:
+        pass
+    return frame, melody["voiced_ratio"], melody["backend"], midi
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def chord_frame(inst_file, stamp):
+    """코드 구간 표 (무코드 구간 제외)"""
+    import pandas as pd
+
+    segments = get_chord_analyzer().cached(inst_file)
+    if segments is None:
+        raise _NotAnalyzed(inst_file)
+    frame = pd.DataFrame(segments, columns=["시작", "끝", "코드", "신뢰도"])
+    return frame[frame["코드"] != NO_CHORD]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def rhythm_summary(inst_file, stamp):
+    """템포 / 비트 수 / onset 수"""
+    rhythm = get_rhythm_analyzer().cached(inst_file)
+    if rhythm is None:
+        raise _NotAnalyzed(inst_file)
+    return rhythm["tempo"], len(rhythm["beats"]), len(rhythm["onsets"])
+
+def show_waveforms(result_dir, key):
+    """보컬/반주 파형 비교 - 저장된 피크 피라미드만 읽음 (오디오 디코딩 없음)"""
+    import altair as alt
+    import pandas as pd
+
+    pyramids = {}
+    for label, name in (("보컬", "vocals"), ("반주", "no_vocals")):
+        stem_file = stem_path(result_dir, name)
+        pyramid = cached_peaks(str(stem_file), _stamp(peaks_path(stem_file)))
+        if pyramid:
+            pyramids[label] = pyramid
+    if not pyramids:
+        return
+    duration = max(p.duration for p in pyramids.values())
+    start, end = st.slider("🔍 파형 구간 (초)", 0.0, float(round(duration, 1)),
+                           (0.0, float(round(duration, 1))), step=0.1, key=f"zoom-{key}")
+    frames = []
+    for label, pyramid in pyramids.items():
+        times, mins, maxs = pyramid.view(start, max(end, start + 0.1), WAVEFORM_POINTS)
+        frames.append(pd.DataFrame({"시간(초)": times, "min": mins, "max": maxs, "스템": label}))
+    chart = alt.Chart(pd.concat(frames)).mark_area(opacity=0.6).encode(
+        x=alt.X("시간(초):Q", scale=alt.Scale(domain=[start, max(end, start + 0.1)])),
+        y=alt.Y("max:Q", scale=alt.Scale(domain=[-1, 1]), title=None),
+        y2="min:Q",
+        color=alt.Color("스템:N", legend=alt.Legend(orient="top")),
+    ).properties(height=200)
+    st.altair_chart(chart, use_container_width=True)
+
+def show_melody(result_dir, key):
+    """보컬 멜로디 곡선 + MIDI 다운로드 (이미 추출된 결과만 표시)"""
+    import altair as alt
+
+    vocal_file = stem_path(result_dir, "vocals")
+    try:
+        frame, voiced_ratio, backend, midi = melody_artifacts(str(vocal_file), _stamp(vocal_file))
+    except _NotAnalyzed:
+        return
+    chart = alt.Chart(frame).mark_line(strokeWidth=1.5).encode(
+        x="시간(초):Q",
+        y=alt.Y("음높이(MIDI):Q", scale=alt.Scale(zero=False)),
+    ).properties(height=160)
+    st.markdown("#### 🎼 보컬 멜로디")
+    st.altair_chart(chart, use_container_width=True)
+    st.caption(f"유성음 {voiced_ratio*100:.0f}% · 모델 {backend}")
+    if midi is not None:
+        st.download_button("🎹 멜로디 MIDI 다운로드", midi, file_name="melody.mid",
+                           mime="audio/midi", key=f"midi-{key}")
+    else:
+        st.caption("MIDI 저장은 pretty_midi 설치 후 사용할 수 있습니다")
+
+def show_chords(result_dir):
+    """반주 코드 진행 타임라인 (이미 분석된 결과만 표시)"""
+    import altair as alt
+
+    inst_file = stem_path(result_dir, "no_vocals")
+    try:
+        frame = chord_frame(str(inst_file), _stamp(inst_file))
+    except _NotAnalyzed:
+        return
+    if frame.empty:
+        return
+    base = alt.Chart(frame).encode(x=alt.X("시작:Q", title="시간(초)"), x2="끝:Q")
+    chart = base.mark_rect(opacity=0.7).encode(
+        color=alt.Color("코드:N", legend=None),
+        tooltip=["코드", "시작", "끝", "신뢰도"],
+    ) + base.mark_text(color="white", fontSize=11).encode(
+        x=alt.X("중앙:Q"), text="코드:N",
+    ).transform_calculate(중앙="(datum.시작 + datum.끝) / 2")
+    st.markdown("#### 🎹 코드 진행")
+    st.altair_chart(chart.properties(height=50), use_container_width=True)
+    st.caption(" → ".join(frame["코드"].head(16)))
+
+def show_rhythm(result_dir):
+    """템포 / 비트 / onset 요약 (이미 분석된 결과만 표시)"""
+    inst_file = stem_path(result_dir, "no_vocals")
+    try:
+        tempo, beats, onsets = rhythm_summary(str(inst_file), _stamp(inst_file))
+    except _NotAnalyzed:
+        return
+    if not tempo:
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🥁 템포", f"{tempo:.1f} BPM")
+    col2.metric("비트", f"{beats}개")
+    col3.metric("onset", f"{onsets}개")
+
+# 리믹스 화면의 스템 이름
+STEM_LABELS = {"vocals": "🎤 보컬", "no_vocals": "🎸 반주", "drums": "🥁 드럼", "bass": "🎸 베이스",
+               "other": "🎹 기타 악기"}
+
+def show_remix(result_dir, key):
+    """스템별 볼륨 / 음소거 / 팬으로 새 믹스 만들기 (다시 분리하지 않음, 같은 설정은 캐시)"""
+    mixer = get_mixer()
+    names = list(mixer.stems(result_dir))
+    if not names:
+        return
+    st.markdown("#### 🎚️ 리믹스")
+    spec = {}
+    for name in names:
+        col1, col2, col3 = st.columns([3, 2, 1])
+        with col1:
+            volume = st.slider(f"{STEM_LABELS.get(name, name)} 볼륨 (%)", 0, 150, 100, step=5,
+                               key=f"gain-{key}-{name}")
+        with col2:
+            pan = st.slider("팬 (좌 ↔ 우)", -100, 100, 0, step=10, key=f"pan-{key}-{name}")
+        with col3:
+            mute = st.checkbox("음소거", key=f"mute-{key}-{name}")
+        spec[name] = {"gain": volume / 100, "pan": pan / 100, "mute": mute}
+    if st.button("🎛️ 믹스 만들기", key=f"mix-{key}"):
+        try:
+            st.session_state[f"mixed-{key}"] = mixer.mix(result_dir, spec)
+        except Exception as e:
+            st.error(f"❌ 믹스 실패: {e}")
+    mixed = st.session_state.get(f"mixed-{key}")
+    if mixed and Path(mixed).exists():
+        show_audio(mixed)
+        st.markdown(get_download_link(mixed, "믹스"), unsafe_allow_html=True)
+
+def show_run_metrics(event):
+    """분리 1회의 단계별 계측 결과 (core.metrics 이벤트)"""
+    if not event:
+        return
+    if event.get("cache_hit"):
+        st.caption(f"⚡ 캐시에서 바로 반환 ({event['wall_seconds']:.2f}초)")
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("실시간 배율", f"{event['rtf']:.2f}x" if event.get("rtf") is not None else "-")
+    col2.metric("음원 길이", f"{event['audio_seconds']:.0f}초" if event.get("audio_seconds") else "-")
+    col3.metric("CPU 시간", f"{event['cpu_seconds']:.1f}초")
+    col4.metric("최대 메모리", f"{event['peak_rss_mb']:.0f} MB")
+    st.table([
+        {"단계": name, "시간(초)": round(s["wall"], 2), "CPU(초)": round(s["cpu"], 2)}
+        for name, s in event["stages"].items()
+    ])
+    if event.get("skipped_seconds"):
+        st.caption(f"🔇 무음 구간 {event['skipped_seconds']:.1f}초는 추론을 건너뛰었습니다")
+    media = get_media_server()
+    if media:
+        st.caption(f"📈 전체 계측: {media.base_url}/metrics · 엔진 모드: {event.get('mode', '-')}")
+
 # 헤더
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
@@ -46,6 +374,13 @@ with col2:
 
 st.markdown("---")
 
+# 세션별 작업 공간
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+jobs = get_job_manager()
+get_separator()  # 첫 실행이면 모델 로드를 백그라운드에서 시작 (UI는 바로 그려짐)
+poll = False  # 작업 진행 중이면 스크립트 끝에서 다시 그림
+
 # 사이드바
 with st.sidebar:
     st.header("📊 Day 1 성과")
@@ -54,12 +389,23 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### 🎯 다음 목표")
-    st.markdown("- ⏳ 멜로디 추출 (Day 2)")
-    st.markdown("- ⏳ 코드 진행 분석 (Day 3)")
-    st.markdown("- ⏳ 리듬 패턴 인식 (Day 4)")
+    st.markdown("- ✅ 멜로디 추출 (Day 2)")
+    st.markdown("- ✅ 코드 진행 분석 (Day 3)")
+    st.markdown("- ✅ 리듬 패턴 인식 (Day 4)")
     
     st.markdown("---")
     st.info("**팁**: 3분 이내의 음원을 사용하면 더 빠르게 처리됩니다")
+    
+    stats = jobs.stats()
+    st.caption(f"⚙️ 처리 중 {stats['running']}/{stats['max_workers']} · 대기 {stats['queued']}")
+    feature_stats = get_feature_store().stats()
+    if feature_stats:
+        hits = sum(s["hits"] for s in feature_stats.values())
+        misses = sum(s["misses"] for s in feature_stats.values())
+        st.caption(f"🧮 특징 저장소 재사용 {hits} · 새로 계산 {misses}")
+    mixer = get_mixer()
+    if mixer.hits or mixer.misses:
+        st.caption(f"🎚️ 리믹스 재사용 {mixer.hits} · 새로 생성 {mixer.misses}")
 
 # 메인 컨텐츠
 tab1, tab2, tab3 = st.tabs(["🎸 음원 분리", "📝 사용 가이드", "📊 결과 갤러리"])
@@ -88,49 +434,94 @@ with tab1:
         st.markdown("### 🎧 원본 오디오")
         st.audio(uploaded_file)
         
-        # 임시 파일 저장
-        temp_dir = PROJECT_ROOT / "temp"
-        temp_dir.mkdir(exist_ok=True)
+        # 임시 파일 저장 (세션별 디렉토리 / 업로드마다 한 번만)
+        # rerun마다 다시 쓰면 작업이 읽는 중인 파일이 잘리고 수정 시각이 바뀌어 캐시 조회도 깨짐
+        upload_id = getattr(uploaded_file, "file_id", None) or uuid.uuid5(
+            uuid.NAMESPACE_OID, f"{uploaded_file.name}:{uploaded_file.size}").hex
+        temp_dir = jobs.session_dir(st.session_state.session_id) / upload_id
         temp_path = temp_dir / uploaded_file.name
+        if not temp_path.exists():
+            temp_dir.mkdir(parents=True, exist_ok=True)
+            partial_path = temp_dir / f".{uploaded_file.name}.part"
+            with open(partial_path, "wb") as f:
+                f.write(uploaded_file.getbuffer())
+            os.replace(partial_path, temp_path)
+        
+        format_label = st.radio("출력 포맷", list(OUTPUT_FORMATS), horizontal=True)
+        output_format, bitrate = OUTPUT_FORMATS[format_label]
         
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        col1, col2 = st.columns(2)
+        with col1:
+            use_preview = st.checkbox(f"⚡ {PREVIEW_SECONDS}초 미리듣기 먼저", value=True,
+                                      help="선택한 구간을 먼저 분리해서 들려주고, 전체 분리는 이어서 진행합니다")
+        with col2:
+            preview_start = st.number_input("미리듣기 시작 (초)", min_value=0, value=30, step=5,
+                                            disabled=not use_preview)
         
-        # 분리 버튼
+        # 분리 버튼 → 백그라운드 작업으로 제출
         if st.button("🚀 AI 음원 분리 시작", type="primary", use_container_width=True):
+            partial = {}
+            try:
+                st.session_state.job_id = jobs.submit(
+                    st.session_state.session_id, separate_audio, temp_path,
+                    label=uploaded_file.name, output_format=output_format, bitrate=bitrate,
+                    preview_start=float(preview_start) if use_preview else None, partial=partial
+                )
+                st.session_state.partial = partial
+            except QueueFullError as e:
+                st.warning(f"⏳ {e}")
+        
+        job = jobs.get(st.session_state.get("job_id"))
+        if job and job.active:
+            # 진행 상황 표시 (실제 처리한 세그먼트 기준)
+            preview = st.session_state.get("partial", {}).get("preview")
+            position = jobs.queue_position(job.id)
+            if position:
+                st.info(f"⏳ 대기 중... {position}번째 순서입니다")
+            else:
+                st.progress(job.progress)
+                stage = "전체 분리 중" if preview else "음원 분석 중"
+                if job.total:
+                    st.text(f"🎵 {stage}... {job.done}/{job.total} ({job.progress*100:.0f}%)")
+                else:
+                    st.text("🔄 AI 모델 준비 중...")
+                st.text(f"경과 시간: {job.elapsed:.1f}초")
             
-            # Progress 표시
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            time_text = st.empty()
-            
-            # 시작 시간
-            start_time = time.time()
-            
-            # 상태 업데이트
-            with st.spinner(""):
-                for i in range(30):
-                    progress_bar.progress(i/100)
-                    status_text.text(f"🔄 AI 모델 로딩 중... {i}%")
-                    time_text.text(f"경과 시간: {time.time()-start_time:.1f}초")
-                    time.sleep(0.1)
-                
-                status_text.text("🎵 음원 분석 중...")
-                progress_bar.progress(30)
-                
-                # 실제 분리 실행
-                output_dir = PROJECT_ROOT / "separated"
-                result_path = separate_audio(temp_path, output_dir)
-                
-                # 완료
-                progress_bar.progress(100)
-                elapsed = time.time() - start_time
-                status_text.text(f"✅ 분리 완료!")
-                time_text.text(f"총 소요 시간: {elapsed:.1f}초")
+            # 미리듣기가 먼저 끝났으면 바로 재생 (전체 결과가 나오면 교체)
+            if preview and preview[0]:
+                st.markdown(f"### ⚡ 미리듣기 ({PREVIEW_SECONDS}초)")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("#### 🎤 보컬")
+                    show_audio(stem_path(preview[0], "vocals"))
+                with col2:
+                    st.markdown("#### 🎸 반주")
+                    show_audio(stem_path(preview[0], "no_vocals"))
+            poll = True
+        
+        elif job:
+            result_path, run_metrics = job.result if job.status == DONE else (None, None)
+            elapsed = job.elapsed
             
             if result_path and result_path.exists():
                 st.success("🎉 음원 분리 성공!")
-                st.balloons()
+                if st.session_state.get("celebrated") != job.id:
+                    st.session_state.celebrated = job.id
+                    st.balloons()
+                
+                # 멜로디/코드/리듬 분석은 분리 결과를 먼저 보여준 뒤 별도 작업으로 (분리 작업을 붙잡지 않음)
+                if st.session_state.get("analyzed") != job.id:
+                    st.session_state.analyzed = job.id
+                    try:
+                        st.session_state.analysis_job = jobs.submit(
+                            f"{st.session_state.session_id}-analysis", analyze_result, result_path,
+                            label=f"{job.label} 분석")
+                    except QueueFullError as e:
+                        logger.warning(f"⚠️ 분석 작업 제출 실패: {e}")
+                analysis = jobs.get(st.session_state.get("analysis_job"))
+                if analysis and analysis.active:
+                    st.info(f"🔬 멜로디 / 코드 / 리듬 분석 중... ({analysis.done}/{analysis.total or 3})")
+                    poll = True
                 
                 # 결과 표시
                 st.markdown("### 🎼 분리된 트랙")
@@ -139,35 +530,42 @@ with tab1:
                 
                 with col1:
                     st.markdown("#### 🎤 보컬 트랙")
-                    vocal_path = result_path / "vocals.wav"
+                    vocal_path = stem_path(result_path, "vocals")
                     if vocal_path.exists():
-                        st.audio(str(vocal_path))
+                        show_audio(vocal_path)
                         st.markdown(get_download_link(vocal_path, "보컬"), unsafe_allow_html=True)
                         st.caption(f"파일 크기: {vocal_path.stat().st_size/1024/1024:.1f} MB")
                 
                 with col2:
                     st.markdown("#### 🎸 반주 트랙")
-                    inst_path = result_path / "no_vocals.wav"
+                    inst_path = stem_path(result_path, "no_vocals")
                     if inst_path.exists():
-                        st.audio(str(inst_path))
+                        show_audio(inst_path)
                         st.markdown(get_download_link(inst_path, "반주"), unsafe_allow_html=True)
                         st.caption(f"파일 크기: {inst_path.stat().st_size/1024/1024:.1f} MB")
                 
+                show_waveforms(result_path, job.id)
+                show_melody(result_path, job.id)
+                show_chords(result_path)
+                show_rhythm(result_path)
+                show_remix(result_path, job.id)
+                
                 # 추가 정보
                 with st.expander("🔍 기술 정보"):
                     st.markdown(f"""
                     - **사용 모델**: HTDemucs (Hybrid Transformer Demucs)
                     - **처리 모드**: 2-stems (Vocals/Accompaniment)
                     - **처리 시간**: {elapsed:.1f}초
-                    - **출력 형식**: WAV 44.1kHz
+                    - **출력 형식**: {vocal_path.suffix[1:].upper()} 44.1kHz
                     - **결과 경로**: `{result_path}`
                     """)
+                    show_run_metrics(run_metrics)
                 
                 # 성공 메시지
                 st.info("💡 **활용 팁**: 분리된 보컬로 가라오케를 만들거나, 반주로 리믹스를 제작할 수 있습니다!")
                 
             else:
-                st.error("❌ 분리 실패. 다른 파일로 시도해보세요.")
+                st.error(f"❌ 분리 실패. 다른 파일로 시도해보세요. {job.error or ''}")
     
     else:
         # 샘플 파일 제공
@@ -178,7 +576,8 @@ with tab1:
             if st.button("📥 샘플 파일 다운로드"):
                 sample_path = PROJECT_ROOT / "data" / "tiny_test.mp3"
                 if sample_path.exists():
-                    st.markdown(get_download_link(sample_path, "샘플 음악"), unsafe_allow_html=True)
+                    st.download_button("💾 샘플 음악 다운로드", sample_path.read_bytes(),
+                                       file_name=sample_path.name, mime="audio/mpeg")
 
 with tab2:
     st.header("📝 사용 가이드")
@@ -207,29 +606,46 @@ with tab2:
 with tab3:
     st.header("📊 결과 갤러리")
     
-    # separated 디렉토리의 결과들 표시
-    separated_dir = PROJECT_ROOT / "separated" / "htdemucs"
+    # 결과 색인에서 한 페이지씩 조회 (최근 사용 순, 디렉토리를 훑지 않음)
+    cache = get_cache()
+    total = cache.count()
     
-    if separated_dir.exists():
-        results = list(separated_dir.iterdir())
-        if results:
-            st.success(f"🎵 총 {len(results)}개의 분리 결과")
-            
-            for result in results[-5:]:  # 최근 5개만
-                with st.expander(f"📁 {result.name}"):
+    if total:
+        pages = (total + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.success(f"🎵 총 {total}개의 분리 결과")
+        with col2:
+            page = st.number_input("페이지", min_value=1, max_value=pages, value=1,
+                                   help=f"전체 {pages}페이지") if pages > 1 else 1
+        
+        for entry in cache.page((page - 1) * GALLERY_PAGE_SIZE, GALLERY_PAGE_SIZE):
+            result = entry["path"]
+            with st.expander(f"📁 {entry.get('name') or result.name} · {entry.get('model', '')}"):
+                length = f"{entry['audio_seconds']:.0f}초 · " if entry.get("audio_seconds") else ""
+                created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created"]))
+                st.caption(f"{length}{entry.get('stems')} stems · {entry.get('format', 'wav')} · "
+                           f"{entry['size'] / 1024 / 1024:.1f} MB · {created}")
+                # 접힌 expander도 매 rerun마다 실행됨 → 파형 / 분석은 켠 항목만 그림
+                if st.toggle("📊 파형 / 분석 보기", key=f"analysis-{entry['key']}"):
+                    show_waveforms(result, entry["key"])
+                    show_melody(result, entry["key"])
+                    show_chords(result)
+                    show_rhythm(result)
+                # 플레이어는 요청할 때만 생성 (페이지의 모든 항목이 오디오를 받지 않도록)
+                if st.toggle("🎧 들어보기", key=f"play-{entry['key']}"):
                     col1, col2 = st.columns(2)
                     with col1:
-                        vocal_file = result / "vocals.wav"
+                        vocal_file = stem_path(result, "vocals")
                         if vocal_file.exists():
                             st.markdown("**🎤 보컬**")
-                            st.audio(str(vocal_file))
+                            show_audio(vocal_file)
                     with col2:
-                        inst_file = result / "no_vocals.wav"
+                        inst_file = stem_path(result, "no_vocals")
                         if inst_file.exists():
                             st.markdown("**🎸 반주**")
-                            st.audio(str(inst_file))
-        else:
-            st.info("아직 분리된 결과가 없습니다")
+                            show_audio(inst_file)
+                    show_remix(result, entry["key"])
     else:
         st.info("첫 번째 음원을 분리해보세요!")
 
@@ -245,3 +661,8 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# 작업이 진행 중이면 잠시 후 다시 그려서 진행률 갱신 (작업 자체는 백그라운드에서 실행)
+if poll:
+    time.sleep(1)
+    st.rerun()
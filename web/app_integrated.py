@@ -22,8 +22,12 @@ st.set_page_config(
 # 초기화
 @st.cache_resource
 def get_separator():
-    """Separator 인스턴스 캐싱"""
-    return MuingSeparator()
+    """Separator 인스턴스 캐싱 (모델은 백그라운드에서 미리 로드)"""
+    separator = MuingSeparator(preload=False)
+    separator.warm_up()
+    return separator
+
+get_separator()  # 모델 warm-up 시작
 
 # 헤더
 st.title("🎵 Muing (뮤잉)")